@@ -5,8 +5,6 @@ from typing import Optional
 from datetime import datetime
 from dotenv import load_dotenv
 
-from sqlalchemy import create_engine
-
 from chainlit.types import ThreadDict
 from chainlit.input_widget import Select, Switch, MultiSelect, Slider
 
@@ -19,6 +17,11 @@ from src.storage.models import MemoryStrategyEnums
 from src.core.memory_config import AgentCoreMemoryConfig
 from src.core.session_manager import AgentCoreMemorySessionManager
 from src.core.agent import Agent
+from src.core.extraction_queue import start_extraction_worker, submit_memory_extraction
+from src.storage.async_repository import AsyncRepository
+from src.storage.engine import get_engine as get_shared_engine
+from src.storage.invalidation import start_memory_write_subscriber
+from src.embeddings import Embedder, start_reembedding
 from src.tools import create_memory_tool
 from src.prompts.agent import AGENT_SYSTEM_PROMPT
 from src.prompts.memory_retrieval import MEMORY_SYSTEM_PROMPT
@@ -30,7 +33,9 @@ POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
-engine = create_engine(f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
+# Warm-up and embedding coverage check tasks; the event loop only keeps weak references to tasks
+_background_tasks = set()
+engine = get_shared_engine(f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
 @cl.on_message
 async def on_message(message: cl.Message):
     cl_settings = cl.user_session.get("settings")
@@ -39,10 +44,18 @@ async def on_message(message: cl.Message):
     user_id = cl.user_session.get("user_id")
     current_time = datetime.now().isoformat()
     
+    await wait_for_embedding_check()
     agent_core_memory_config = get_agent_memory_config()
     agent_core_session_manager = AgentCoreMemorySessionManager(
         agent_core_memory_config=agent_core_memory_config
     )
+    # Start retrieval for the message now so it overlaps agent setup: the whole injected context,
+    # or the preference/semantic memories the agent's first retrieval tool call is served from
+    is_strategy_enabled = len(cl_settings["memory_strategies"]) > 0
+    if is_strategy_enabled and config_settings.MEMORY_PREFETCH_INJECT:
+        agent_core_session_manager.prefetch_memory_context(query=message.content)
+    elif is_strategy_enabled:
+        agent_core_session_manager.prefetch_strategy_memories(query=message.content)
     retrieve_memory_context_tool = FunctionTool.from_defaults(
         name="retrieve_memory_context",
         description="Retrieve relevant memories from the conversation history to provide context for the current conversation.",
@@ -59,7 +72,6 @@ async def on_message(message: cl.Message):
     
     # Add memory retrieval prompt only if memory strategies are enabled
     tools = []
-    is_strategy_enabled = len(cl_settings["memory_strategies"]) > 0
     if is_strategy_enabled:
         memory_retrieval_system_prompt = MEMORY_SYSTEM_PROMPT.format(thread_id=thread_id)
         system_prompt += "\n\n" + memory_retrieval_system_prompt
@@ -79,6 +91,9 @@ async def on_message(message: cl.Message):
 async def on_chat_resume(thread: ThreadDict):
     chat_history = build_chat_history(thread)
     await set_chat_settings(chat_history=chat_history, thread_id=thread.get("id"))
+    reembed_user_memories()
+    start_memory_write_subscriber()
+    warm_up_memory()
 
 @cl.on_chat_end
 async def end():
@@ -86,18 +101,108 @@ async def end():
     if not cl_settings or cl.user_session.get("thread_id") is None or len(cl_settings["memory_strategies"]) == 0:
         return
     agent_core_memory_config = get_agent_memory_config()
-    session_manager = AgentCoreMemorySessionManager(
-        agent_core_memory_config=agent_core_memory_config
-    )
-    asyncio.create_task(
-        session_manager.process_conversation_for_memory(
-            is_process_next_messages=True
-        )
+    await submit_memory_extraction(
+        agent_core_memory_config,
+        is_process_next_messages=True
     )
 
 @cl.on_chat_start
 async def start():
     await set_chat_settings(thread_id=cl.context.session.thread_id)
+    reembed_user_memories()
+    start_extraction_worker()
+    start_memory_write_subscriber()
+    warm_up_memory()
+
+def warm_up_memory():
+    """Open the database connection and embedding client in the background before the first message arrives."""
+    cl_settings = cl.user_session.get("settings")
+    user_env = cl.user_session.get("env")
+    if not config_settings.MEMORY_PREFETCH_ENABLED or not cl_settings or not user_env or len(cl_settings["memory_strategies"]) == 0:
+        return
+    session_manager = AgentCoreMemorySessionManager(
+        agent_core_memory_config=get_agent_memory_config()
+    )
+    task = asyncio.create_task(session_manager.warm_up())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def reembed_user_memories():
+    """
+    Check the user's embedding coverage in the background, so starting a chat does not wait on it.
+
+    The first message waits for the check if it is still running (see
+    wait_for_embedding_check).
+    """
+    cl.user_session.set("reembedding", None)
+    cl.user_session.set("embedding_check", None)
+    if not config_settings.REEMBED_ON_MODEL_SWITCH or not cl.user_session.get("settings") or not cl.user_session.get("env"):
+        return
+    task = asyncio.create_task(check_embedding_coverage())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    cl.user_session.set("embedding_check", task)
+
+async def wait_for_embedding_check():
+    """Wait for a running embedding coverage check so the turn retrieves with the right embeddings."""
+    task = cl.user_session.get("embedding_check")
+    if task is not None and not task.done():
+        await asyncio.shield(task)
+
+async def check_embedding_coverage():
+    """
+    Backfill, in the background, the user's memories not yet embedded by the selected embedding model.
+
+    Nothing is started when the model has embedded all of them. Otherwise,
+    until the job finishes, the session keeps retrieving with the model most
+    of them are embedded with, or from the legacy ThreadMemory.embedding
+    column when no model has embedded any (memories stored before migration
+    004), so they stay retrievable (see get_embedding_model).
+    """
+    cl_settings = cl.user_session.get("settings")
+    user_env = cl.user_session.get("env")
+    model = cl_settings["embedding_model"]
+    user_id = cl.user_session.get("user_id")
+    try:
+        total, coverage = await AsyncRepository().get_embedding_model_coverage(user_id)
+    except Exception as e:
+        print(f"Error checking embedding coverage: {e}")
+        return
+    if cl.user_session.get("settings")["embedding_model"] != model:
+        # The model changed meanwhile; its own check decides
+        return
+    if coverage.get(model, 0) >= total:
+        return
+    embedder = Embedder(
+        model=model,
+        openai_api_key=user_env['OPENAI_API_KEY'],
+        gemini_api_key=user_env['GEMINI_API_KEY'],
+    )
+    task = start_reembedding(embedder, user_id=user_id)
+    fallback_model = max(
+        (other for other in coverage if other in config_settings.EMBEDDING_MODELS),
+        key=coverage.get,
+        default=None,
+    )
+    if fallback_model is not None and coverage[fallback_model] > coverage.get(model, 0):
+        cl.user_session.set("reembedding", (task, fallback_model))
+    elif not coverage and config_settings.embedding_dimensions(model) == config_settings.EMBEDDING_DIMENSIONS:
+        # No fallback model: search the legacy column with the selected model's query vectors
+        cl.user_session.set("reembedding", (task, None))
+
+def get_embedding_model():
+    """Embedding model the session retrieves and stores memories with."""
+    reembedding = cl.user_session.get("reembedding")
+    if reembedding is not None:
+        task, fallback_model = reembedding
+        if not task.done() and fallback_model is not None:
+            return fallback_model
+    return cl.user_session.get("settings")["embedding_model"]
+
+def is_legacy_embedding_retrieval():
+    """Check if the session searches the legacy ThreadMemory.embedding column while the user's memories are re-embedded."""
+    reembedding = cl.user_session.get("reembedding")
+    return reembedding is not None and reembedding[1] is None and not reembedding[0].done()
 
 def get_agent_memory_config():
     cl_settings = cl.user_session.get("settings")
@@ -110,13 +215,19 @@ def get_agent_memory_config():
         no_of_exchanges_to_llm=no_exchanges_to_llm, 
         model=cl_settings["model"],
         summarization_model=cl_settings["summarization_model"],
-        embedding_model=cl_settings["embedding_model"],
+        embedding_model=get_embedding_model(),
+        legacy_embedding_retrieval=is_legacy_embedding_retrieval(),
         openai_api_key=user_env['OPENAI_API_KEY'],
         anthropic_api_key=user_env['ANTHROPIC_API_KEY'],
         gemini_api_key=user_env['GEMINI_API_KEY'],
         summary_score=cl_settings["summary_score"],
         semantic_score=cl_settings["semantic_score"],
         user_preference_score=cl_settings["user_preference_score"],
+        hnsw_ef_search=config_settings.DEFAULT_HNSW_EF_SEARCH,
+        hnsw_iterative_scan=config_settings.DEFAULT_HNSW_ITERATIVE_SCAN,
+        retrieval_mode=config_settings.DEFAULT_RETRIEVAL_MODE,
+        extraction_mode=config_settings.DEFAULT_EXTRACTION_MODE,
+        summary_extraction_mode=config_settings.DEFAULT_SUMMARY_EXTRACTION_MODE,
     )
 
 async def set_chat_settings(chat_history: Optional[list] = None, thread_id: Optional[str] = None):
@@ -199,8 +310,7 @@ def get_engine():
     Establish SQLAlchemy-based data layer for persisting chat history into PostgreSQL.
     """
     conninfo = config_settings.DATABASE_URL
-    engine = create_engine(conninfo)
-    return engine
+    return get_shared_engine(conninfo)
 
 
 @cl.password_auth_callback
@@ -215,7 +325,10 @@ async def auth_callback(username: str, password: str):
 
 @cl.on_settings_update
 async def setup_agent(cl_settings):
+    previous_settings = cl.user_session.get("settings") or {}
     cl.user_session.set("settings", cl_settings)
+    if cl_settings.get("embedding_model") != previous_settings.get("embedding_model"):
+        reembed_user_memories()
 
 def build_chat_history(thread: ThreadDict):
     chat_history = []
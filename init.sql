@@ -88,12 +88,49 @@ CREATE TABLE IF NOT EXISTS "ThreadMemory" (
     "namespace" TEXT,
     "embedding" VECTOR(3072),
     "content" TEXT NOT NULL,
+    "contentTsv" TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', "content")) STORED,
     "metadata" JSONB,
     "createdAt" TIMESTAMP DEFAULT NOW(),
     "updatedAt" TIMESTAMP DEFAULT NOW(),
     FOREIGN KEY ("userId") REFERENCES "User"("id")
 );
 
+CREATE TABLE IF NOT EXISTS "ThreadMemoryEmbedding" (
+    "memoryId" UUID NOT NULL REFERENCES "ThreadMemory"("id") ON DELETE CASCADE,
+    "model" TEXT NOT NULL,
+    "dimensions" INTEGER NOT NULL,
+    "embedding" VECTOR NOT NULL,
+    "createdAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    "updatedAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY ("memoryId", "model")
+);
+
+CREATE TABLE IF NOT EXISTS "EmbeddingCache" (
+    "key" VARCHAR(64) PRIMARY KEY,
+    "model" TEXT NOT NULL,
+    "dimensions" INTEGER NOT NULL,
+    "embedding" VECTOR NOT NULL,
+    "createdAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    "lastAccessedAt" TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS "MemoryExtractionJob" (
+    "id" BIGINT PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    "idempotencyKey" VARCHAR(255) NOT NULL UNIQUE,
+    "threadId" VARCHAR(255) NOT NULL,
+    "userId" VARCHAR(255),
+    "watermark" BIGINT NOT NULL,
+    "payload" JSONB NOT NULL,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'queued',
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "maxAttempts" INTEGER NOT NULL,
+    "availableAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    "lockedBy" VARCHAR(255),
+    "lastError" TEXT,
+    "createdAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    "updatedAt" TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 CREATE TABLE "ExchangeThread" (
     "id" VARCHAR(36) PRIMARY KEY,
     "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
@@ -154,9 +191,30 @@ CREATE INDEX IF NOT EXISTS idx_threadId ON "ThreadMemory"("threadId");
 
 CREATE INDEX IF NOT EXISTS idx_namespace ON "ThreadMemory"("namespace");
 
+CREATE INDEX IF NOT EXISTS idx_threadmemory_content_tsv ON "ThreadMemory" USING gin ("contentTsv");
+
+CREATE INDEX IF NOT EXISTS idx_threadmemory_embedding_model ON "ThreadMemoryEmbedding"("model");
+
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_accessed ON "EmbeddingCache"("lastAccessedAt");
+
 CREATE INDEX IF NOT EXISTS idx_exchange_message_thread_id ON "ExchangeMessage" ("thread_id");
 
-CREATE INDEX IF NOT EXISTS idx_threadmemory_embedding ON "ThreadMemory" USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+CREATE INDEX IF NOT EXISTS idx_memory_extraction_job_available ON "MemoryExtractionJob"("availableAt") WHERE "status" IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_memory_extraction_job_thread ON "MemoryExtractionJob"("threadId");
+
+-- pgvector indexes at most 2000 vector dimensions; index the 3072-dim embedding as halfvec instead
+-- (for 256/768/1536-dim storage see migrations/003_embedding_dimensions.sql)
+CREATE INDEX IF NOT EXISTS idx_threadmemory_embedding_hnsw ON "ThreadMemory" USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Per-model partial HNSW indexes over ThreadMemoryEmbedding (one per entry of EMBEDDING_MODELS)
+CREATE INDEX IF NOT EXISTS idx_threadmemory_embedding_text_embedding_3_large_hnsw ON "ThreadMemoryEmbedding" USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64) WHERE model = 'text-embedding-3-large';
+
+CREATE INDEX IF NOT EXISTS idx_threadmemory_embedding_gemini_embedding_001_hnsw ON "ThreadMemoryEmbedding" USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64) WHERE model = 'gemini-embedding-001';
+
+CREATE INDEX IF NOT EXISTS idx_threadmemory_embedding_sentence_transformers_d2389aac_hnsw ON "ThreadMemoryEmbedding" USING hnsw ((embedding::halfvec(768)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64) WHERE model = 'sentence-transformers/all-mpnet-base-v2';
+
+CREATE INDEX IF NOT EXISTS idx_threadmemory_embedding_hashing_256_hnsw ON "ThreadMemoryEmbedding" USING hnsw ((embedding::halfvec(256)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64) WHERE model = 'hashing-256';
 
 ALTER TABLE "Element" ADD CONSTRAINT "Element_stepId_fkey" FOREIGN KEY ("stepId") REFERENCES "Step"("id") ON DELETE CASCADE ON UPDATE CASCADE;
 
@@ -0,0 +1,23 @@
+-- Replace the unbuildable ivfflat index on "ThreadMemory".embedding with an
+-- HNSW index over a halfvec(3072) expression.
+--
+-- pgvector cannot index vector columns with more than 2000 dimensions, so the
+-- original idx_threadmemory_embedding was never created and every retrieval
+-- was an exact sequential scan. halfvec supports up to 4000 dimensions.
+--
+-- Run outside a transaction block (CONCURRENTLY does not block writes):
+--     psql "$DATABASE_URL" -f migrations/001_threadmemory_hnsw_halfvec_index.sql
+--
+-- To build with different m / ef_construction values use
+-- await AsyncRepository().create_embedding_index(m=..., ef_construction=...)
+-- or set HNSW_M / HNSW_EF_CONSTRUCTION and call it without arguments.
+-- Requires pgvector >= 0.7.0.
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_threadmemory_embedding;
+
+SET maintenance_work_mem = '1GB';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_threadmemory_embedding_hnsw
+    ON "ThreadMemory"
+    USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
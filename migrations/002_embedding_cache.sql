@@ -0,0 +1,14 @@
+-- Persistent content-addressed embedding cache used by
+-- MemoryStrategy.generate_embeddings (second tier behind the in-process LRU).
+--     psql "$DATABASE_URL" -f migrations/002_embedding_cache.sql
+
+CREATE TABLE IF NOT EXISTS "EmbeddingCache" (
+    "key" VARCHAR(64) PRIMARY KEY,
+    "model" TEXT NOT NULL,
+    "dimensions" INTEGER NOT NULL,
+    "embedding" VECTOR NOT NULL,
+    "createdAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    "lastAccessedAt" TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_accessed ON "EmbeddingCache"("lastAccessedAt");
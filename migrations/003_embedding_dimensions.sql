@@ -0,0 +1,35 @@
+-- Resize "ThreadMemory".embedding to a reduced Matryoshka dimensionality
+-- (256, 768 or 1536) and rebuild the HNSW index for it.
+--
+-- Existing embeddings are truncated to their first :dims values and
+-- L2 re-normalized, which is equivalent to requesting the smaller size from
+-- text-embedding-3-large / gemini-embedding-001. Set EMBEDDING_DIMENSIONS to
+-- the same value before restarting the app.
+--
+--     psql "$DATABASE_URL" -v dims=768 -f migrations/003_embedding_dimensions.sql
+--
+-- Requires pgvector >= 0.7.0 (subvector, l2_normalize, halfvec). The column
+-- rewrite locks "ThreadMemory" for its duration.
+
+\if :{?dims}
+\else
+    \echo 'Pass the target dimensionality, e.g. -v dims=768'
+    \quit
+\endif
+
+BEGIN;
+
+DROP INDEX IF EXISTS idx_threadmemory_embedding_hnsw;
+
+ALTER TABLE "ThreadMemory"
+    ALTER COLUMN embedding TYPE VECTOR(:dims)
+    USING l2_normalize(subvector(embedding, 1, :dims))::vector(:dims);
+
+COMMIT;
+
+SET maintenance_work_mem = '1GB';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_threadmemory_embedding_hnsw
+    ON "ThreadMemory"
+    USING hnsw ((embedding::halfvec(:dims)) halfvec_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
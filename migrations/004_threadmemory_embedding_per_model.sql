@@ -0,0 +1,49 @@
+-- Store memory embeddings per embedding model so vectors of different models
+-- are never compared and switching models does not invalidate memories.
+--
+--     psql "$DATABASE_URL" -f migrations/004_threadmemory_embedding_per_model.sql
+--
+-- The legacy "ThreadMemory".embedding column does not record which model
+-- produced it. If every existing memory was embedded with the same model,
+-- copy the vectors over by naming it:
+--
+--     psql "$DATABASE_URL" -v legacy_model=gemini-embedding-001 -f migrations/004_threadmemory_embedding_per_model.sql
+--
+-- Otherwise (or for any other model) backfill with the re-embedding job:
+--
+--     python -m src.embeddings.reembed --model gemini-embedding-001 --create-index
+
+CREATE TABLE IF NOT EXISTS "ThreadMemoryEmbedding" (
+    "memoryId" UUID NOT NULL REFERENCES "ThreadMemory"("id") ON DELETE CASCADE,
+    "model" TEXT NOT NULL,
+    "dimensions" INTEGER NOT NULL,
+    "embedding" VECTOR NOT NULL,
+    "createdAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    "updatedAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY ("memoryId", "model")
+);
+
+CREATE INDEX IF NOT EXISTS idx_threadmemory_embedding_model ON "ThreadMemoryEmbedding"("model");
+
+\if :{?legacy_model}
+INSERT INTO "ThreadMemoryEmbedding" ("memoryId", "model", "dimensions", "embedding")
+SELECT "id", :'legacy_model', vector_dims("embedding"), "embedding"
+FROM "ThreadMemory"
+WHERE "embedding" IS NOT NULL
+ON CONFLICT ("memoryId", "model") DO NOTHING;
+\endif
+
+-- One partial HNSW index per model, over a halfvec cast of its dimensionality
+-- (python -m src.embeddings.reembed --model <model> --create-index, or
+-- await AsyncRepository().create_model_embedding_index(model), builds the same index).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_threadmemory_embedding_text_embedding_3_large_hnsw
+    ON "ThreadMemoryEmbedding"
+    USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE model = 'text-embedding-3-large';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_threadmemory_embedding_gemini_embedding_001_hnsw
+    ON "ThreadMemoryEmbedding"
+    USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE model = 'gemini-embedding-001';
@@ -0,0 +1,16 @@
+-- Full-text search over "ThreadMemory".content for hybrid (lexical + vector)
+-- retrieval. The tsvector is a stored generated column, so Postgres keeps it
+-- in sync with content on every insert and update.
+--
+--     psql "$DATABASE_URL" -f migrations/005_threadmemory_content_tsv.sql
+--
+-- Adding the column rewrites the table once. The GIN index is built without
+-- blocking writes; run outside a transaction block.
+
+ALTER TABLE "ThreadMemory"
+    ADD COLUMN IF NOT EXISTS "contentTsv" TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('english', "content")) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_threadmemory_content_tsv
+    ON "ThreadMemory"
+    USING gin ("contentTsv");
@@ -0,0 +1,28 @@
+-- Durable queue for memory extraction. The web process enqueues a job per
+-- thread and message watermark; workers claim jobs with
+-- FOR UPDATE SKIP LOCKED, so extraction survives restarts and deploys.
+--
+--     psql "$DATABASE_URL" -f migrations/006_memory_extraction_job.sql
+
+CREATE TABLE IF NOT EXISTS "MemoryExtractionJob" (
+    "id" BIGINT PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    "idempotencyKey" VARCHAR(255) NOT NULL UNIQUE,
+    "threadId" VARCHAR(255) NOT NULL,
+    "userId" VARCHAR(255),
+    "watermark" BIGINT NOT NULL,
+    "payload" JSONB NOT NULL,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'queued',
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "maxAttempts" INTEGER NOT NULL,
+    "availableAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    "lockedBy" VARCHAR(255),
+    "lastError" TEXT,
+    "createdAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    "updatedAt" TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_memory_extraction_job_available
+    ON "MemoryExtractionJob"("availableAt")
+    WHERE "status" IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_memory_extraction_job_thread ON "MemoryExtractionJob"("threadId");
@@ -3,7 +3,10 @@ Configuration settings for AgentCore Memory system.
 """
 from typing import Dict, List
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import Field, model_validator
+
+# Matryoshka sizes supported for stored embeddings
+SUPPORTED_EMBEDDING_DIMENSIONS = (256, 768, 1536, 3072)
 
 
 class Settings(BaseSettings):
@@ -15,6 +18,15 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = Field(default="localhost", description="PostgreSQL host")
     POSTGRES_PORT: int = Field(default=5432, description="PostgreSQL port")
 
+    DB_POOL_SIZE: int = Field(default=10, description="Persistent connections kept in the shared pool")
+    DB_MAX_OVERFLOW: int = Field(default=10, description="Extra connections allowed above the pool size")
+    DB_POOL_TIMEOUT: int = Field(default=30, description="Seconds to wait for a pooled connection")
+    DB_POOL_PRE_PING: bool = Field(default=True, description="Test pooled connections before checkout")
+    DB_POOL_RECYCLE: int = Field(default=1800, description="Seconds after which pooled connections are recycled")
+
+    HNSW_M: int = Field(default=16, description="HNSW index max connections per layer")
+    HNSW_EF_CONSTRUCTION: int = Field(default=64, description="HNSW index candidate list size at build time")
+
     OPENAI_API_KEY: str | None = None
     ANTHROPIC_API_KEY: str | None = None
     GEMINI_API_KEY: str | None = None
@@ -61,13 +73,76 @@ class Settings(BaseSettings):
         "text-embedding-3-large": {
             "provider": "OpenAI",
             "display": "OpenAI - Text Embedding 3 Large",
+            "max_batch_size": 2048,
+            "max_dimensions": 3072,
         },  
         "gemini-embedding-001": {
             "provider": "Google",
             "display": "Google - Gemini Embedding 001",
+            "max_batch_size": 100,
+            "max_dimensions": 3072,
+        },
+        "sentence-transformers/all-mpnet-base-v2": {
+            "provider": "Local",
+            "display": "Local - all-mpnet-base-v2 (CPU)",
+            "max_batch_size": 256,
+            "max_dimensions": 768,
+            "dimensions": 768,
+        },
+        "hashing-256": {
+            "provider": "Hashing",
+            "display": "Hashing - 256 (tests and offline benchmarks)",
+            "max_batch_size": 1000,
+            "max_dimensions": 3072,
+            "dimensions": 256,
         },
     }
     
+    EMBEDDING_UI_PROVIDERS: List[str] = Field(default=["OpenAI", "Google"], description="Embedding providers whose models are offered in the chat settings (add Local once sentence-transformers is installed)")
+    EMBEDDING_DIMENSIONS: int = Field(default=3072, description="Default embedding dimensionality (256, 768, 1536 or 3072) and width of the legacy ThreadMemory.embedding column")
+    LOCAL_EMBEDDING_DEVICE: str = Field(default="cpu", description="Device the Local embedding provider runs its models on")
+    LOCAL_EMBEDDING_THREADS: int = Field(default=2, description="Thread pool size for Local embedding inference")
+    LOCAL_EMBEDDING_BATCH_SIZE: int = Field(default=32, description="Texts per forward pass of a Local embedding model")
+    EMBEDDING_MAX_CONCURRENCY: int = Field(default=16, description="Maximum in-flight embedding requests per event loop")
+    EMBEDDING_BATCH_ENABLED: bool = Field(default=True, description="Coalesce concurrent embedding requests into batched provider calls")
+    EMBEDDING_BATCH_WINDOW_MS: float = Field(default=10.0, description="How long an embedding request waits for others to batch with")
+    EMBEDDING_BATCH_MAX_SIZE: int = Field(default=100, description="Flush a coalesced embedding batch once it holds this many texts")
+    EMBEDDING_CACHE_ENABLED: bool = Field(default=True, description="Cache embeddings by hash(model, dimensions, text)")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = Field(default=10000, description="Maximum embeddings kept in the in-process LRU")
+    EMBEDDING_CACHE_PERSISTENT: bool = Field(default=True, description="Back the in-process cache with the EmbeddingCache table")
+    EMBEDDING_CACHE_MAX_AGE_DAYS: int | None = Field(default=30, description="Evict cached embeddings not used for this many days")
+    EMBEDDING_CACHE_TOUCH_INTERVAL_HOURS: float = Field(default=24, description="Refresh a cached embedding's last access time at most this often (its age for eviction is accurate to this interval)")
+    EMBEDDING_CACHE_MAX_ROWS: int | None = Field(default=1000000, description="Maximum rows kept in the EmbeddingCache table")
+    MEMORY_INDEX_ENABLED: bool = Field(default=False, description="Score hot users' memories in-process instead of querying pgvector")
+    MEMORY_INDEX_MAX_BYTES: int = Field(default=256 * 1024 * 1024, description="Total size of the in-process memory index before LRU eviction")
+    MEMORY_INDEX_MAX_MEMORIES: int = Field(default=10000, description="Users with more memories per strategy are always searched in pgvector")
+    MEMORY_INDEX_TTL_SECONDS: float = Field(default=300.0, description="Reload cached memories after this long (bounds staleness from other processes' writes when notifications are missed)")
+    RETRIEVAL_CACHE_ENABLED: bool = Field(default=True, description="Cache formatted memory contexts per user, scope, strategies and query")
+    RETRIEVAL_CACHE_MAX_BYTES: int = Field(default=16 * 1024 * 1024, description="Total size of cached memory contexts before LRU eviction")
+    RETRIEVAL_CACHE_TTL_SECONDS: float = Field(default=120.0, description="Seconds a cached memory context stays valid")
+    MEMORY_WRITE_NOTIFY_ENABLED: bool = Field(default=True, description="Publish memory writes with Postgres NOTIFY so other processes drop the affected retrieval cache and memory index entries")
+    MEMORY_PREFETCH_ENABLED: bool = Field(default=True, description="Start retrieving memories for an incoming message before the agent runs and serve the agent's first cross-conversation retrieval tool call from them")
+    MEMORY_PREFETCH_STRATEGIES: List[str] = Field(default=["USER_PREFERENCE", "SEMANTIC"], description="Strategies prefetched with the incoming message; the others are retrieved with the tool call's own query")
+    MEMORY_PREFETCH_INJECT: bool = Field(default=False, description="Inject the prefetched memory context into the agent's input instead of forcing a first retrieval tool call")
+    MEMORY_PREFETCH_INJECT_TIMEOUT_SECONDS: float = Field(default=2.0, description="Longest the agent waits for the prefetched memory context when injecting it")
+    EXTRACTION_QUEUE_ENABLED: bool = Field(default=True, description="Run memory extraction through the durable MemoryExtractionJob queue instead of untracked background tasks")
+    EXTRACTION_QUEUE_IN_PROCESS_WORKER: bool = Field(default=False, description="Consume the extraction queue inside the web process instead of python -m src.worker (single-process development)")
+    EXTRACTION_QUEUE_POLL_SECONDS: float = Field(default=2.0, description="Seconds an idle extraction worker waits before polling the queue again")
+    EXTRACTION_WORKER_PROCESSES: int = Field(default=1, description="Processes started by python -m src.worker")
+    EXTRACTION_WORKERS_PER_PROCESS: int = Field(default=1, description="Asyncio extraction workers per worker process")
+    EXTRACTION_WORKER_CONCURRENCY: int = Field(default=4, description="Extraction jobs one worker runs concurrently")
+    EXTRACTION_DEBOUNCE_SECONDS: float = Field(default=5.0, description="Delay before a queued extraction starts; replies within it merge into the same job")
+    EXTRACTION_DEBOUNCE_MAX_SECONDS: float = Field(default=30.0, description="Longest a burst of replies can postpone its thread's extraction")
+    EXTRACTION_JOB_VISIBILITY_TIMEOUT_SECONDS: float = Field(default=300.0, description="Seconds a claimed extraction job stays hidden from other workers after its worker's last heartbeat before it is retried")
+    EXTRACTION_JOB_HEARTBEAT_SECONDS: float = Field(default=60.0, description="How often a worker extends the visibility timeout of a job it is still running")
+    EXTRACTION_JOB_MAX_ATTEMPTS: int = Field(default=5, description="Attempts before an extraction job is marked failed")
+    EXTRACTION_JOB_RETRY_BASE_SECONDS: float = Field(default=10.0, description="Delay before the first retry of a failed extraction job; doubles with each attempt")
+    EXTRACTION_JOB_RETRY_MAX_SECONDS: float = Field(default=600.0, description="Longest delay between extraction job retries")
+    EXTRACTION_JOB_RETENTION_HOURS: float = Field(default=24.0, description="Hours finished extraction jobs are kept before workers purge them")
+    REEMBED_BATCH_SIZE: int = Field(default=100, description="Memories embedded per re-embedding batch")
+    REEMBED_CONCURRENCY: int = Field(default=4, description="Re-embedding batches processed concurrently")
+    REEMBED_ON_MODEL_SWITCH: bool = Field(default=True, description="Re-embed, in the background, a user's memories the selected embedding model has not embedded yet (the session keeps the previous model until it finishes)")
+
     DEFAULT_EMBEDDING_MODEL: str = "gemini-embedding-001"
     DEFAULT_LLM_MODEL: str = "gpt-4.1"
     DEFAULT_SUMMARIZATION_MODEL: str = "gpt-4.1-mini"
@@ -77,6 +152,36 @@ class Settings(BaseSettings):
     DEFAULT_SUMMARY_SCORE: float = 0.001
     DEFAULT_SEMANTIC_SCORE: float = 0.001
     DEFAULT_USER_PREFERENCE_SCORE: float = 0.001
+    DEFAULT_HNSW_EF_SEARCH: int = 40
+    DEFAULT_HNSW_ITERATIVE_SCAN: str | None = None
+    DEFAULT_RETRIEVAL_MODE: str = Field(default="vector", description="Memory retrieval mode: vector, or hybrid (full-text + vector; needs migrations/005 for contentTsv)")
+    HYBRID_RRF_K: int = Field(default=60, description="Reciprocal rank fusion constant for hybrid retrieval")
+    HYBRID_CANDIDATE_MULTIPLIER: int = Field(default=4, description="Candidates per hybrid list as a multiple of the strategy limit")
+    DEFAULT_EXTRACTION_MODE: str = Field(default="separate", description="Memory extraction mode: separate (one LLM call per strategy) or fused (one call for all strategies)")
+    DEFAULT_SUMMARY_EXTRACTION_MODE: str = Field(default="full", description="Summary extraction mode: full (replay every chunk) or incremental (route through the topic index, load only chunks to update)")
+    SUMMARY_TOPIC_INDEX_LIMIT: int = Field(default=50, description="Most recently updated summary chunks listed in the topic index for incremental extraction")
+    SUMMARY_MAX_UPDATE_CHUNKS: int = Field(default=3, description="Maximum summary chunks loaded in full for update per incremental extraction")
+
+    def embedding_dimensions(self, model: str) -> int:
+        """
+        Output dimensionality requested from an embedding model.
+
+        A model entry may set "dimensions" to truncate its Matryoshka
+        embeddings; otherwise EMBEDDING_DIMENSIONS is used.
+        """
+        return int(self.EMBEDDING_MODELS.get(model, {}).get("dimensions", self.EMBEDDING_DIMENSIONS))
+
+    @model_validator(mode="after")
+    def check_embedding_dimensions(self):
+        if self.EMBEDDING_DIMENSIONS not in SUPPORTED_EMBEDDING_DIMENSIONS:
+            raise ValueError(f"EMBEDDING_DIMENSIONS must be one of {SUPPORTED_EMBEDDING_DIMENSIONS}")
+        for model, model_config in self.EMBEDDING_MODELS.items():
+            dimensions = self.embedding_dimensions(model)
+            if dimensions not in SUPPORTED_EMBEDDING_DIMENSIONS:
+                raise ValueError(f"{model} dimensions must be one of {SUPPORTED_EMBEDDING_DIMENSIONS}")
+            if dimensions > int(model_config.get("max_dimensions", dimensions)):
+                raise ValueError(f"{model} produces at most {model_config['max_dimensions']} dimensions, got {dimensions}")
+        return self
 
     @property
     def PROVIDER_MODELS_KEYS(self) -> Dict[str, str]:
@@ -84,7 +189,10 @@ class Settings(BaseSettings):
     
     @property
     def EMBEDDING_MODELS_KEYS(self) -> Dict[str, str]:
-        return {v["display"]: k for k, v in self.EMBEDDING_MODELS.items()}
+        return {
+            v["display"]: k for k, v in self.EMBEDDING_MODELS.items()
+            if v["provider"] in self.EMBEDDING_UI_PROVIDERS
+        }
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,7 +1,6 @@
 """
 AgentCore Memory-enabled Agent.
 """
-import asyncio
 import chainlit as cl
 
 from typing import List, Optional
@@ -17,6 +16,7 @@ from llama_index.llms.anthropic import Anthropic
 
 from src.storage.models import ExchangeMessage
 from src.core.session_manager import AgentCoreMemorySessionManager
+from src.core.extraction_queue import submit_memory_extraction
 from src.config.settings import settings as config_settings
 
 class Agent:
@@ -54,7 +54,11 @@ class Agent:
         # Initialize memory
         self.memory = ChatMemoryBuffer.from_defaults(token_limit=40000)
         self.llm = self._get_llm()
-        # Initialize agent
+        # Initialize agent; with the prefetched context injected, the first retrieval tool call is no longer needed
+        self._agent = self._build_agent(force_memory_retrieval=not self.is_memory_injected())
+    
+    def _build_agent(self, force_memory_retrieval: bool) -> FunctionAgent:
+        """Build the function agent, forcing a first retrieval tool call on OpenAI models if requested."""
         agent_kwargs = {
             "tools": self.tools,
             "llm": self.llm,
@@ -62,10 +66,9 @@ class Agent:
             "verbose": self.verbose,
             "system_prompt": self.system_prompt,
         }
-        if self.is_openai_model():
+        if self.is_openai_model() and force_memory_retrieval:
             agent_kwargs["initial_tool_choice"] = "retrieve_memory_context"
-        
-        self._agent = FunctionAgent(**agent_kwargs)
+        return FunctionAgent(**agent_kwargs)
     
     async def invoke(self, user_message: str) -> str:
         """
@@ -77,7 +80,7 @@ class Agent:
         Returns:
             Agent's response
         """
-        thread_messages = self.session_manager.get_chat_history()
+        thread_messages = await self.session_manager.get_chat_history()
         formatted_messages = self.session_manager.format_messages_for_llm(thread_messages)
         chat_history: list = cl.user_session.get("chat_history", formatted_messages)
         
@@ -85,12 +88,22 @@ class Agent:
         if is_all_exchanges_selected:
             messages_to_send = thread_messages
         else:
-            recent_chat_messages = self.session_manager.get_recent_chat_history(
+            recent_chat_messages = await self.session_manager.get_recent_chat_history(
                 limit=self.session_manager.config.no_of_exchanges_to_llm * 2
             )
             messages_to_send = recent_chat_messages
         
         recent_chat_history = self._prepare_messages(messages=messages_to_send)
+        if self.is_memory_injected():
+            memory_context = await self.session_manager.get_prefetched_memory_context(
+                query=user_message,
+                timeout=config_settings.MEMORY_PREFETCH_INJECT_TIMEOUT_SECONDS,
+            )
+            if memory_context is None:
+                # Prefetch timed out or failed; retrieve through the tool call as without injection
+                self._agent = self._build_agent(force_memory_retrieval=True)
+            elif memory_context:
+                recent_chat_history.insert(0, ChatMessage(role=MessageRole.SYSTEM, content=memory_context))
         ctx = Context(self._agent)
         agent_handler = self._agent.run(
             user_msg=user_message,
@@ -118,8 +131,8 @@ class Agent:
                     await msg.stream_token(event.delta)
                     final_assistant_response += event.delta
         
-        self.session_manager.save_message("user", user_message)
-        self.session_manager.save_message("assistant", final_assistant_response)
+        await self.session_manager.save_message("user", user_message)
+        await self.session_manager.save_message("assistant", final_assistant_response)
         
         await msg.send()
         chat_history.append({"role": "user", "content": user_message})
@@ -127,9 +140,7 @@ class Agent:
         cl.user_session.set("chat_history", chat_history)
         is_extraction_enabled = self.session_manager.config.memory_strategies and len(self.session_manager.config.memory_strategies) > 0
         if is_extraction_enabled:
-            asyncio.create_task(
-                self.session_manager.process_conversation_for_memory()
-            )
+            await submit_memory_extraction(self.session_manager.config)
         return final_assistant_response
 
     def _prepare_messages(self, messages: List[ExchangeMessage]) -> List[ChatMessage]:
@@ -161,6 +172,14 @@ class Agent:
         }
         return llm_creators.get(provider)
     
+    def is_memory_injected(self) -> bool:
+        """Check if the prefetched memory context is injected into the agent's input."""
+        return (
+            config_settings.MEMORY_PREFETCH_ENABLED
+            and config_settings.MEMORY_PREFETCH_INJECT
+            and any(tool.metadata.name == "retrieve_memory_context" for tool in self.tools)
+        )
+    
     def is_openai_model(self) -> bool:
         """Check if the LLM is OpenAI."""
         model_config = config_settings.PROVIDER_MODELS.get(self.session_manager.config.model)
@@ -0,0 +1,176 @@
+"""
+Token-budgeted memory context assembly.
+
+Every retrieved memory used to be concatenated into the memory context, so a
+few long Detailed Summary blobs could push thousands of tokens into every
+turn. The assembler counts tokens with the chat model's tokenizer and fills
+config.token_limit with the highest-scoring memories: first the best memory
+of each strategy, each capped at a share of the budget weighted by its
+score, then the rest in score order across strategies. A memory that does
+not fit is truncated to the remaining budget, or dropped when too little
+budget is left to be useful.
+"""
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken ships with llama-index
+    tiktoken = None
+
+from src.strategies.base import MemoryStrategy
+
+CONTEXT_HEADER = "\n\n".join([
+    "## RELEVANT MEMORIES",
+    "The following information has been remembered from previous conversations:",
+    "",
+    "",
+])
+TRUNCATION_MARKER = " …[truncated]"
+# Formatting around each memory ("### Summary Memory 3 [Score: 0.8123]. ") and each strategy section
+MEMORY_OVERHEAD_TOKENS = 16
+STRATEGY_OVERHEAD_TOKENS = 16
+# Truncating a memory to fewer tokens than this keeps too little of it to be worth the space
+MIN_TRUNCATED_TOKENS = 48
+DEFAULT_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """
+    Get the tiktoken encoding used to count a chat model's tokens.
+
+    OpenAI models use their own encoding. Anthropic tokenizers are not
+    available locally, so they are approximated with o200k_base, which
+    counts within a few percent for English text.
+
+    Args:
+        model: Chat model name
+    Returns:
+        tiktoken Encoding, or None when tiktoken is not installed
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+class TruncatedMemory:
+    """A memory with shortened content; other attributes come from the original."""
+
+    def __init__(self, memory, content: str):
+        self._memory = memory
+        self.content = content
+
+    def __getattr__(self, name):
+        return getattr(self._memory, name)
+
+
+class ContextAssembler:
+    """Fits retrieved memories of several strategies into a token budget."""
+
+    def __init__(self, token_limit: int, model: str):
+        """
+        Initialize the assembler.
+
+        Args:
+            token_limit: Maximum tokens of the assembled memory context
+            model: Chat model whose tokenizer counts the tokens
+        """
+        self.token_limit = token_limit
+        self.model = model
+        self.encoding = get_encoding(model)
+
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens of a text (estimated at four characters per token without tiktoken)."""
+        if self.encoding is None:
+            return (len(text) + 3) // 4
+        return len(self.encoding.encode(text))
+
+    def assemble(self, strategies: Dict[str, MemoryStrategy], strategy_memories: Dict[str, list]) -> str:
+        """
+        Format the memories of each strategy into one context within the token budget.
+
+        Args:
+            strategies: Strategies by id, in display order
+            strategy_memories: Retrieved (memory, score) rows (or plain memories) by strategy id
+        Returns:
+            Formatted memory context, or "" when there is nothing to include
+        """
+        candidates = [
+            (strategy_id, rank, memory, score)
+            for strategy_id in strategies
+            for rank, (memory, score) in enumerate(self._scored(strategy_memories.get(strategy_id, [])))
+        ]
+        if not candidates:
+            return ""
+        # Each strategy's best memory first so a high-scoring strategy cannot starve the others
+        candidates.sort(key=lambda candidate: (candidate[1] > 0, -candidate[3]))
+
+        budget = self.token_limit - self.count_tokens(CONTEXT_HEADER)
+        # Until every strategy has its best memory in, each may use at most its score-weighted share
+        best_scores = {strategy_id: max(score, 0.0) for strategy_id, rank, _, score in candidates if rank == 0}
+        total_score = sum(best_scores.values())
+        shares = {
+            strategy_id: budget * (score / total_score if total_score else 1 / len(best_scores))
+            for strategy_id, score in best_scores.items()
+        }
+        selected: Dict[str, List[Tuple[int, object, float]]] = {}
+        dropped = truncated = 0
+        for strategy_id, rank, memory, score in candidates:
+            overhead = MEMORY_OVERHEAD_TOKENS + (0 if strategy_id in selected else STRATEGY_OVERHEAD_TOKENS)
+            tokens = self.count_tokens(memory.content)
+            limit = min(budget, int(shares[strategy_id])) if rank == 0 else budget
+            if overhead + tokens > limit:
+                available = limit - overhead - self.count_tokens(TRUNCATION_MARKER)
+                if available < MIN_TRUNCATED_TOKENS:
+                    dropped += 1
+                    continue
+                memory = TruncatedMemory(memory, self.truncate(memory.content, available))
+                tokens = self.count_tokens(memory.content)
+                truncated += 1
+            budget -= overhead + tokens
+            selected.setdefault(strategy_id, []).append((rank, memory, score))
+
+        context = self._format(strategies, selected)
+        # The per-memory overheads are estimates; shed the lowest-scoring memories if they were short
+        while context and self.count_tokens(context) > self.token_limit:
+            strategy_id, position = min(
+                ((strategy_id, position) for strategy_id, rows in selected.items() for position in range(len(rows))),
+                key=lambda item: selected[item[0]][item[1]][2],
+            )
+            selected[strategy_id].pop(position)
+            if not selected[strategy_id]:
+                del selected[strategy_id]
+            dropped += 1
+            context = self._format(strategies, selected)
+        if dropped or truncated:
+            print(f"Memory context fit to {self.token_limit} tokens: {truncated} truncated, {dropped} dropped.")
+        return context
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Keep the first max_tokens tokens of a text and mark it as truncated."""
+        if self.encoding is None:
+            return text[:max_tokens * 4] + TRUNCATION_MARKER
+        return self.encoding.decode(self.encoding.encode(text)[:max_tokens]) + TRUNCATION_MARKER
+
+    def _format(self, strategies: Dict[str, MemoryStrategy], selected: Dict[str, list]) -> str:
+        """Format the selected memories in retrieval order, one section per strategy."""
+        sections = []
+        for strategy_id, strategy in strategies.items():
+            rows = sorted(selected.get(strategy_id, []), key=lambda row: row[0])
+            if not rows:
+                continue
+            formatted = strategy.format_memories_for_context([(memory, score) for _, memory, score in rows])
+            if formatted:
+                sections.append(f"### {strategy_id.upper()} MEMORIES\n{formatted}")
+        if not sections:
+            return ""
+        return CONTEXT_HEADER + "\n\n".join(sections)
+
+    @staticmethod
+    def _scored(memories: list) -> List[Tuple[object, float]]:
+        """Normalize rows to (memory, score); plain memories score 0."""
+        return [item if isinstance(item, tuple) else (item, 0.0) for item in memories]
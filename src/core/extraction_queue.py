@@ -0,0 +1,356 @@
+"""
+Durable memory extraction queue.
+
+Extraction used to start as an untracked asyncio task on the web worker's
+event loop, so it was lost on restart and competed with chat traffic. Jobs
+are now rows of MemoryExtractionJob, one per (thread, message watermark,
+mode), claimed by ExtractionWorker with FOR UPDATE SKIP LOCKED. A claimed job
+stays hidden for a visibility timeout, which its worker keeps extending while
+the job runs, so only a job whose worker died is picked up again; failures
+are retried with exponential backoff up to EXTRACTION_JOB_MAX_ATTEMPTS.
+
+Extraction is single-flight per thread: an asyncio lock within the process
+and a Postgres advisory lock across processes, so overlapping extractions
+never read the same unsummarized messages. Enqueuing is debounced: replies
+arriving while the thread's job is still pending move that job to the new
+watermark, and the job remembers the oldest one it absorbed, so a burst
+becomes one extraction over the combined window.
+
+API keys are never written to the queue. The enqueuing process remembers the
+user's keys in memory; a worker in another process uses the keys of its own
+environment (settings.OPENAI_API_KEY, ...).
+"""
+import asyncio
+import contextvars
+import os
+import socket
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Dict, Optional, Set
+
+from .memory_config import AgentCoreMemoryConfig
+from .session_manager import AgentCoreMemorySessionManager
+from src.config.settings import settings
+from src.storage.async_repository import AsyncRepository
+from src.storage.models import MemoryExtractionJob
+
+API_KEY_FIELDS = ("openai_api_key", "anthropic_api_key", "gemini_api_key")
+# Contexts kept for jobs enqueued by this process (bounded; jobs claimed elsewhere never pop theirs)
+MAX_JOB_CONTEXTS = 1000
+
+# Per user, the API keys of the latest session that enqueued a job in this process
+_api_keys: Dict[str, Dict[str, Optional[str]]] = {}
+# Per idempotency key, the Chainlit context that enqueued the job, so an
+# in-process worker can show the extraction step in that session
+_job_contexts: "OrderedDict[str, contextvars.Context]" = OrderedDict()
+_workers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ExtractionWorker]" = weakref.WeakKeyDictionary()
+# Advisory lock namespace of the per-thread extraction locks
+EXTRACTION_LOCK_NAMESPACE = 0x4D58
+_thread_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+# Unqueued extractions; the event loop only keeps weak references to tasks
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def extraction_idempotency_key(thread_id: str, watermark: int, is_process_next_messages: bool = False) -> str:
+    """Idempotency key of the extraction of a thread up to a message watermark."""
+    mode = "final" if is_process_next_messages else "turn"
+    return f"{thread_id}:{watermark}:{mode}"
+
+
+def extraction_job_config(job: MemoryExtractionJob) -> AgentCoreMemoryConfig:
+    """Rebuild the session manager configuration of a job, adding the API keys available to this process."""
+    config = dict(job.payload["config"])
+    api_keys = _api_keys.get(job.userId) or {
+        "openai_api_key": settings.OPENAI_API_KEY,
+        "anthropic_api_key": settings.ANTHROPIC_API_KEY,
+        "gemini_api_key": settings.GEMINI_API_KEY,
+    }
+    return AgentCoreMemoryConfig(**config, **api_keys)
+
+
+@asynccontextmanager
+async def thread_extraction_lock(thread_id: str, repository: AsyncRepository) -> AsyncIterator[bool]:
+    """
+    Single-flight guard of a thread's extraction, without waiting.
+
+    Yields:
+        True when no other extraction of the thread runs in this process
+        or, per its advisory lock, in any other one
+    """
+    lock = _thread_locks.get(thread_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _thread_locks[thread_id] = lock
+    if lock.locked():
+        yield False
+        return
+    async with lock:
+        async with repository.advisory_lock(EXTRACTION_LOCK_NAMESPACE, thread_id) as acquired:
+            yield acquired
+
+
+async def submit_memory_extraction(
+    config: AgentCoreMemoryConfig,
+    is_process_next_messages: bool = False,
+    repository: Optional[AsyncRepository] = None,
+) -> Optional[int]:
+    """
+    Schedule memory extraction for a thread.
+
+    With settings.EXTRACTION_QUEUE_ENABLED the extraction is enqueued (once
+    per thread, message watermark and mode) and the in-process worker, if
+    enabled, is woken; otherwise it runs as a background task of this process.
+
+    Args:
+        config: Session memory configuration
+        is_process_next_messages: Extract every unsummarized message (end of chat)
+        repository: Repository to enqueue with
+    Returns:
+        Id of the enqueued job, or None when nothing was enqueued or
+        scheduling failed (logged; extraction never fails a chat turn)
+    """
+    try:
+        return await _schedule_memory_extraction(config, is_process_next_messages, repository or AsyncRepository())
+    except Exception as e:
+        print(f"Error scheduling memory extraction for thread {config.thread_id}: {e}")
+        return None
+
+
+async def _schedule_memory_extraction(
+    config: AgentCoreMemoryConfig,
+    is_process_next_messages: bool,
+    repository: AsyncRepository,
+) -> Optional[int]:
+    """Enqueue or start the extraction of a thread (see submit_memory_extraction)."""
+    if not settings.EXTRACTION_QUEUE_ENABLED:
+        session_manager = AgentCoreMemorySessionManager(agent_core_memory_config=config)
+        task = asyncio.create_task(_run_unqueued(session_manager, is_process_next_messages, repository))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        return None
+
+    watermark = await repository.get_thread_watermark(config.thread_id)
+    if watermark is None:
+        return None
+    idempotency_key = extraction_idempotency_key(config.thread_id, watermark, is_process_next_messages)
+    _api_keys[config.user_id] = {field: getattr(config, field) for field in API_KEY_FIELDS}
+    entry = {
+        "idempotencyKey": idempotency_key,
+        "threadId": config.thread_id,
+        "userId": config.user_id,
+        "watermark": watermark,
+        "payload": {
+            "config": config.model_dump(exclude=set(API_KEY_FIELDS)),
+            "is_process_next_messages": is_process_next_messages,
+            # Kept by debounce merges, which move the job to newer watermarks
+            "from_watermark": watermark,
+        },
+        "maxAttempts": settings.EXTRACTION_JOB_MAX_ATTEMPTS,
+    }
+    job_id = await repository.enqueue_extraction_job(
+        entry,
+        debounce=timedelta(seconds=settings.EXTRACTION_DEBOUNCE_SECONDS),
+        max_delay=timedelta(seconds=settings.EXTRACTION_DEBOUNCE_MAX_SECONDS),
+    )
+    if job_id is None:
+        print(f"Memory extraction {idempotency_key} already enqueued.")
+        return None
+    _job_contexts[idempotency_key] = contextvars.copy_context()
+    while len(_job_contexts) > MAX_JOB_CONTEXTS:
+        _job_contexts.popitem(last=False)
+    worker = start_extraction_worker()
+    if worker is not None:
+        worker.wake()
+    return job_id
+
+
+async def _run_unqueued(
+    session_manager: AgentCoreMemorySessionManager,
+    is_process_next_messages: bool,
+    repository: AsyncRepository,
+):
+    """Run an extraction as an untracked background task (queue disabled), unless one already runs for the thread."""
+    try:
+        async with thread_extraction_lock(session_manager.config.thread_id, repository) as acquired:
+            if not acquired:
+                print(f"Memory extraction already running for thread {session_manager.config.thread_id}; skipped.")
+                return
+            await session_manager.process_conversation_for_memory(is_process_next_messages=is_process_next_messages)
+    except Exception as e:
+        print(f"Error processing memories: {e}")
+
+
+class ExtractionWorker:
+    """Claims extraction jobs from the queue and runs up to `concurrency` of them at a time."""
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        repository: Optional[AsyncRepository] = None,
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            worker_id: Identifier recorded on claimed jobs (default: host:pid:random)
+            concurrency: Jobs run concurrently (default: settings.EXTRACTION_WORKER_CONCURRENCY)
+            poll_interval: Seconds to wait between polls of an empty queue
+            repository: Repository to claim jobs with
+        """
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency or settings.EXTRACTION_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval if poll_interval is not None else settings.EXTRACTION_QUEUE_POLL_SECONDS
+        self.repository = repository or AsyncRepository()
+        self.visibility_timeout = timedelta(seconds=settings.EXTRACTION_JOB_VISIBILITY_TIMEOUT_SECONDS)
+        self.heartbeat_interval = settings.EXTRACTION_JOB_HEARTBEAT_SECONDS
+        self._wakeup = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+        self._stopping = False
+        self.task: Optional[asyncio.Task] = None
+        self.completed = 0
+        self.failed = 0
+
+    def wake(self):
+        """Poll the queue now instead of after the poll interval."""
+        self._wakeup.set()
+
+    def stop(self):
+        """Stop claiming jobs; run() returns once the running jobs finish."""
+        self._stopping = True
+        self._wakeup.set()
+
+    async def run(self):
+        """Claim and run jobs until stop() is called."""
+        print(f"Extraction worker {self.worker_id} started (concurrency {self.concurrency}).")
+        await self.purge()
+        while not self._stopping:
+            free = self.concurrency - len(self._running)
+            if free > 0:
+                try:
+                    jobs = await self.repository.claim_extraction_jobs(self.worker_id, free, self.visibility_timeout)
+                except Exception as e:
+                    print(f"Error claiming extraction jobs: {e}")
+                    jobs = []
+                for job in jobs:
+                    # Jobs from this process run in their session's context; others in a fresh one
+                    context = _job_contexts.pop(job.idempotencyKey, None) or contextvars.Context()
+                    task = asyncio.create_task(self.process_job(job), context=context)
+                    self._running.add(task)
+                    task.add_done_callback(self._job_finished)
+            # Woken by a new job or a finished one, or poll again after the interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        print(f"Extraction worker {self.worker_id} stopped ({self.completed} completed, {self.failed} failed).")
+
+    async def process_job(self, job: MemoryExtractionJob):
+        """Run one claimed job and record its outcome."""
+        try:
+            async with self.heartbeat(job), thread_extraction_lock(job.threadId, self.repository) as acquired:
+                if not acquired:
+                    await self.defer(job)
+                    return
+                session_manager = AgentCoreMemorySessionManager(agent_core_memory_config=extraction_job_config(job))
+                await session_manager.process_conversation_for_memory(
+                    is_process_next_messages=job.payload.get("is_process_next_messages", False),
+                    watermark=job.watermark,
+                    from_watermark=job.payload.get("from_watermark", job.watermark),
+                )
+        except Exception as e:
+            self.failed += 1
+            retry_delay = self.retry_delay(job.attempts) if job.attempts < job.maxAttempts else None
+            outcome = f"retrying in {retry_delay.total_seconds():.0f}s" if retry_delay else "giving up"
+            print(f"Error in extraction job {job.id} (attempt {job.attempts}/{job.maxAttempts}), {outcome}: {e}")
+            try:
+                await self.repository.fail_extraction_job(job.id, self.worker_id, str(e), retry_delay)
+            except Exception as record_error:
+                print(f"Error recording extraction job {job.id} failure: {record_error}")
+            return
+        self.completed += 1
+        try:
+            await self.repository.complete_extraction_job(job.id, job.watermark)
+        except Exception as e:
+            print(f"Error completing extraction job {job.id}: {e}")
+
+    @asynccontextmanager
+    async def heartbeat(self, job: MemoryExtractionJob) -> AsyncIterator[None]:
+        """Extend the job's visibility timeout every heartbeat interval while the block runs."""
+        async def beat():
+            while True:
+                await asyncio.sleep(self.heartbeat_interval)
+                try:
+                    held = await self.repository.extend_extraction_job(job.id, self.worker_id, self.visibility_timeout)
+                except Exception as e:
+                    print(f"Error extending extraction job {job.id}: {e}")
+                    continue
+                if not held:
+                    print(f"Extraction job {job.id} is no longer held by {self.worker_id}; heartbeat stopped.")
+                    return
+
+        task = asyncio.create_task(beat())
+        try:
+            yield
+        finally:
+            task.cancel()
+
+    async def defer(self, job: MemoryExtractionJob):
+        """Hand back a job whose thread is being extracted elsewhere; it runs after that extraction."""
+        delay = timedelta(seconds=max(settings.EXTRACTION_DEBOUNCE_SECONDS, self.poll_interval))
+        print(f"Thread {job.threadId} is being extracted elsewhere; extraction job {job.id} deferred.")
+        # Keep the session context for when the job is claimed again
+        _job_contexts[job.idempotencyKey] = contextvars.copy_context()
+        try:
+            await self.repository.defer_extraction_job(job.id, self.worker_id, delay)
+        except Exception as e:
+            print(f"Error deferring extraction job {job.id}: {e}")
+
+    @staticmethod
+    def retry_delay(attempts: int) -> timedelta:
+        """Exponential backoff after the given number of attempts."""
+        seconds = settings.EXTRACTION_JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+        return timedelta(seconds=min(seconds, settings.EXTRACTION_JOB_RETRY_MAX_SECONDS))
+
+    async def purge(self):
+        """Delete jobs finished longer than settings.EXTRACTION_JOB_RETENTION_HOURS ago."""
+        try:
+            removed = await self.repository.purge_extraction_jobs(
+                timedelta(hours=settings.EXTRACTION_JOB_RETENTION_HOURS)
+            )
+        except Exception as e:
+            print(f"Error purging extraction jobs: {e}")
+            return
+        if removed:
+            print(f"Purged {removed} finished extraction jobs.")
+
+    def _job_finished(self, task: asyncio.Task):
+        """Free the job's slot and look for more work."""
+        self._running.discard(task)
+        self._wakeup.set()
+
+
+def start_extraction_worker() -> Optional[ExtractionWorker]:
+    """
+    Start the in-process extraction worker on the running event loop, once.
+
+    Returns:
+        The worker, or None when the queue or the in-process worker is disabled
+    """
+    if not settings.EXTRACTION_QUEUE_ENABLED or not settings.EXTRACTION_QUEUE_IN_PROCESS_WORKER:
+        return None
+    loop = asyncio.get_running_loop()
+    worker = _workers.get(loop)
+    if worker is None:
+        worker = ExtractionWorker()
+        _workers[loop] = worker
+        # A fresh context so the worker loop does not inherit the Chainlit session that started it
+        worker.task = loop.create_task(worker.run(), context=contextvars.Context())
+    return worker
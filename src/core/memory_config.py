@@ -17,12 +17,18 @@ class AgentCoreMemoryConfig(BaseModel):
     model: str = Field(..., description="Model name for LLM interactions")
     summarization_model: str = Field(..., description="Model name for summarization tasks")
     embedding_model: str = Field(..., description="Model name for embedding generation")
+    legacy_embedding_retrieval: bool = Field(default=False, description="Search the legacy ThreadMemory.embedding column instead of embedding_model's vectors (while memories stored before migration 004 are re-embedded)")
     openai_api_key: Optional[str] = Field(default=None, description="OpenAI API Key")
     anthropic_api_key: Optional[str] = Field(default=None, description="Anthropic API Key")
     gemini_api_key: Optional[str] = Field(default=None, description="Google Gemini API Key")
     summary_score: float = Field(default=0.3, description="Threshold score for summary relevance")
     semantic_score: float = Field(default=0.2, description="Threshold score for semantic relevance")
     user_preference_score: float = Field(default=0.1, description="Threshold score for user preference relevance")
+    hnsw_ef_search: int = Field(default=40, description="HNSW candidate list size used for each memory search (hnsw.ef_search)")
+    hnsw_iterative_scan: Optional[str] = Field(default=None, description="hnsw.iterative_scan mode for filtered searches (strict_order, relaxed_order; pgvector >= 0.8)")
+    retrieval_mode: str = Field(default="vector", description="Memory retrieval mode: vector, or hybrid to fuse full-text and vector matches")
+    extraction_mode: str = Field(default="separate", description="Memory extraction mode: separate (one LLM call per strategy) or fused (one call for all strategies)")
+    summary_extraction_mode: str = Field(default="full", description="Summary extraction mode: full (replay every chunk) or incremental (route through the topic index, load only chunks to update)")
     
     class Config:
         frozen = True
\ No newline at end of file
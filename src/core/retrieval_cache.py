@@ -0,0 +1,162 @@
+"""
+Retrieval result cache.
+
+Within a conversation the agent often calls retrieve_memory_context with the
+same or a near-identical query. Formatted memory contexts are cached
+process-wide (a session manager is built per message) keyed by user, thread
+scope, strategy set, thresholds, search settings and the normalized query.
+A memory write to a user/strategy drops exactly the entries that include
+that strategy for that user; entries also expire after a TTL and are
+evicted LRU by total size.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, Optional
+
+from src.config.settings import settings
+from src.storage.invalidation import register_memory_write_listener
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case a query, collapse whitespace and strip surrounding punctuation."""
+    return _whitespace.sub(" ", query.lower()).strip(" \t\n.,;:!?\"'")
+
+
+class _CacheEntry:
+    """Cached context with the user and strategies it was built from."""
+
+    def __init__(self, value: str, user_id: str, strategies: FrozenSet[str]):
+        self.value = value
+        self.user_id = user_id
+        self.strategies = strategies
+        self.created_at = time.monotonic()
+        self.nbytes = len(value.encode("utf-8")) + 256
+
+
+class RetrievalCache:
+    """LRU cache of formatted memory contexts with write-driven invalidation."""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl: float = 120.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Total size of cached contexts before LRU eviction
+            ttl: Seconds after which an entry expires
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        # Bumped by every invalidation so results computed across a write are not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def generation(self) -> int:
+        """Take before retrieving and pass to put()."""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Return the cached context for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl:
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: str, user_id: str, strategies, generation: Optional[int] = None):
+        """
+        Cache a context built from a user's memories of the given strategies.
+
+        Args:
+            generation: Value of self.generation before the retrieval started;
+                the value is not stored when a memory write happened since
+        """
+        entry = _CacheEntry(value, user_id, frozenset(getattr(strategy, "value", strategy) for strategy in strategies))
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._discard(key)
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_id: Optional[str] = None, strategy: Optional[str] = None):
+        """Drop the entries of a user (all users when None) that include the strategy (any when None)."""
+        with self._lock:
+            self._generation += 1
+            for key, entry in list(self._entries.items()):
+                if user_id is not None and entry.user_id != user_id:
+                    continue
+                if strategy is not None and strategy not in entry.strategies:
+                    continue
+                self._discard(key)
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and cached size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+    def _discard(self, key: Hashable):
+        """Remove an entry; the caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+
+_retrieval_cache: Optional[RetrievalCache] = None
+
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """Get the process-wide retrieval cache, or None when settings.RETRIEVAL_CACHE_ENABLED is off."""
+    global _retrieval_cache
+    if not settings.RETRIEVAL_CACHE_ENABLED:
+        return None
+    if _retrieval_cache is None:
+        _retrieval_cache = RetrievalCache(
+            max_bytes=settings.RETRIEVAL_CACHE_MAX_BYTES,
+            ttl=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+        )
+    return _retrieval_cache
+
+
+def _invalidate_retrieval_cache(user_id: Optional[str], strategy: Optional[str], embedding_model: Optional[str]):
+    """Memory write listener dropping the affected cached contexts."""
+    if _retrieval_cache is not None:
+        _retrieval_cache.invalidate(user_id=user_id, strategy=strategy)
+
+
+register_memory_write_listener(_invalidate_retrieval_cache)
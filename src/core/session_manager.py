@@ -3,15 +3,20 @@ AgentCore Memory Session Manager.
 """
 import asyncio
 import chainlit as cl
-from typing import List, Dict, Optional
+from chainlit.context import ChainlitContextException
+from typing import List, Dict, Optional, Tuple
 from .memory_config import AgentCoreMemoryConfig
-from src.storage.repository import Repository
+from .retrieval_cache import get_retrieval_cache, normalize_query
+from .context_assembler import ContextAssembler
+from src.storage.async_repository import AsyncRepository
 from src.storage.models import ExchangeMessage
 from src.strategies.base import MemoryStrategy
 from src.strategies.summary import SummaryMemoryStrategy
 from src.strategies.user_preference import UserPreferenceMemoryStrategy
 from src.strategies.semantic import SemanticMemoryStrategy
+from src.strategies.fused import FusedMemoryExtraction
 from src.storage.enums import MemoryStrategyEnums
+from src.config.settings import settings
 from llama_index.embeddings.openai import OpenAIEmbedding
 
 
@@ -30,7 +35,7 @@ class AgentCoreMemorySessionManager:
             strategies: List of strategy IDs to use (default: all)
         """
         self.config = agent_core_memory_config
-        self.repository = Repository()
+        self.repository = AsyncRepository()
         
         # Initialize strategies
         self.strategies: Dict[str, MemoryStrategy] = {}
@@ -44,8 +49,15 @@ class AgentCoreMemorySessionManager:
             elif strategy_id == MemoryStrategyEnums.SEMANTIC.value:
                 self.strategies[strategy_id] = SemanticMemoryStrategy(config=agent_core_memory_config)
         
+        # Query embeddings computed during this turn, keyed by (embedding model, query text)
+        self._query_embeddings: Dict[Tuple[str, str], List[float]] = {}
+        # Retrievals started ahead of the agent's tool call, keyed like the retrieval cache
+        self._prefetches: Dict[Tuple, asyncio.Task] = {}
+        # Memories of the prefetch strategies for the incoming message, served to the turn's first tool call
+        self._strategy_prefetch: Optional[asyncio.Task] = None
+        
     
-    def get_chat_history(
+    async def get_chat_history(
         self, 
         is_summarized: Optional[bool] = None, 
         limit: Optional[int] = None
@@ -59,7 +71,7 @@ class AgentCoreMemorySessionManager:
         Returns:
             List of message dictionaries
         """
-        return self.repository.get_thread_messages(
+        return await self.repository.get_thread_messages(
             thread_id=self.config.thread_id,
             is_summarized=is_summarized,
             limit=limit
@@ -90,7 +102,7 @@ class AgentCoreMemorySessionManager:
         """
         return [msg.id for msg in messages]
     
-    def get_recent_chat_history(self, limit: Optional[int] = None):
+    async def get_recent_chat_history(self, limit: Optional[int] = None):
         """
         Retrieve chat history from database.
         
@@ -100,12 +112,12 @@ class AgentCoreMemorySessionManager:
         Returns:
             List of message dictionaries
         """
-        return self.repository.get_recent_thread_messages(
+        return await self.repository.get_recent_thread_messages(
             thread_id=self.config.thread_id,
             limit=limit
         )
             
-    def save_message(self, role: str, content: str, metadata: Optional[Dict] = None):
+    async def save_message(self, role: str, content: str, metadata: Optional[Dict] = None):
         """
         Save a message to the database.
         
@@ -114,7 +126,7 @@ class AgentCoreMemorySessionManager:
             content: Message content
             metadata: Optional metadata
         """
-        self.repository.save_message(
+        await self.repository.save_message(
             thread_id=self.config.thread_id,
             role=role,
             content=content,
@@ -134,90 +146,361 @@ class AgentCoreMemorySessionManager:
         Returns:
             Formatted memory context string
         """
-        all_memories = []
-        retrieval_tasks = [
-            self.retrieve_and_format_memories(
-                strategy_id=strategy_id, 
-                strategy=strategy,
-                query=query,
-                thread_id=thread_id
-            )
-            for strategy_id, strategy in self.strategies.items()
+        if not self.strategies:
+            return ""
+        cache_key = self.retrieval_cache_key(query, thread_id)
+        prefetch = self._prefetches.get(cache_key)
+        if prefetch is not None:
+            memory_context = await asyncio.shield(prefetch)
+            if memory_context is not None:
+                print("Memory context served from prefetch.")
+                return memory_context
+        if thread_id is None and self._strategy_prefetch is not None:
+            memory_context = await self._retrieve_with_prefetched_memories(query)
+            if memory_context is not None:
+                return memory_context
+        return await self._retrieve_cached_memory_context(cache_key, query, thread_id)
+    
+    def prefetch_strategy_memories(self, query: str) -> Optional[asyncio.Task]:
+        """
+        Start retrieving the prefetch strategies' memories for an incoming message.
+        
+        Called with the user message before the agent runs, so the user
+        preference and semantic retrieval overlaps agent setup and the
+        LLM's first (forced) tool call. The turn's first cross-conversation
+        retrieve_memory_context call takes these memories instead of
+        searching them again with its own query.
+        
+        Args:
+            query: Incoming user message
+        Returns:
+            The prefetch task, or None when prefetching is disabled or no prefetch strategy is enabled
+        """
+        if not settings.MEMORY_PREFETCH_ENABLED:
+            return None
+        strategy_ids = [
+            strategy_id for strategy_id in self.strategies
+            if strategy_id in settings.MEMORY_PREFETCH_STRATEGIES
         ]
+        if not strategy_ids:
+            return None
+        if self._strategy_prefetch is None:
+            self._strategy_prefetch = asyncio.create_task(self._prefetch_strategy_memories(query, strategy_ids))
+        return self._strategy_prefetch
+    
+    async def _prefetch_strategy_memories(self, query: str, strategy_ids: List[str]) -> Optional[Dict[str, list]]:
+        """Strategy prefetch task body; failures are reported and leave the tool call to retrieve again."""
+        try:
+            return await self._retrieve_strategy_memories(query, None, strategy_ids)
+        except Exception as e:
+            print(f"Error prefetching strategy memories: {e}")
+            return None
+    
+    async def _retrieve_with_prefetched_memories(self, query: str) -> Optional[str]:
+        """
+        Build the first tool call's context from the prefetched strategy memories.
         
-        results = await asyncio.gather(*retrieval_tasks)
+        The prefetch is consumed here, so later calls in the turn search
+        with their own queries. Strategies that were not prefetched are
+        retrieved with the tool call's query.
         
-        all_memories = [result for result in results if result is not None]
+        Returns:
+            Formatted memory context, or None when the prefetch failed
+        """
+        prefetch, self._strategy_prefetch = self._strategy_prefetch, None
+        prefetched = await asyncio.shield(prefetch)
+        if prefetched is None:
+            return None
+        strategy_memories = dict(prefetched)
+        remaining = [strategy_id for strategy_id in self.strategies if strategy_id not in prefetched]
+        if remaining:
+            strategy_memories.update(await self._retrieve_strategy_memories(query, None, remaining))
+        print("Prefetched strategy memories served to the memory tool call.")
+        return self._assemble_memory_context(strategy_memories)
+    
+    def prefetch_memory_context(self, query: str, thread_id: Optional[str] = None) -> Optional[asyncio.Task]:
+        """
+        Start retrieving the memory context for a query in the background.
         
-        if not all_memories:
-            print("No relevant memories found.")
-            return ""
-        print("Relevant memories retrieved for context.")
-        return "\n\n".join([
-            "## RELEVANT MEMORIES",
-            "The following information has been remembered from previous conversations:",
-            "",
-            *all_memories
-        ])
+        Called with the incoming user message before the agent runs when
+        the memory context is injected into the agent's input, so the
+        retrieval overlaps agent setup. get_prefetched_memory_context and a
+        retrieve_memory_context call with the same normalized query and
+        scope await this task instead of retrieving again.
+        
+        Args:
+            query: Incoming user message
+            thread_id: Conversation scope (None searches all conversations)
+        Returns:
+            The prefetch task, or None when prefetching is disabled
+        """
+        if not self.strategies or not settings.MEMORY_PREFETCH_ENABLED:
+            return None
+        cache_key = self.retrieval_cache_key(query, thread_id)
+        prefetch = self._prefetches.get(cache_key)
+        if prefetch is None:
+            prefetch = asyncio.create_task(self._prefetch_memory_context(cache_key, query, thread_id))
+            self._prefetches[cache_key] = prefetch
+        return prefetch
     
-    async def retrieve_and_format_memories(
+    async def get_prefetched_memory_context(
         self, 
-        strategy_id: str, 
-        strategy: MemoryStrategy,
-        query: str,
-        thread_id: Optional[str] = None
-    ):
-        """Retrieve memories for a strategy and format them."""
-        memories = await strategy.retrieve_memories(
+        query: str, 
+        thread_id: Optional[str] = None, 
+        timeout: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Wait up to timeout seconds for a prefetched memory context.
+        
+        Returns:
+            The context, or None when nothing was prefetched, it failed or it is not ready in time
+        """
+        prefetch = self._prefetches.get(self.retrieval_cache_key(query, thread_id))
+        if prefetch is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(prefetch), timeout=timeout)
+        except asyncio.TimeoutError:
+            print("Prefetched memory context not ready in time.")
+            return None
+    
+    async def _prefetch_memory_context(self, cache_key: Tuple, query: str, thread_id: Optional[str]) -> Optional[str]:
+        """Prefetch task body; failures are reported and leave the tool call to retrieve again."""
+        try:
+            return await self._retrieve_cached_memory_context(cache_key, query, thread_id)
+        except Exception as e:
+            print(f"Error prefetching memory context: {e}")
+            return None
+    
+    async def warm_up(self):
+        """
+        Open a pooled database connection and the embedding client ahead of the first message.
+        
+        Run in the background at chat start/resume, before any query is
+        known, so the first retrieval does not pay for connection setup.
+        """
+        if not self.strategies:
+            return
+        try:
+            await self.repository.ping()
+            next(iter(self.strategies.values())).embedder.warm_up()
+        except Exception as e:
+            print(f"Error warming up memory retrieval: {e}")
+    
+    async def _retrieve_cached_memory_context(self, cache_key: Tuple, query: str, thread_id: Optional[str] = None) -> str:
+        """Retrieve the memory context through the retrieval cache."""
+        retrieval_cache = get_retrieval_cache()
+        if retrieval_cache is not None:
+            cached = retrieval_cache.get(cache_key)
+            if cached is not None:
+                print(f"Memory context served from retrieval cache (hit rate {retrieval_cache.stats()['hit_rate']:.0%}).")
+                return cached
+            generation = retrieval_cache.generation
+        memory_context = await self._retrieve_memory_context(query, thread_id)
+        if retrieval_cache is not None:
+            retrieval_cache.put(
+                cache_key,
+                memory_context,
+                user_id=self.config.user_id,
+                strategies=self.strategies.keys(),
+                generation=generation,
+            )
+        return memory_context
+    
+    def retrieval_cache_key(self, query: str, thread_id: Optional[str] = None) -> Tuple:
+        """
+        Key of a retrieval in the retrieval cache.
+        
+        Covers everything that changes the formatted context: user, thread
+        scope, strategy set with thresholds, limits and token budget, chat
+        model (its tokenizer), embedding model and column, retrieval mode,
+        HNSW search settings and the normalized query.
+        """
+        return (
+            self.config.user_id,
+            thread_id or None,
+            tuple(sorted(
+                (strategy_id, strategy.similarity_threshold)
+                for strategy_id, strategy in self.strategies.items()
+            )),
+            self.config.max_memories,
+            self.config.token_limit,
+            self.config.model,
+            self.config.embedding_model,
+            self.config.legacy_embedding_retrieval,
+            self.config.retrieval_mode,
+            self.config.hnsw_ef_search,
+            self.config.hnsw_iterative_scan,
+            normalize_query(query),
+        )
+    
+    async def _retrieve_memory_context(self, query: str, thread_id: Optional[str] = None) -> str:
+        """Retrieve and format memories for a query, bypassing the retrieval cache."""
+        strategy_memories = await self._retrieve_strategy_memories(query, thread_id, list(self.strategies))
+        return self._assemble_memory_context(strategy_memories)
+    
+    async def _retrieve_strategy_memories(
+        self, 
+        query: str, 
+        thread_id: Optional[str], 
+        strategy_ids: List[str]
+    ) -> Dict[str, list]:
+        """
+        Retrieve the scored memories of some strategies for a query.
+        
+        Returns:
+            (memory, score) rows by strategy id, with an entry for every requested strategy
+        """
+        query_embedding = await self.embed_query(query)
+        memory_queries = [
+            self.strategies[strategy_id].build_memory_query(limit=self.config.max_memories)
+            for strategy_id in strategy_ids
+        ]
+        strategy_memories = await self.repository.get_memories_for_strategies(
             user_id=self.config.user_id,
+            memory_queries=memory_queries,
+            query_embedding=query_embedding,
             thread_id=thread_id,
-            query=query,
-            limit=self.config.max_memories
+            ef_search=self.config.hnsw_ef_search,
+            iterative_scan=self.config.hnsw_iterative_scan,
+            embedding_model=None if self.config.legacy_embedding_retrieval else self.config.embedding_model,
+            query_text=query if self.config.retrieval_mode == "hybrid" else None,
         )
-        if memories:
-            formatted = strategy.format_memories_for_context(memories)
-            if formatted:
-                return f"### {strategy_id.upper()} MEMORIES\n{formatted}"
-        return None
+        return {strategy_id: strategy_memories.get(strategy_id, []) for strategy_id in strategy_ids}
+    
+    def _assemble_memory_context(self, strategy_memories: Dict[str, list]) -> str:
+        """Format retrieved strategy memories into the memory context."""
+        memory_context = ContextAssembler(
+            token_limit=self.config.token_limit,
+            model=self.config.model,
+        ).assemble(strategies=self.strategies, strategy_memories=strategy_memories)
+        if not memory_context:
+            print("No relevant memories found.")
+            return ""
+        print("Relevant memories retrieved for context.")
+        return memory_context
+    
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a retrieval query once per turn.
+        
+        All strategies share the session's embedding model, so one vector
+        serves every strategy, and repeated tool calls with the same query
+        in this turn reuse it.
         
+        Args:
+            query: Query text
+        Returns:
+            Query embedding
+        """
+        key = (self.config.embedding_model, query)
+        query_embedding = self._query_embeddings.get(key)
+        if query_embedding is None:
+            embedding_strategy = next(iter(self.strategies.values()))
+            query_embedding = await embedding_strategy.generate_embedding(text=query)
+            self._query_embeddings[key] = query_embedding
+        return query_embedding
+    
     async def process_conversation_for_memory(
         self,
         is_process_next_messages: bool = False,
+        watermark: Optional[int] = None,
+        from_watermark: Optional[int] = None,
     ):
         """
         Process conversation and store memories (runs in background).
         
         Args:
-            chat_history: Full chat history
-            latest_message: Latest user message
-            latest_response: Latest assistant response
-        """
-        unsummarized_chat_history = self.get_chat_history(is_summarized=False)
-        messages_to_process = self.get_messages_for_llm_processing(
-            chat_history=unsummarized_chat_history, 
-            is_process_next_messages=is_process_next_messages
+            is_process_next_messages: Process every unsummarized message (chat end)
+            watermark: Only consider messages up to this id (an extraction job's watermark)
+            from_watermark: Oldest watermark merged into the job; the window of
+                    any chat length from there to watermark is extracted
+        """
+        unsummarized_chat_history = await self.get_chat_history(is_summarized=False)
+        if watermark is not None:
+            # Later messages are extracted by their own job
+            unsummarized_chat_history = [msg for msg in unsummarized_chat_history if msg.id <= watermark]
+        messages_to_process = self.get_messages_for_watermarks(
+            chat_history=unsummarized_chat_history,
+            from_watermark=from_watermark,
+            is_process_next_messages=is_process_next_messages,
         )
         exchange_message_ids = self.get_exchange_message_ids(messages_to_process)
         formatted_messages = self.format_messages_for_llm(messages_to_process)
         if len(formatted_messages) == 0:
             return
         try:
-            strategy_extraction_tasks = [
-                self.process_and_save_memory(
-                    strategy_id=strategy_id, 
-                    strategy=strategy, 
-                    formatted_messages=formatted_messages
-                )
+            fused_strategies = {
+                strategy_id: strategy
                 for strategy_id, strategy in self.strategies.items()
-            ]
-            
-            await asyncio.gather(*strategy_extraction_tasks)
+                if strategy.supports_fused_extraction
+            }
+            if self.config.extraction_mode == "fused" and len(fused_strategies) > 1:
+                await asyncio.gather(
+                    self.process_and_save_fused_memories(
+                        strategies=fused_strategies, formatted_messages=formatted_messages
+                    ),
+                    self.process_and_save_strategy_memories(
+                        strategies={
+                            strategy_id: strategy
+                            for strategy_id, strategy in self.strategies.items()
+                            if strategy_id not in fused_strategies
+                        },
+                        formatted_messages=formatted_messages,
+                    ),
+                )
+            else:
+                await self.process_and_save_strategy_memories(
+                    strategies=self.strategies, formatted_messages=formatted_messages
+                )
             
-            self.repository.mark_messages_as_summarized(
+            await self.repository.mark_messages_as_summarized(
                 message_ids=exchange_message_ids
             )
         except Exception as e:
             print(f"Error processing memories: {e}")
+            # Surface the failure so the extraction queue can retry the job
+            raise
+    
+    async def process_and_save_strategy_memories(
+        self, strategies: Dict[str, MemoryStrategy], formatted_messages: List[Dict[str, str]]
+    ):
+        """Extract and save memories with one LLM call per strategy."""
+        strategy_extraction_tasks = [
+            self.process_and_save_memory(
+                strategy_id=strategy_id, 
+                strategy=strategy, 
+                formatted_messages=formatted_messages
+            )
+            for strategy_id, strategy in strategies.items()
+        ]
+        
+        await asyncio.gather(*strategy_extraction_tasks)
+    
+    async def process_and_save_fused_memories(
+        self, strategies: Dict[str, MemoryStrategy], formatted_messages: List[Dict[str, str]]
+    ):
+        """
+        Extract the strategies' memories with one LLM call and save them.
+        
+        Falls back to per-strategy extraction when the fused call fails, e.g.
+        when the model cannot produce the combined schema.
+        """
+        try:
+            strategy_memories = await FusedMemoryExtraction(strategies).process_conversation(
+                user_id=self.config.user_id,
+                thread_id=self.config.thread_id,
+                model=self.config.summarization_model,
+                chat_history=formatted_messages,
+            )
+        except Exception as e:
+            print(f"Error in fused memory extraction, extracting per strategy: {e}")
+            await self.process_and_save_strategy_memories(strategies=strategies, formatted_messages=formatted_messages)
+            return
+        await asyncio.gather(*[
+            self.save_strategy_memories(strategy_id=strategy_id, memories=memories)
+            for strategy_id, memories in strategy_memories.items()
+        ])
     
     async def process_and_save_memory(
         self, 
@@ -233,11 +516,15 @@ class AgentCoreMemorySessionManager:
             model=self.config.summarization_model,
             chat_history=formatted_messages,
         )
+        await self.save_strategy_memories(strategy_id=strategy_id, memories=memories)
+    
+    async def save_strategy_memories(self, strategy_id: str, memories: List[Dict]):
+        """Save a strategy's extracted memories and show them as a step."""
         all_memories = ''
         # Store memories
         for memory in memories:
             all_memories += f"{memory['content']}\n"
-            self.repository.save_memory(
+            await self.repository.save_memory(
                 user_id=self.config.user_id,
                 thread_id=self.config.thread_id,
                 strategy=strategy_id,
@@ -245,19 +532,54 @@ class AgentCoreMemorySessionManager:
                 action=memory.get("action"),
                 content=memory["content"],
                 embedding=memory.get("embedding"),
-                metadata=memory.get("metadata", {})
+                metadata=memory.get("metadata", {}),
+                embedding_model=self.config.embedding_model,
             )
             
         strategy_title = " ".join(word.capitalize() for word in strategy_id.split("_"))
-        extraction_step = cl.Step(
-            name=f"{strategy_title} strategy", 
-            type="tool",
-            show_input=True,
-        )
-        extraction_step.input = f"Input:\nExtracting {strategy_title} memories..."
-        extraction_step.output = f"Output:\n{strategy_id.capitalize()} memories saved.\n{all_memories}"
-        await extraction_step.send()
+        try:
+            extraction_step = cl.Step(
+                name=f"{strategy_title} strategy", 
+                type="tool",
+                show_input=True,
+            )
+            extraction_step.input = f"Input:\nExtracting {strategy_title} memories..."
+            extraction_step.output = f"Output:\n{strategy_id.capitalize()} memories saved.\n{all_memories}"
+            await extraction_step.send()
+        except ChainlitContextException:
+            # Extraction worker outside any chat session; nowhere to show the step
+            pass
                 
+    def get_messages_for_watermarks(
+        self,
+        chat_history: List[ExchangeMessage],
+        from_watermark: Optional[int] = None,
+        is_process_next_messages: bool = False,
+    ) -> list:
+        """
+        Get the messages to extract for a job whose debounce merged several watermarks.
+        
+        The merged job runs at its newest watermark, where the chat length
+        may not trigger an extraction while an older merged one did. The
+        windows only grow with the chat, so the longest history ending at or
+        after from_watermark with a non-empty window covers all of them.
+        
+        Args:
+            chat_history: Unsummarized messages up to the newest watermark
+            from_watermark: Oldest merged watermark (None: only the full history)
+            is_process_next_messages: Process every message (chat end)
+        Returns:
+            Messages to extract, or [] when no merged watermark triggers an extraction
+        """
+        for end in range(len(chat_history), 0, -1):
+            messages_to_process = self.get_messages_for_llm_processing(
+                chat_history=chat_history[:end],
+                is_process_next_messages=is_process_next_messages,
+            )
+            if messages_to_process or from_watermark is None or chat_history[end - 1].id <= from_watermark:
+                return messages_to_process
+        return []
+    
     def get_messages_for_llm_processing(
         self, 
         chat_history: List[ExchangeMessage],
@@ -0,0 +1,25 @@
+from .clients import get_embedding_client, get_embedding_semaphore, clear_embedding_clients
+from .cache import EmbeddingCache, get_embedding_cache
+from .batcher import EmbeddingBatcher, get_embedding_batcher
+from .dimensions import truncate_embedding
+from .providers import EmbeddingProvider, register_embedding_provider, get_embedding_provider
+from .embedder import Embedder
+from .reembed import ReembeddingJob, ReembeddingProgress, start_reembedding
+
+__all__ = [
+    'get_embedding_client',
+    'get_embedding_semaphore',
+    'clear_embedding_clients',
+    'EmbeddingCache',
+    'get_embedding_cache',
+    'EmbeddingBatcher',
+    'get_embedding_batcher',
+    'truncate_embedding',
+    'EmbeddingProvider',
+    'register_embedding_provider',
+    'get_embedding_provider',
+    'Embedder',
+    'ReembeddingJob',
+    'ReembeddingProgress',
+    'start_reembedding',
+]
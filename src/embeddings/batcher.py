@@ -0,0 +1,166 @@
+"""
+Cross-session embedding request coalescer.
+
+Concurrent Chainlit sessions each embed a handful of texts at a time. The
+batcher holds requests for the same model (and API key) for a short window,
+or until a batch fills up, sends them as one provider request and resolves
+every caller's future with its own slice of the result. When a coalesced
+request fails, each caller's texts are retried on their own so a failure
+only reaches the callers whose texts cause it.
+"""
+import asyncio
+import weakref
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from src.config.settings import settings
+
+EmbedFunction = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class _PendingBatch:
+    """Texts and waiting callers collected for one group key."""
+
+    def __init__(self, embed_fn: EmbedFunction):
+        self.embed_fn = embed_fn
+        self.texts: List[str] = []
+        self.waiters: List[Tuple[asyncio.Future, int, int]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbeddingBatcher:
+    """Coalesces embedding requests from concurrent coroutines into batched provider calls."""
+
+    def __init__(self, max_wait_ms: float = 10.0, max_batch_size: int = 100):
+        """
+        Initialize the batcher.
+
+        Args:
+            max_wait_ms: How long the first request of a batch waits for company
+            max_batch_size: Flush as soon as a batch holds this many texts
+        """
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[Hashable, _PendingBatch] = {}
+        # Running flushes; the event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.split_batches = 0
+
+    async def submit(self, key: Hashable, texts: List[str], embed_fn: EmbedFunction) -> List[List[float]]:
+        """
+        Queue texts for embedding and wait for the batch they end up in.
+
+        Args:
+            key: Group key; only requests with the same key share a provider call
+                (e.g. provider, model and API key)
+            texts: Texts to embed
+            embed_fn: Coroutine function embedding a list of texts for this key
+
+        Returns:
+            Embeddings in the same order as texts
+        """
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(embed_fn)
+            self._pending[key] = batch
+            batch.timer = loop.call_later(self.max_wait, self._flush_later, key, batch)
+        start = len(batch.texts)
+        batch.texts.extend(texts)
+        batch.waiters.append((future, start, start + len(texts)))
+        self.requests += 1
+        if len(batch.texts) >= self.max_batch_size:
+            self._detach(key, batch)
+            self._start_flush(batch)
+        return await future
+
+    def stats(self) -> Dict[str, float]:
+        """Requests, provider batches, the average batch size and failed batches split so far."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "split_batches": self.split_batches,
+        }
+
+    def _flush_later(self, key: Hashable, batch: _PendingBatch):
+        """Timer callback flushing a batch whose window has elapsed."""
+        if self._pending.get(key) is batch:
+            self._detach(key, batch)
+            self._start_flush(batch)
+
+    def _start_flush(self, batch: _PendingBatch):
+        """Flush a batch in a task kept alive until it resolves every waiter."""
+        task = asyncio.create_task(self._flush(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _detach(self, key: Hashable, batch: _PendingBatch):
+        """Stop collecting into a batch so new requests start the next one."""
+        self._pending.pop(key, None)
+        if batch.timer is not None:
+            batch.timer.cancel()
+
+    async def _flush(self, batch: _PendingBatch):
+        """Send one provider call for the batch and resolve every waiter."""
+        unique_texts = list(dict.fromkeys(batch.texts))
+        self.batches += 1
+        self.texts += len(unique_texts)
+        try:
+            embeddings = await batch.embed_fn(unique_texts)
+        except Exception as e:
+            if len(batch.waiters) == 1:
+                future = batch.waiters[0][0]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            # One bad input must not fail the unrelated sessions coalesced with it
+            print(f"Embedding batch of {len(batch.waiters)} requests failed, retrying each on its own: {e}")
+            self.split_batches += 1
+            await asyncio.gather(*[
+                self._flush_alone(batch, future, start, end)
+                for future, start, end in batch.waiters
+            ])
+            return
+        embedding_by_text = dict(zip(unique_texts, embeddings))
+        for future, start, end in batch.waiters:
+            if not future.done():
+                future.set_result([embedding_by_text[text] for text in batch.texts[start:end]])
+
+    async def _flush_alone(self, batch: _PendingBatch, future: asyncio.Future, start: int, end: int):
+        """Embed one waiter's texts in their own provider call, so a failure only reaches that waiter."""
+        texts = batch.texts[start:end]
+        unique_texts = list(dict.fromkeys(texts))
+        self.batches += 1
+        self.texts += len(unique_texts)
+        try:
+            embeddings = await batch.embed_fn(unique_texts)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        embedding_by_text = dict(zip(unique_texts, embeddings))
+        if not future.done():
+            future.set_result([embedding_by_text[text] for text in texts])
+
+
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EmbeddingBatcher]" = weakref.WeakKeyDictionary()
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Get the embedding batcher of the running event loop, configured from settings."""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = EmbeddingBatcher(
+            max_wait_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+        )
+        _batchers[loop] = batcher
+    return batcher
@@ -0,0 +1,99 @@
+"""
+Throughput benchmark for the cross-session embedding batcher.
+
+Simulates N concurrent sessions each embedding a few texts against a fake
+provider with a fixed per-request latency and a cap on in-flight requests,
+and compares direct provider calls with calls coalesced by EmbeddingBatcher.
+
+Run with: python -m src.embeddings.benchmark
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from .batcher import EmbeddingBatcher
+
+
+class SimulatedProvider:
+    """Fake embedding provider: fixed latency per request, bounded concurrency."""
+
+    def __init__(self, latency_ms: float = 100.0, max_concurrency: int = 16, dimensions: int = 8):
+        self.latency = latency_ms / 1000.0
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.dimensions = dimensions
+        self.calls = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in one simulated request."""
+        async with self.semaphore:
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+            return [[float(len(text))] * self.dimensions for text in texts]
+
+
+async def _run_sessions(sessions: int, requests_per_session: int, texts_per_request: int, embed) -> float:
+    """Run concurrent sessions issuing embedding requests; returns elapsed seconds."""
+    async def session(session_id: int):
+        for request_id in range(requests_per_session):
+            texts = [f"session {session_id} request {request_id} text {i}" for i in range(texts_per_request)]
+            await embed(texts)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[session(session_id) for session_id in range(sessions)])
+    return time.perf_counter() - start
+
+
+async def run_benchmark(
+    session_counts: List[int],
+    requests_per_session: int = 5,
+    texts_per_request: int = 3,
+    latency_ms: float = 100.0,
+    max_concurrency: int = 16,
+    window_ms: float = 10.0,
+    max_batch_size: int = 100,
+):
+    """Print a throughput table comparing direct and batched embedding calls."""
+    print(f"{'sessions':>8} | {'mode':>7} | {'calls':>6} | {'avg batch':>9} | {'seconds':>8} | {'texts/s':>9}")
+    print("-" * 62)
+    for sessions in session_counts:
+        total_texts = sessions * requests_per_session * texts_per_request
+
+        provider = SimulatedProvider(latency_ms, max_concurrency)
+        elapsed = await _run_sessions(sessions, requests_per_session, texts_per_request, provider.embed)
+        print(f"{sessions:>8} | {'direct':>7} | {provider.calls:>6} | {texts_per_request:>9.1f} | {elapsed:>8.2f} | {total_texts / elapsed:>9.0f}")
+
+        provider = SimulatedProvider(latency_ms, max_concurrency)
+        batcher = EmbeddingBatcher(max_wait_ms=window_ms, max_batch_size=max_batch_size)
+
+        async def batched(texts: List[str]) -> List[List[float]]:
+            return await batcher.submit("benchmark", texts, provider.embed)
+
+        elapsed = await _run_sessions(sessions, requests_per_session, texts_per_request, batched)
+        stats = batcher.stats()
+        print(f"{sessions:>8} | {'batched':>7} | {provider.calls:>6} | {stats['avg_batch_size']:>9.1f} | {elapsed:>8.2f} | {total_texts / elapsed:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cross-session embedding batcher")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100], help="Concurrent session counts")
+    parser.add_argument("--requests", type=int, default=5, help="Embedding requests per session")
+    parser.add_argument("--texts", type=int, default=3, help="Texts per request")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Simulated provider latency per request")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="Simulated provider in-flight request cap")
+    parser.add_argument("--window-ms", type=float, default=10.0, help="Batching window")
+    parser.add_argument("--max-batch-size", type=int, default=100, help="Maximum texts per batch")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(
+        session_counts=args.sessions,
+        requests_per_session=args.requests,
+        texts_per_request=args.texts,
+        latency_ms=args.latency_ms,
+        max_concurrency=args.max_concurrency,
+        window_ms=args.window_ms,
+        max_batch_size=args.max_batch_size,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Two-tier content-addressed embedding cache.
+
+Tier 1 is an in-process LRU bounded by entry count; tier 2 is the
+"EmbeddingCache" Postgres table shared by every process. Entries are keyed
+by sha256(model, dimensions, text), so identical texts are embedded once no
+matter which strategy, session or process asks for them.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from src.config.settings import settings
+from src.storage.async_repository import AsyncRepository
+
+
+class EmbeddingCache:
+    """In-process LRU in front of the Postgres-backed embedding cache."""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        persistent: bool = True,
+        max_age: Optional[timedelta] = None,
+        max_rows: Optional[int] = None,
+        evict_interval: float = 3600.0,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum entries kept in the in-process LRU
+            persistent: Also read/write the Postgres cache table
+            max_age: Evict Postgres entries not accessed for longer than this
+            max_rows: Keep at most this many Postgres entries
+            evict_interval: Minimum seconds between Postgres eviction runs
+        """
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self.max_age = max_age
+        self.max_rows = max_rows
+        self.evict_interval = evict_interval
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+        self._repository: Optional[AsyncRepository] = None
+        # Running eviction; the event loop only keeps weak references to tasks
+        self._evict_task: Optional[asyncio.Task] = None
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.db_evictions = 0
+
+    @staticmethod
+    def make_key(model: str, dimensions: int, text: str) -> str:
+        """Content address of an embedding."""
+        return hashlib.sha256(f"{model}\x00{dimensions}\x00{text}".encode("utf-8")).hexdigest()
+
+    @property
+    def repository(self) -> AsyncRepository:
+        if self._repository is None:
+            self._repository = AsyncRepository()
+        return self._repository
+
+    async def get_many(self, model: str, dimensions: int, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for texts, in-process first then Postgres.
+
+        Args:
+            model: Embedding model name
+            dimensions: Embedding dimensionality
+            texts: Texts to look up
+
+        Returns:
+            Embeddings in the same order as texts, None for misses
+        """
+        keys = [self.make_key(model, dimensions, text) for text in texts]
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            for key in keys:
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                results.append(embedding)
+
+        missing_keys = list({key for key, embedding in zip(keys, results) if embedding is None})
+        if missing_keys and self.persistent:
+            try:
+                stored = await self.repository.get_cached_embeddings(missing_keys)
+            except Exception as e:
+                print(f"Error reading embedding cache: {e}")
+                stored = {}
+            self._remember(stored)
+            for index, key in enumerate(keys):
+                if results[index] is None and key in stored:
+                    results[index] = stored[key]
+                    self.db_hits += 1
+        self.misses += sum(1 for embedding in results if embedding is None)
+        return results
+
+    async def put_many(self, model: str, dimensions: int, texts: List[str], embeddings: List[List[float]]):
+        """
+        Store freshly generated embeddings in both tiers.
+
+        Args:
+            model: Embedding model name
+            dimensions: Embedding dimensionality
+            texts: Embedded texts
+            embeddings: Embeddings in the same order as texts
+        """
+        entries = {
+            self.make_key(model, dimensions, text): [float(value) for value in embedding]
+            for text, embedding in zip(texts, embeddings)
+        }
+        self._remember(entries)
+        if not self.persistent or not entries:
+            return
+        try:
+            await self.repository.save_cached_embeddings([
+                {"key": key, "model": model, "dimensions": dimensions, "embedding": embedding}
+                for key, embedding in entries.items()
+            ])
+        except Exception as e:
+            print(f"Error writing embedding cache: {e}")
+        if time.monotonic() - self._last_eviction >= self.evict_interval:
+            self._last_eviction = time.monotonic()
+            if self._evict_task is None or self._evict_task.done():
+                self._evict_task = asyncio.create_task(self.evict())
+
+    async def evict(self) -> int:
+        """Evict Postgres entries by age and size; returns the number removed."""
+        if not self.persistent or (self.max_age is None and self.max_rows is None):
+            return 0
+        try:
+            removed = await self.repository.evict_cached_embeddings(max_age=self.max_age, max_rows=self.max_rows)
+        except Exception as e:
+            print(f"Error evicting embedding cache: {e}")
+            return 0
+        self.db_evictions += removed
+        return removed
+
+    def clear(self):
+        """Drop every in-process entry (the Postgres tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and in-process size."""
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_evictions": self.memory_evictions,
+            "db_evictions": self.db_evictions,
+        }
+
+    def _remember(self, entries: Dict[str, List[float]]):
+        """Insert entries into the in-process LRU, evicting the least recently used."""
+        with self._lock:
+            for key, embedding in entries.items():
+                self._entries[key] = embedding
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.memory_evictions += 1
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process-wide embedding cache configured from settings."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            persistent=settings.EMBEDDING_CACHE_PERSISTENT,
+            max_age=timedelta(days=settings.EMBEDDING_CACHE_MAX_AGE_DAYS) if settings.EMBEDDING_CACHE_MAX_AGE_DAYS else None,
+            max_rows=settings.EMBEDDING_CACHE_MAX_ROWS,
+        )
+    return _embedding_cache
@@ -0,0 +1,82 @@
+"""
+Process-wide cache of embedding provider clients.
+
+Building an OpenAIEmbedding or genai.Client per call opens a new HTTP
+session (and TLS handshake) every time. Clients are cached per
+(provider, model, api_key) so their keep-alive connection pools are reused
+across calls, strategies and sessions.
+"""
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+from llama_index.embeddings.openai import OpenAIEmbedding
+from google import genai
+
+from src.config.settings import settings
+
+_clients: Dict[Tuple[str, str, Optional[str]], Any] = {}
+_lock = threading.Lock()
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _create_client(provider: str, model: str, api_key: Optional[str]):
+    """Create a new embedding client for a provider."""
+    if provider == "OpenAI":
+        # Let one request carry a full provider batch instead of llama-index's default of 100
+        max_batch_size = settings.EMBEDDING_MODELS.get(model, {}).get("max_batch_size", 100)
+        return OpenAIEmbedding(
+            model=model,
+            api_key=api_key,
+            reuse_client=True,
+            embed_batch_size=max_batch_size,
+            dimensions=settings.embedding_dimensions(model),
+        )
+    elif provider == "Google":
+        return genai.Client(api_key=api_key)
+    raise ValueError(f"Unsupported embedding provider: {provider}")
+
+
+def get_embedding_client(provider: str, model: str, api_key: Optional[str] = None):
+    """
+    Get the shared embedding client for a provider, model and API key.
+
+    Args:
+        provider: Embedding provider name ("OpenAI" or "Google")
+        model: Embedding model name
+        api_key: Provider API key
+
+    Returns:
+        OpenAIEmbedding for OpenAI, genai.Client for Google
+    """
+    key = (provider, model, api_key)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _create_client(provider, model, api_key)
+            _clients[key] = client
+        return client
+
+
+def clear_embedding_clients():
+    """Drop every cached embedding client."""
+    with _lock:
+        _clients.clear()
+
+
+def get_embedding_semaphore() -> asyncio.Semaphore:
+    """
+    Get the semaphore bounding concurrent embedding requests on the running event loop.
+
+    Returns:
+        Semaphore sized by settings.EMBEDDING_MAX_CONCURRENCY
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.EMBEDDING_MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
@@ -0,0 +1,30 @@
+"""
+Matryoshka embedding truncation.
+
+text-embedding-3-large and gemini-embedding-001 are trained so that a prefix
+of the full vector is itself a usable embedding. A truncated prefix is no
+longer unit length, so it is L2 re-normalized before being stored or
+compared with cosine distance.
+"""
+import math
+from typing import List
+
+
+def truncate_embedding(embedding: List[float], dimensions: int) -> List[float]:
+    """
+    Truncate an embedding to its first dimensions values and L2-normalize it.
+
+    Args:
+        embedding: Full or provider-truncated embedding
+        dimensions: Target dimensionality
+
+    Returns:
+        Unit-length embedding with dimensions values
+    """
+    if len(embedding) < dimensions:
+        raise ValueError(f"Cannot truncate a {len(embedding)}-dim embedding to {dimensions} dimensions")
+    values = [float(value) for value in embedding[:dimensions]]
+    norm = math.sqrt(sum(value * value for value in values))
+    if norm == 0.0:
+        return values
+    return [value / norm for value in values]
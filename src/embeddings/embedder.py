@@ -0,0 +1,128 @@
+"""
+Embedding generation for one embedding model.
+
+Layers, outermost first: the content-addressed cache, the cross-session
+batcher, provider-sized chunking and finally the registered provider.
+Used by the memory strategies and by the background re-embedding job.
+"""
+import asyncio
+from typing import List, Optional
+
+from .batcher import get_embedding_batcher
+from .cache import get_embedding_cache
+from .clients import get_embedding_client, get_embedding_semaphore
+from .dimensions import truncate_embedding
+from .providers import get_embedding_provider
+from src.config.settings import settings
+
+
+class Embedder:
+    """Generates embeddings with one model and the caller's API keys."""
+
+    def __init__(self, model: str, openai_api_key: Optional[str] = None, gemini_api_key: Optional[str] = None):
+        """
+        Initialize the embedder.
+
+        Args:
+            model: Embedding model name (a key of settings.EMBEDDING_MODELS)
+            openai_api_key: OpenAI API key
+            gemini_api_key: Google Gemini API key
+        """
+        if model not in settings.EMBEDDING_MODELS:
+            raise ValueError(f"Unknown embedding model: {model}")
+        self.model = model
+        self.openai_api_key = openai_api_key
+        self.gemini_api_key = gemini_api_key
+
+    @property
+    def provider(self) -> str:
+        return settings.EMBEDDING_MODELS[self.model]["provider"]
+
+    @property
+    def dimensions(self) -> int:
+        return settings.embedding_dimensions(self.model)
+
+    @property
+    def api_key(self) -> Optional[str]:
+        if self.provider == "OpenAI":
+            return self.openai_api_key
+        if self.provider == "Google":
+            return self.gemini_api_key
+        return None
+
+    def warm_up(self):
+        """Create the shared provider client so its first request skips client setup."""
+        if get_embedding_provider(self.provider).remote:
+            get_embedding_client(self.provider, self.model, self.api_key)
+
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for several texts with as few provider requests as possible.
+
+        Texts already embedded with the same model are served from the
+        embedding cache. The rest are sent in batches of the model's
+        max_batch_size, so a list within the provider limit costs a single
+        round trip; larger lists send their batches concurrently.
+
+        Args:
+            texts: Text strings
+        Returns:
+            Embeddings in the same order as texts
+        """
+        if not texts:
+            return []
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return await self._embed_texts(texts)
+
+        # Serve repeated texts from the content-addressed cache, embed only the rest
+        cache = get_embedding_cache()
+        embeddings = await cache.get_many(self.model, self.dimensions, texts)
+        missing_texts = list(dict.fromkeys(
+            text for text, embedding in zip(texts, embeddings) if embedding is None
+        ))
+        if missing_texts:
+            generated = await self._embed_texts(missing_texts)
+            await cache.put_many(self.model, self.dimensions, missing_texts, generated)
+            generated_by_text = dict(zip(missing_texts, generated))
+            embeddings = [
+                embedding if embedding is not None else generated_by_text[text]
+                for text, embedding in zip(texts, embeddings)
+            ]
+        return embeddings
+
+    async def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, coalescing with concurrent requests from other sessions.
+
+        Requests for the same provider, model and API key that arrive within
+        the batching window share one provider call.
+        """
+        if not settings.EMBEDDING_BATCH_ENABLED:
+            return await self._embed_with_provider(texts)
+        batch_key = (self.provider, self.model, self.api_key)
+        return await get_embedding_batcher().submit(batch_key, texts, self._embed_with_provider)
+
+    async def _embed_with_provider(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the provider, one request per max_batch_size chunk."""
+        max_batch_size = settings.EMBEDDING_MODELS[self.model].get("max_batch_size", 100)
+        batches = [texts[start:start + max_batch_size] for start in range(0, len(texts), max_batch_size)]
+        results = await asyncio.gather(*[self._embed_batch(batch) for batch in batches])
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one provider-sized batch of texts in a single request.
+
+        Remote providers hold a slot of the shared embedding semaphore to cap
+        in-flight requests. Vectors are requested at the model's configured
+        dimensionality and re-normalized, since truncated Gemini embeddings
+        are not unit length.
+        """
+        provider = get_embedding_provider(self.provider)
+        dimensions = self.dimensions
+        if provider.remote:
+            async with get_embedding_semaphore():
+                embeddings = await provider.embed(self.model, texts, dimensions, api_key=self.api_key)
+        else:
+            embeddings = await provider.embed(self.model, texts, dimensions, api_key=self.api_key)
+        return [truncate_embedding(embedding, dimensions) for embedding in embeddings]
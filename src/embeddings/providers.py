@@ -0,0 +1,182 @@
+"""
+Embedding provider registry.
+
+Each entry of settings.EMBEDDING_MODELS names a provider; the Embedder looks
+it up here and calls its embed() with one batch of texts. Remote providers
+(OpenAI, Google) use the shared clients from clients.py. The local provider
+runs a sentence-transformers model on CPU in a thread pool, and the hashing
+provider is a deterministic, dependency-free backend for tests and offline
+benchmarks.
+"""
+import asyncio
+import hashlib
+import re
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Type
+from google.genai.types import EmbedContentConfig
+
+from .clients import get_embedding_client
+from .dimensions import truncate_embedding
+from src.config.settings import settings
+
+
+class EmbeddingProvider(ABC):
+    """Backend that embeds one batch of texts for a model."""
+
+    # Remote providers share the per-loop embedding semaphore
+    remote: bool = True
+
+    @abstractmethod
+    async def embed(self, model: str, texts: List[str], dimensions: int, api_key: Optional[str] = None) -> List[List[float]]:
+        """
+        Embed a batch of texts.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to embed (at most the model's max_batch_size)
+            dimensions: Requested dimensionality
+            api_key: Provider API key, for remote providers
+
+        Returns:
+            Embeddings in the same order as texts
+        """
+        pass
+
+
+_providers: Dict[str, EmbeddingProvider] = {}
+
+
+def register_embedding_provider(name: str) -> Callable[[Type[EmbeddingProvider]], Type[EmbeddingProvider]]:
+    """Class decorator registering an embedding provider under a name used in EMBEDDING_MODELS."""
+    def decorator(provider_class: Type[EmbeddingProvider]) -> Type[EmbeddingProvider]:
+        _providers[name] = provider_class()
+        return provider_class
+    return decorator
+
+
+def get_embedding_provider(name: str) -> EmbeddingProvider:
+    """
+    Get a registered embedding provider.
+
+    Args:
+        name: Provider name ("OpenAI", "Google", "Local", "Hashing" or a custom one)
+
+    Returns:
+        Provider instance
+    """
+    provider = _providers.get(name)
+    if provider is None:
+        raise ValueError(f"Unsupported embedding provider: {name}")
+    return provider
+
+
+@register_embedding_provider("OpenAI")
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings through the shared llama-index client."""
+
+    async def embed(self, model: str, texts: List[str], dimensions: int, api_key: Optional[str] = None) -> List[List[float]]:
+        client = get_embedding_client("OpenAI", model, api_key)
+        return await client.aget_text_embedding_batch(texts)
+
+
+@register_embedding_provider("Google")
+class GoogleEmbeddingProvider(EmbeddingProvider):
+    """Gemini embeddings through the shared google-genai client."""
+
+    async def embed(self, model: str, texts: List[str], dimensions: int, api_key: Optional[str] = None) -> List[List[float]]:
+        client = get_embedding_client("Google", model, api_key)
+        result = await client.aio.models.embed_content(
+            model=model,
+            contents=texts,
+            config=EmbedContentConfig(
+                output_dimensionality=dimensions,
+            ),
+        )
+        return [embedding.values for embedding in result.embeddings]
+
+
+@register_embedding_provider("Local")
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    sentence-transformers model on CPU.
+
+    Each model is loaded once per process; inference runs batched in a
+    dedicated thread pool so it never blocks the event loop.
+    Requires the optional sentence-transformers package.
+    """
+
+    remote = False
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.LOCAL_EMBEDDING_THREADS,
+                    thread_name_prefix="local-embedding",
+                )
+            return self._executor
+
+    def _load_model(self, model: str):
+        """Load a sentence-transformers model, once per process."""
+        with self._lock:
+            loaded = self._models.get(model)
+            if loaded is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError as e:
+                    raise ImportError(
+                        "The Local embedding provider requires sentence-transformers: pip install sentence-transformers"
+                    ) from e
+                loaded = SentenceTransformer(model, device=settings.LOCAL_EMBEDDING_DEVICE)
+                self._models[model] = loaded
+            return loaded
+
+    def _encode(self, model: str, texts: List[str]) -> List[List[float]]:
+        embeddings = self._load_model(model).encode(
+            texts,
+            batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        return embeddings.tolist()
+
+    async def embed(self, model: str, texts: List[str], dimensions: int, api_key: Optional[str] = None) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._encode, model, texts)
+
+
+@register_embedding_provider("Hashing")
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic feature-hashing embeddings.
+
+    Lower-cased word unigrams and bigrams are hashed into signed buckets, so
+    texts sharing words get similar vectors. Same text, same vector, in every
+    process; no network or model download.
+    """
+
+    remote = False
+
+    _token_pattern = re.compile(r"\w+")
+
+    def embed_text(self, text: str, dimensions: int) -> List[float]:
+        """Embed a single text."""
+        tokens = self._token_pattern.findall(text.lower())
+        features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        vector = [0.0] * dimensions
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % dimensions] += 1.0 if (value >> 63) & 1 else -1.0
+        return truncate_embedding(vector, dimensions)
+
+    async def embed(self, model: str, texts: List[str], dimensions: int, api_key: Optional[str] = None) -> List[List[float]]:
+        return [self.embed_text(text, dimensions) for text in texts]
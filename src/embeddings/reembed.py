@@ -0,0 +1,195 @@
+"""
+Resumable background re-embedding of memories with another embedding model.
+
+Memories are embedded per model in ThreadMemoryEmbedding, so switching a
+session to a new model only needs the memories that model has not embedded
+yet. The job walks them in id order (keyset pagination) and embeds pages with
+a bounded number of concurrent workers. Progress lives in the table itself:
+a stopped or crashed job simply picks up the remaining memories on its next
+run.
+
+Run with:
+    python -m src.embeddings.reembed --model text-embedding-3-large [--user-id ID] [--create-index]
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+from .embedder import Embedder
+from src.config.settings import settings
+from src.storage.async_repository import AsyncRepository
+
+
+class ReembeddingProgress(BaseModel):
+    """Progress of a re-embedding job."""
+
+    model: str = Field(..., description="Embedding model being backfilled")
+    user_id: Optional[str] = Field(default=None, description="User whose memories are backfilled (all users when None)")
+    total: int = Field(default=0, description="Memories missing an embedding when the job started")
+    embedded: int = Field(default=0, description="Memories embedded so far")
+    failed: int = Field(default=0, description="Memories whose batch failed; retried on the next run")
+    elapsed: float = Field(default=0.0, description="Seconds since the job started")
+    finished: bool = Field(default=False, description="Whether the job has finished")
+
+    @property
+    def rate(self) -> float:
+        """Memories embedded per second."""
+        return self.embedded / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        done = self.embedded + self.failed
+        percent = 100.0 * done / self.total if self.total else 100.0
+        return (
+            f"[reembed {self.model}] {done}/{self.total} ({percent:.1f}%) "
+            f"embedded={self.embedded} failed={self.failed} {self.rate:.1f}/s"
+        )
+
+
+class ReembeddingJob:
+    """Embeds every memory that lacks an embedding from the embedder's model."""
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        user_id: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        repository: Optional[AsyncRepository] = None,
+        on_progress: Optional[Callable[[ReembeddingProgress], None]] = None,
+    ):
+        """
+        Initialize the job.
+
+        Args:
+            embedder: Embedder of the target model
+            user_id: Only re-embed this user's memories
+            batch_size: Memories per page (defaults to settings.REEMBED_BATCH_SIZE)
+            concurrency: Pages embedded concurrently (defaults to settings.REEMBED_CONCURRENCY)
+            repository: Repository to read and write memories with
+            on_progress: Called with the progress after every page (prints it by default)
+        """
+        self.embedder = embedder
+        self.user_id = user_id
+        self.batch_size = batch_size or settings.REEMBED_BATCH_SIZE
+        self.concurrency = concurrency or settings.REEMBED_CONCURRENCY
+        self.repository = repository or AsyncRepository()
+        self.on_progress = on_progress or print
+        self.progress = ReembeddingProgress(model=embedder.model, user_id=user_id)
+
+    async def run(self) -> ReembeddingProgress:
+        """
+        Run the job until no memory is missing an embedding.
+
+        Memories stored or updated while a pass runs (by sessions still on
+        another model) are picked up by a further pass. A pass with failures
+        is the last one, so failing memories wait for the next run.
+
+        Returns:
+            Final progress
+        """
+        started = time.monotonic()
+        missing = await self.repository.count_memories_missing_embedding(
+            self.embedder.model, user_id=self.user_id
+        )
+        while missing and not self.progress.failed:
+            self.progress.total += missing
+            await self._run_pass(started)
+            missing = await self.repository.count_memories_missing_embedding(
+                self.embedder.model, user_id=self.user_id
+            )
+        self.progress.elapsed = time.monotonic() - started
+        self.progress.finished = True
+        self.on_progress(self.progress)
+        return self.progress
+
+    async def _run_pass(self, started: float):
+        """Embed every memory missing an embedding when its page is read."""
+        pages: "asyncio.Queue[Optional[List[Tuple]]]" = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def produce():
+            after_id = None
+            while True:
+                page = await self.repository.get_memories_missing_embedding(
+                    self.embedder.model, user_id=self.user_id, after_id=after_id, limit=self.batch_size
+                )
+                if not page:
+                    break
+                await pages.put(page)
+                after_id = page[-1][0]
+            for _ in range(self.concurrency):
+                await pages.put(None)
+
+        async def consume():
+            while (page := await pages.get()) is not None:
+                await self._embed_page(page)
+                self.progress.elapsed = time.monotonic() - started
+                self.on_progress(self.progress)
+
+        await asyncio.gather(produce(), *[consume() for _ in range(self.concurrency)])
+
+    async def _embed_page(self, page: List[Tuple]):
+        """Embed and store one page of (memory id, content) rows."""
+        try:
+            embeddings = await self.embedder.generate_embeddings([content for _, content in page])
+            await self.repository.save_memory_embeddings(
+                self.embedder.model,
+                {memory_id: embedding for (memory_id, _), embedding in zip(page, embeddings)},
+            )
+            self.progress.embedded += len(page)
+        except Exception as e:
+            print(f"Error re-embedding {len(page)} memories with {self.embedder.model}: {e}")
+            self.progress.failed += len(page)
+
+
+_running_jobs: dict = {}
+
+
+def start_reembedding(embedder: Embedder, user_id: Optional[str] = None) -> asyncio.Task:
+    """
+    Start a background re-embedding job unless one is already running for the model and user.
+
+    Args:
+        embedder: Embedder of the target model
+        user_id: Only re-embed this user's memories
+
+    Returns:
+        Task running the job
+    """
+    key = (embedder.model, user_id)
+    task = _running_jobs.get(key)
+    if task is None or task.done():
+        task = asyncio.create_task(ReembeddingJob(embedder, user_id=user_id).run())
+        _running_jobs[key] = task
+    return task
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill memory embeddings for an embedding model")
+    parser.add_argument("--model", required=True, choices=list(settings.EMBEDDING_MODELS), help="Target embedding model")
+    parser.add_argument("--user-id", default=None, help="Only re-embed this user's memories")
+    parser.add_argument("--batch-size", type=int, default=settings.REEMBED_BATCH_SIZE, help="Memories per batch")
+    parser.add_argument("--concurrency", type=int, default=settings.REEMBED_CONCURRENCY, help="Concurrent batches")
+    parser.add_argument("--create-index", action="store_true", help="Build the model's HNSW index afterwards")
+    args = parser.parse_args()
+
+    embedder = Embedder(args.model, openai_api_key=settings.OPENAI_API_KEY, gemini_api_key=settings.GEMINI_API_KEY)
+    repository = AsyncRepository()
+    await repository.create_tables()
+    progress = await ReembeddingJob(
+        embedder,
+        user_id=args.user_id,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        repository=repository,
+    ).run()
+    if args.create_index:
+        await repository.create_model_embedding_index(args.model)
+        print(f"[reembed {args.model}] HNSW index ready")
+    if progress.failed:
+        print(f"[reembed {args.model}] {progress.failed} memories failed; run again to retry them")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
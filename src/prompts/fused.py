@@ -0,0 +1,21 @@
+"""Fused memory extraction prompt template."""
+FUSED_EXTRACTION_PROMPT = """
+You are a memory extraction system. Perform each of the extraction tasks below over the same conversation, in a single pass.
+
+<current_conversation>
+{conversation_text}
+</current_conversation>
+
+Each task comes with its own existing memories, rules and output format. Perform every task independently, as if it were the only one, and treat the conversation above as its conversation input.
+Ignore the response format each task asks for. Instead return one JSON object with one field per task, each holding the list of actions that task would output:
+{output_fields}
+
+{tasks}
+"""
+
+FUSED_TASK_SECTION = """<task field="{field}">
+{instructions}
+</task>"""
+
+# Stands in for the conversation inside each task's instructions
+SHARED_CONVERSATION_REFERENCE = "(the conversation in <current_conversation> at the top of this prompt)"
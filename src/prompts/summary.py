@@ -120,4 +120,38 @@ You MUST output EXACTLY the following JSON structure:
         }}
     ]
 }}
-"""
\ No newline at end of file
+"""
+SUMMARY_TOPIC_ROUTING_PROMPT = """
+You are routing new chat exchanges to the summary chunks they belong to. You will be given:
+1) Recent N chat exchanges (chat history)
+2) An index of the existing summary chunks of the conversation, each with its chunk_id, topic_name and global_summary
+
+## Task:
+- Select the existing chunk(s) the new information in the recent chat exchanges should be added to. Only the selected chunks will be updated.
+- **STRONG PREFERENCE FOR UPDATES**: Select a chunk when the new information refines, extends or modifies it, clearly belongs to the same topic, intent or functional area, provides additional details, examples or categorization of concepts in it, answers follow-up questions about it, or shares its subject matter or domain.
+- Select no chunk when the recent chat exchanges are about an entirely new subject that is unrelated to every chunk.
+- Select at most {max_chunks} chunk(s), most relevant first.
+- Only select chunk_ids that appear in the index.
+
+## Model Inputs:
+    ### Recent Chat History
+        {conversation_text}
+
+    ### Summary Topic Index
+        {topic_index}
+
+You MUST output EXACTLY the following JSON structure:
+
+{{
+    "chunk_ids": ["string"]
+}}
+"""
+
+SUMMARY_OTHER_TOPICS_PROMPT = """
+## Other Existing Topics:
+The conversation also has the summary chunks below, listed by topic only. The recent chat history was routed away from them:
+- Do NOT update them; only chunks listed under Existing Summary Chunks may be updated.
+- Do NOT add a new chunk that duplicates one of these topics.
+
+{other_topics}
+"""
@@ -0,0 +1,569 @@
+"""
+Asynchronous repository layer for database operations.
+"""
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Base, ExchangeMessage, ExchangeThread, MemoryExtractionJob, ThreadMemory
+from .enums import MemoryStrategyEnums, MemoryActionType
+from .memory_index import MemoryIndex, get_memory_index
+from .invalidation import memory_write_payload, notify_memory_write
+from .engine import get_async_engine, get_async_session_factory, get_pool_stats
+from .queries import (
+    thread_messages_stmt,
+    recent_thread_messages_stmt,
+    thread_stmt,
+    memory_stmt,
+    memory_namespace,
+    memories_stmt,
+    memories_by_ids_stmt,
+    summary_topic_index_stmt,
+    multi_strategy_memories_stmt,
+    hnsw_settings_stmt,
+    planner_settings_stmt,
+    Explain,
+    embedding_index_ddl,
+    model_embedding_index_ddl,
+    memory_embedding_upsert_stmt,
+    stale_memory_embeddings_delete_stmt,
+    memories_missing_embedding_stmt,
+    count_memories_missing_embedding_stmt,
+    user_memory_count_stmt,
+    embedding_model_coverage_stmt,
+    user_memories_with_embeddings_stmt,
+    mark_messages_as_summarized_stmt,
+    memory_write_notify_stmt,
+    MemoryQuery,
+    embedding_cache_lookup_stmt,
+    embedding_cache_touch_stmt,
+    embedding_cache_insert_stmt,
+    embedding_cache_evict_stmts,
+    thread_watermark_stmt,
+    extraction_job_enqueue_stmt,
+    extraction_job_merge_stmt,
+    extraction_job_defer_stmt,
+    advisory_try_lock_stmt,
+    advisory_unlock_stmt,
+    extraction_job_claim_stmt,
+    extraction_jobs_exhausted_stmt,
+    extraction_job_heartbeat_stmt,
+    extraction_job_complete_stmt,
+    extraction_job_fail_stmt,
+    extraction_jobs_purge_stmt,
+    print_similarity_scores,
+)
+from src.config.settings import settings
+
+
+class AsyncRepository:
+    """Asynchronous repository for database operations (asyncpg)."""
+
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url or settings.DATABASE_URL
+        self.engine = get_async_engine(self.database_url)
+        self.SessionLocal = get_async_session_factory(self.database_url)
+
+    async def create_tables(self):
+        """Create all tables."""
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def create_embedding_index(self, m: Optional[int] = None, ef_construction: Optional[int] = None):
+        """
+        Build the HNSW index over the halfvec-cast embedding without blocking writes.
+
+        Args:
+            m: Max connections per layer (defaults to settings.HNSW_M)
+            ef_construction: Build-time candidate list size (defaults to settings.HNSW_EF_CONSTRUCTION)
+        """
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(embedding_index_ddl(m=m, ef_construction=ef_construction))
+
+    async def create_model_embedding_index(self, embedding_model: str, m: Optional[int] = None, ef_construction: Optional[int] = None):
+        """
+        Build the partial HNSW index over one model's ThreadMemoryEmbedding rows without blocking writes.
+
+        Args:
+            embedding_model: Embedding model name
+            m: Max connections per layer (defaults to settings.HNSW_M)
+            ef_construction: Build-time candidate list size (defaults to settings.HNSW_EF_CONSTRUCTION)
+        """
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(model_embedding_index_ddl(embedding_model, m=m, ef_construction=ef_construction))
+
+    def get_session(self) -> AsyncSession:
+        """Get database session."""
+        return self.SessionLocal()
+
+    def get_pool_stats(self) -> dict:
+        """Get connection pool checkout statistics for the shared engines."""
+        return get_pool_stats()
+
+    async def ping(self):
+        """Check out a pooled connection and run a trivial query, opening the connection if needed."""
+        async with self.get_session() as session:
+            await session.execute(select(1))
+
+    async def get_thread_messages(self, thread_id: str, is_summarized: Optional[bool] = None, limit: Optional[int] = None):
+        """Retrieve messages for a given thread."""
+        async with self.get_session() as session:
+            stmt = thread_messages_stmt(thread_id, is_summarized=is_summarized, limit=limit)
+            return (await session.execute(stmt)).scalars().all()
+
+    async def get_recent_thread_messages(self, thread_id: str, limit: Optional[int] = None):
+        """Retrieve messages for a given thread."""
+        async with self.get_session() as session:
+            stmt = recent_thread_messages_stmt(thread_id, limit=limit)
+            messages = (await session.execute(stmt)).scalars().all()
+            return list(reversed(messages))
+
+    async def save_message(self, thread_id: str, role: str, content: str, metadata: Optional[dict] = None):
+        """Save a message to the database."""
+        await self.create_or_get_thread(thread_id)
+        async with self.get_session() as session:
+            message = ExchangeMessage(
+                thread_id=thread_id,
+                role=role,
+                content=content,
+                metadata=metadata
+            )
+            session.add(message)
+            await session.commit()
+
+    async def get_thread(self, thread_id: str):
+        """Get a thread by ID."""
+        async with self.get_session() as session:
+            return (await session.execute(thread_stmt(thread_id))).scalars().first()
+
+    async def create_or_get_thread(self, thread_id: str):
+        """Create or get a thread by ID."""
+        async with self.get_session() as session:
+            exchange_thread = (await session.execute(thread_stmt(thread_id))).scalars().first()
+            if not exchange_thread:
+                exchange_thread = ExchangeThread(id=thread_id)
+                session.add(exchange_thread)
+                await session.commit()
+            return exchange_thread
+
+    async def save_memory(
+        self,
+        user_id: str,
+        thread_id: str,
+        strategy: str,
+        action: str,
+        content: str,
+        memory_id: Optional[int] = None,
+        embedding: Optional[list] = None,
+        metadata: Optional[dict] = None,
+        embedding_model: Optional[str] = None
+    ):
+        """
+        Save a memory to the database.
+
+        With an embedding_model the embedding is stored in ThreadMemoryEmbedding
+        under that model, otherwise in the legacy ThreadMemory.embedding column.
+        """
+        legacy_embedding = None if embedding_model else embedding
+        async with self.get_session() as session:
+            namespace = memory_namespace(user_id, thread_id, strategy)
+            if action == MemoryActionType.add.value:
+                memory = ThreadMemory(
+                    userId=user_id,
+                    threadId=thread_id,
+                    strategy=strategy,
+                    namespace=namespace,
+                    content=content,
+                    embedding=legacy_embedding,
+                    thread_memory_metadata=metadata
+                )
+                session.add(memory)
+                await session.flush()
+            elif action == MemoryActionType.update.value and memory_id is not None:
+                memory = (await session.execute(memory_stmt(memory_id))).scalars().first()
+                if not memory:
+                    return
+                memory.content = content
+                memory.embedding = legacy_embedding
+                memory.thread_memory_metadata = metadata
+                if embedding_model:
+                    # The content changed, so vectors from other models are stale
+                    await session.execute(stale_memory_embeddings_delete_stmt(memory.id, embedding_model))
+            else:
+                return
+            if embedding_model and embedding is not None:
+                await session.execute(memory_embedding_upsert_stmt([{
+                    "memoryId": memory.id,
+                    "model": embedding_model,
+                    "dimensions": len(embedding),
+                    "embedding": embedding,
+                }]))
+            if settings.MEMORY_WRITE_NOTIFY_ENABLED:
+                await session.execute(memory_write_notify_stmt(memory_write_payload(user_id=user_id, strategy=strategy)))
+            await session.commit()
+        notify_memory_write(user_id=user_id, strategy=strategy)
+
+    async def get_memories(
+        self,
+        user_id: str,
+        strategy_id: MemoryStrategyEnums,
+        similarity_threshold: float = 0.1,
+        query_embedding: Optional[list] = None,
+        thread_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        iterative_scan: Optional[str] = None,
+        with_embedding: bool = False,
+        embedding_model: Optional[str] = None,
+        query_text: Optional[str] = None
+    ):
+        """Retrieve memories based on criteria (embedding vectors only when with_embedding is set; hybrid with a query_text)."""
+        print(f"Retrieving memories for {strategy_id.value} with similarity threshold {similarity_threshold}")
+        if query_embedding and embedding_model and not with_embedding and not query_text and get_memory_index() is not None:
+            memory_query = MemoryQuery(strategy_id=strategy_id, similarity_threshold=similarity_threshold, limit=limit)
+            results = await self.get_memories_for_strategies(
+                user_id=user_id,
+                memory_queries=[memory_query],
+                query_embedding=query_embedding,
+                thread_id=thread_id,
+                ef_search=ef_search,
+                iterative_scan=iterative_scan,
+                embedding_model=embedding_model,
+            )
+            return results.get(strategy_id.value, [])
+        stmt = memories_stmt(
+            user_id=user_id,
+            strategy_id=strategy_id,
+            similarity_threshold=similarity_threshold,
+            query_embedding=query_embedding,
+            thread_id=thread_id,
+            limit=limit,
+            with_embedding=with_embedding,
+            embedding_model=embedding_model,
+            query_text=query_text,
+        )
+        async with self.get_session() as session:
+            if query_embedding:
+                search_settings = hnsw_settings_stmt(ef_search, iterative_scan)
+                if search_settings is not None:
+                    await session.execute(search_settings)
+                # Return tuples of (memory, score)
+                results = [(row[0], float(row[1])) for row in (await session.execute(stmt)).all()]
+                print_similarity_scores(results, user_id, strategy_id, thread_id, limit)
+                return results
+            return (await session.execute(stmt)).scalars().all()
+
+    async def get_summary_topic_index(self, user_id: str, thread_id: str, limit: Optional[int] = None) -> List[Tuple]:
+        """Get (id, topic_name, global_summary) of a thread's summary chunks, most recently updated first."""
+        async with self.get_session() as session:
+            return [tuple(row) for row in (await session.execute(summary_topic_index_stmt(user_id, thread_id, limit=limit))).all()]
+
+    async def get_memories_by_ids(self, user_id: str, memory_ids: list) -> List[ThreadMemory]:
+        """Get a user's memories by ID (without embedding vectors)."""
+        if not memory_ids:
+            return []
+        async with self.get_session() as session:
+            return (await session.execute(memories_by_ids_stmt(user_id, memory_ids))).scalars().all()
+
+    async def get_memories_for_strategies(
+        self,
+        user_id: str,
+        memory_queries: List[MemoryQuery],
+        query_embedding: list,
+        thread_id: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        iterative_scan: Optional[str] = None,
+        with_embedding: bool = False,
+        embedding_model: Optional[str] = None,
+        query_text: Optional[str] = None,
+    ) -> Dict[str, List[Tuple[ThreadMemory, float]]]:
+        """
+        Retrieve the top-k memories of several strategies in one round trip.
+
+        With the in-process memory index enabled, strategies whose memories
+        are cached are scored in memory and only the rest go to Postgres.
+        With a query_text the retrieval is hybrid (full-text + vector, fused
+        with reciprocal rank fusion) and always runs in Postgres.
+        """
+        if not memory_queries:
+            return {}
+        results: Dict[str, List[Tuple[ThreadMemory, float]]] = {}
+        db_queries = memory_queries
+        memory_index = get_memory_index() if embedding_model and not with_embedding and not query_text else None
+        if memory_index is not None:
+            results, db_queries = await self._search_memory_index(
+                memory_index, user_id, memory_queries, query_embedding, thread_id, embedding_model
+            )
+        if db_queries:
+            stmt = multi_strategy_memories_stmt(
+                user_id=user_id,
+                memory_queries=db_queries,
+                query_embedding=query_embedding,
+                thread_id=thread_id,
+                with_embedding=with_embedding,
+                embedding_model=embedding_model,
+                query_text=query_text,
+            )
+            async with self.get_session() as session:
+                search_settings = hnsw_settings_stmt(ef_search, iterative_scan)
+                if search_settings is not None:
+                    await session.execute(search_settings)
+                # Hybrid rows carry the RRF score after the similarity; it only orders them
+                for memory, score, *_ in (await session.execute(stmt)).all():
+                    results.setdefault(MemoryStrategyEnums(memory.strategy).value, []).append((memory, float(score)))
+        for memory_query in memory_queries:
+            print_similarity_scores(results.get(memory_query.strategy_id.value, []), user_id, memory_query.strategy_id, thread_id, memory_query.limit)
+        return results
+
+    async def _search_memory_index(
+        self,
+        memory_index: MemoryIndex,
+        user_id: str,
+        memory_queries: List[MemoryQuery],
+        query_embedding: list,
+        thread_id: Optional[str],
+        embedding_model: str,
+    ) -> Tuple[Dict[str, List[Tuple[ThreadMemory, float]]], List[MemoryQuery]]:
+        """Score cached strategies in memory, loading uncached ones first; returns results and the queries left for Postgres."""
+        results, missing, unloaded = memory_index.search(user_id, embedding_model, memory_queries, query_embedding, thread_id)
+        if not unloaded:
+            return results, missing
+        generation = memory_index.generation
+        strategy_ids = [memory_query.strategy_id for memory_query in unloaded]
+        async with self.get_session() as session:
+            rows = (await session.execute(user_memories_with_embeddings_stmt(user_id, strategy_ids, embedding_model))).all()
+        rows_by_strategy = {strategy_id.value: [] for strategy_id in strategy_ids}
+        for memory, embedding in rows:
+            rows_by_strategy[MemoryStrategyEnums(memory.strategy).value].append((memory, embedding))
+        for strategy, strategy_rows in rows_by_strategy.items():
+            memory_index.load(user_id, strategy, embedding_model, strategy_rows, generation=generation)
+        loaded_results, missing, _ = memory_index.search(user_id, embedding_model, missing, query_embedding, thread_id)
+        results.update(loaded_results)
+        return results, missing
+
+    async def explain_memories(
+        self,
+        user_id: str,
+        memory_queries: List[MemoryQuery],
+        query_embedding: list,
+        thread_id: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        iterative_scan: Optional[str] = None,
+        analyze: bool = False,
+        embedding_model: Optional[str] = None,
+        query_text: Optional[str] = None,
+        planner_settings: Optional[Dict[str, str]] = None,
+    ) -> List[str]:
+        """
+        Return the query plan of a multi-strategy retrieval.
+
+        Used to check that the HNSW, GIN and userId/threadId indexes are picked up.
+        planner_settings (e.g. {"enable_sort": "off"}) are applied to the
+        transaction first, to check that an index can serve the query on
+        tables too small for the planner to prefer it.
+        """
+        stmt = multi_strategy_memories_stmt(
+            user_id=user_id,
+            memory_queries=memory_queries,
+            query_embedding=query_embedding,
+            thread_id=thread_id,
+            embedding_model=embedding_model,
+            query_text=query_text,
+        )
+        async with self.get_session() as session:
+            search_settings = hnsw_settings_stmt(ef_search, iterative_scan)
+            if search_settings is not None:
+                await session.execute(search_settings)
+            if planner_settings:
+                await session.execute(planner_settings_stmt(planner_settings))
+            return [row[0] for row in (await session.execute(Explain(stmt, analyze=analyze))).all()]
+
+    async def get_memories_missing_embedding(
+        self,
+        embedding_model: str,
+        user_id: Optional[str] = None,
+        after_id=None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple]:
+        """Get (id, content) of memories without an embedding from embedding_model, ordered by id after after_id."""
+        async with self.get_session() as session:
+            stmt = memories_missing_embedding_stmt(embedding_model, user_id=user_id, after_id=after_id, limit=limit)
+            return [tuple(row) for row in (await session.execute(stmt)).all()]
+
+    async def count_memories_missing_embedding(self, embedding_model: str, user_id: Optional[str] = None) -> int:
+        """Count memories without an embedding from embedding_model."""
+        async with self.get_session() as session:
+            return (await session.execute(count_memories_missing_embedding_stmt(embedding_model, user_id=user_id))).scalar_one()
+
+    async def get_embedding_model_coverage(self, user_id: str) -> Tuple[int, Dict[str, int]]:
+        """
+        Count a user's memories and how many of them each embedding model has embedded.
+
+        Args:
+            user_id: User identifier
+        Returns:
+            Total number of memories, and memories embedded by model
+        """
+        async with self.get_session() as session:
+            total = (await session.execute(user_memory_count_stmt(user_id))).scalar_one()
+            coverage = dict((await session.execute(embedding_model_coverage_stmt(user_id))).all())
+        return total, coverage
+
+    async def save_memory_embeddings(self, embedding_model: str, embeddings: Dict) -> None:
+        """Store one model's embeddings of several memories; embeddings maps memory id to vector."""
+        if not embeddings:
+            return
+        async with self.get_session() as session:
+            await session.execute(memory_embedding_upsert_stmt([
+                {"memoryId": memory_id, "model": embedding_model, "dimensions": len(embedding), "embedding": embedding}
+                for memory_id, embedding in embeddings.items()
+            ]))
+            if settings.MEMORY_WRITE_NOTIFY_ENABLED:
+                await session.execute(memory_write_notify_stmt(memory_write_payload(embedding_model=embedding_model)))
+            await session.commit()
+        notify_memory_write(embedding_model=embedding_model)
+
+    async def mark_messages_as_summarized(self, message_ids: list):
+        """Mark messages as summarized."""
+        async with self.get_session() as session:
+            await session.execute(mark_messages_as_summarized_stmt(message_ids))
+            await session.commit()
+
+    async def get_cached_embeddings(self, keys: List[str], touch_interval: Optional[timedelta] = None) -> Dict[str, List[float]]:
+        """
+        Fetch cached embeddings by key.
+
+        Lookups are plain reads; the last access time eviction relies on is
+        only refreshed for entries last accessed more than touch_interval
+        ago (default settings.EMBEDDING_CACHE_TOUCH_INTERVAL_HOURS), so a hot
+        entry costs one write per interval instead of one per lookup.
+        """
+        if not keys:
+            return {}
+        if touch_interval is None:
+            touch_interval = timedelta(hours=settings.EMBEDDING_CACHE_TOUCH_INTERVAL_HOURS)
+        async with self.get_session() as session:
+            rows = (await session.execute(embedding_cache_lookup_stmt(keys, touch_interval))).all()
+            stale_keys = [key for key, _, stale in rows if stale]
+            if stale_keys:
+                await session.execute(embedding_cache_touch_stmt(stale_keys))
+                await session.commit()
+        return {key: [float(value) for value in embedding] for key, embedding, _ in rows}
+
+    async def save_cached_embeddings(self, entries: List[dict]):
+        """Store embeddings in the cache; entries are dicts of key, model, dimensions, embedding."""
+        if not entries:
+            return
+        async with self.get_session() as session:
+            await session.execute(embedding_cache_insert_stmt(entries))
+            await session.commit()
+
+    async def evict_cached_embeddings(self, max_age: Optional[timedelta] = None, max_rows: Optional[int] = None) -> int:
+        """Evict cache entries by age and/or table size; returns the number removed."""
+        removed = 0
+        async with self.get_session() as session:
+            for stmt in embedding_cache_evict_stmts(max_age=max_age, max_rows=max_rows):
+                removed += (await session.execute(stmt)).rowcount
+            await session.commit()
+        return removed
+
+    async def get_thread_watermark(self, thread_id: str) -> Optional[int]:
+        """Get the highest message id of a thread, or None when it has no messages."""
+        async with self.get_session() as session:
+            return (await session.execute(thread_watermark_stmt(thread_id))).scalar()
+
+    async def enqueue_extraction_job(
+        self,
+        entry: dict,
+        debounce: Optional[timedelta] = None,
+        max_delay: Optional[timedelta] = None,
+    ) -> Optional[int]:
+        """
+        Enqueue an extraction job.
+
+        With a debounce the job starts after that delay, and a pending job of
+        the same thread and mode absorbs it instead (see
+        extraction_job_merge_stmt), started at most max_delay after it was
+        first enqueued.
+
+        Returns:
+            Id of the new or merged job, or None when the idempotency key was already enqueued
+        """
+        async with self.get_session() as session:
+            job_id = None
+            if debounce is not None:
+                stmt = extraction_job_merge_stmt(entry, debounce, max_delay or debounce)
+                job_id = (await session.execute(stmt)).scalar()
+            if job_id is None:
+                job_id = (await session.execute(extraction_job_enqueue_stmt(entry, delay=debounce))).scalar()
+            await session.commit()
+        return job_id
+
+    async def claim_extraction_jobs(self, worker_id: str, limit: int, visibility_timeout: timedelta) -> List[MemoryExtractionJob]:
+        """Claim up to limit available extraction jobs, failing those out of attempts first."""
+        async with self.get_session() as session:
+            await session.execute(extraction_jobs_exhausted_stmt())
+            jobs = (await session.execute(extraction_job_claim_stmt(worker_id, limit, visibility_timeout))).scalars().all()
+            await session.commit()
+        return list(jobs)
+
+    async def extend_extraction_job(self, job_id: int, worker_id: str, visibility_timeout: timedelta) -> bool:
+        """Keep a claimed job hidden for another visibility_timeout; False when the worker no longer holds it."""
+        async with self.get_session() as session:
+            updated = (await session.execute(extraction_job_heartbeat_stmt(job_id, worker_id, visibility_timeout))).rowcount
+            await session.commit()
+        return updated > 0
+
+    async def complete_extraction_job(self, job_id: int, watermark: int) -> bool:
+        """Mark a job done after extracting up to watermark; False when it was already done or moved on."""
+        async with self.get_session() as session:
+            updated = (await session.execute(extraction_job_complete_stmt(job_id, watermark))).rowcount
+            await session.commit()
+        return updated > 0
+
+    async def fail_extraction_job(self, job_id: int, worker_id: str, error: str, retry_delay: Optional[timedelta] = None) -> bool:
+        """Record a failed attempt, requeuing after retry_delay or failing permanently when None."""
+        async with self.get_session() as session:
+            updated = (await session.execute(extraction_job_fail_stmt(job_id, worker_id, error, retry_delay))).rowcount
+            await session.commit()
+        return updated > 0
+
+    async def defer_extraction_job(self, job_id: int, worker_id: str, delay: timedelta) -> bool:
+        """Hand a claimed job back for another try after delay without counting the attempt."""
+        async with self.get_session() as session:
+            updated = (await session.execute(extraction_job_defer_stmt(job_id, worker_id, delay))).rowcount
+            await session.commit()
+        return updated > 0
+
+    @asynccontextmanager
+    async def advisory_lock(self, namespace: int, key: str) -> AsyncIterator[bool]:
+        """
+        Hold the session-level advisory lock of a key for the duration of the block, if it is free.
+
+        The lock lives on a dedicated pooled connection, so it is released
+        when the block exits or, should the process die, when Postgres
+        closes the connection.
+
+        Yields:
+            Whether the lock was taken
+        """
+        async with self.engine.connect() as conn:
+            acquired = bool((await conn.execute(advisory_try_lock_stmt(namespace, key))).scalar())
+            await conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    await conn.execute(advisory_unlock_stmt(namespace, key))
+                    await conn.commit()
+
+    async def purge_extraction_jobs(self, max_age: timedelta) -> int:
+        """Delete jobs finished longer than max_age ago; returns the number removed."""
+        async with self.get_session() as session:
+            removed = (await session.execute(extraction_jobs_purge_stmt(max_age))).rowcount
+            await session.commit()
+        return removed
@@ -0,0 +1,185 @@
+"""
+Process-wide SQLAlchemy engine registry.
+
+Every repository in the process shares one engine (and therefore one
+connection pool) per database URL instead of creating its own.
+"""
+import threading
+from typing import Dict, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings import settings
+
+
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_async_engines: Dict[str, AsyncEngine] = {}
+_async_session_factories: Dict[str, async_sessionmaker] = {}
+_lock = threading.Lock()
+
+
+def _pool_options() -> dict:
+    """Pool options shared by the sync and async engines."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+def to_async_url(database_url: str) -> str:
+    """
+    Convert a PostgreSQL URL to its asyncpg equivalent.
+
+    Args:
+        database_url: Database connection URL using any PostgreSQL driver
+
+    Returns:
+        Same URL using the postgresql+asyncpg driver
+    """
+    url = make_url(database_url).set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+
+def to_driverless_url(database_url: str) -> str:
+    """
+    Convert a PostgreSQL URL to the plain postgresql:// form asyncpg.connect() accepts.
+
+    Args:
+        database_url: Database connection URL using any PostgreSQL driver
+
+    Returns:
+        Same URL without a driver name
+    """
+    url = make_url(database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+def get_engine(database_url: Optional[str] = None) -> Engine:
+    """
+    Get the shared engine for a database URL, creating it on first use.
+
+    Args:
+        database_url: Database connection URL (defaults to settings.DATABASE_URL)
+
+    Returns:
+        Shared SQLAlchemy engine
+    """
+    database_url = database_url or settings.DATABASE_URL
+    engine = _engines.get(database_url)
+    if engine is not None:
+        return engine
+    with _lock:
+        engine = _engines.get(database_url)
+        if engine is None:
+            engine = create_engine(database_url, **_pool_options())
+            _engines[database_url] = engine
+        return engine
+
+
+def get_session_factory(database_url: Optional[str] = None) -> sessionmaker:
+    """
+    Get the shared session factory bound to the engine for a database URL.
+
+    Args:
+        database_url: Database connection URL (defaults to settings.DATABASE_URL)
+
+    Returns:
+        Shared sessionmaker
+    """
+    database_url = database_url or settings.DATABASE_URL
+    factory = _session_factories.get(database_url)
+    if factory is None:
+        engine = get_engine(database_url)
+        with _lock:
+            factory = _session_factories.setdefault(
+                database_url, sessionmaker(bind=engine, expire_on_commit=False)
+            )
+    return factory
+
+
+def get_async_engine(database_url: Optional[str] = None) -> AsyncEngine:
+    """
+    Get the shared asyncpg engine for a database URL, creating it on first use.
+
+    Args:
+        database_url: Database connection URL (defaults to settings.DATABASE_URL)
+
+    Returns:
+        Shared SQLAlchemy async engine
+    """
+    database_url = to_async_url(database_url or settings.DATABASE_URL)
+    engine = _async_engines.get(database_url)
+    if engine is not None:
+        return engine
+    with _lock:
+        engine = _async_engines.get(database_url)
+        if engine is None:
+            engine = create_async_engine(database_url, **_pool_options())
+            _async_engines[database_url] = engine
+        return engine
+
+
+def get_async_session_factory(database_url: Optional[str] = None) -> async_sessionmaker:
+    """
+    Get the shared async session factory bound to the asyncpg engine for a database URL.
+
+    Args:
+        database_url: Database connection URL (defaults to settings.DATABASE_URL)
+
+    Returns:
+        Shared async_sessionmaker
+    """
+    database_url = to_async_url(database_url or settings.DATABASE_URL)
+    factory = _async_session_factories.get(database_url)
+    if factory is None:
+        engine = get_async_engine(database_url)
+        with _lock:
+            factory = _async_session_factories.setdefault(
+                database_url, async_sessionmaker(bind=engine, expire_on_commit=False)
+            )
+    return factory
+
+
+def get_pool_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Get connection pool checkout statistics for every registered engine.
+
+    Returns:
+        Mapping of database URL (password masked) to pool statistics
+    """
+    stats = {}
+    engines = list(_engines.values()) + [engine.sync_engine for engine in list(_async_engines.values())]
+    for engine in engines:
+        pool = engine.pool
+        stats[engine.url.render_as_string(hide_password=True)] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+    return stats
+
+
+def dispose_engines():
+    """Dispose every registered engine and close its pooled connections."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _session_factories.clear()
+
+
+async def dispose_async_engines():
+    """Dispose every registered async engine and close its pooled connections."""
+    with _lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+        _async_session_factories.clear()
+    for engine in engines:
+        await engine.dispose()
@@ -9,4 +9,10 @@ class MemoryStrategyEnums(str, Enum):
 class MemoryActionType(str, Enum):
     add = "add"
     update = "update"
-    skip = "skip"
\ No newline at end of file
+    skip = "skip"
+
+class ExtractionJobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
@@ -0,0 +1,133 @@
+"""
+Memory write notifications.
+
+Caches built on top of the repositories (the in-process memory index, the
+retrieval cache) register a listener here; the repositories notify after
+every committed memory write so the affected entries are dropped.
+
+Writes made by other processes (the standalone extraction worker, other web
+replicas, the re-embedding CLI) reach those listeners through Postgres
+LISTEN/NOTIFY: the repository publishes each write on MEMORY_WRITE_CHANNEL
+in the writing transaction, and MemoryWriteSubscriber, started in the web
+process, replays them locally.
+"""
+import asyncio
+import json
+import os
+import uuid
+import weakref
+from typing import Callable, List, Optional
+
+import asyncpg
+
+from .engine import to_driverless_url
+from src.config.settings import settings
+
+MemoryWriteListener = Callable[[Optional[str], Optional[str], Optional[str]], None]
+
+MEMORY_WRITE_CHANNEL = "memory_writes"
+# Marks this process's notifications; its listeners were already told
+_origin = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_listeners: List[MemoryWriteListener] = []
+_subscribers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, MemoryWriteSubscriber]" = weakref.WeakKeyDictionary()
+
+
+def register_memory_write_listener(listener: MemoryWriteListener):
+    """
+    Register a callable invoked as listener(user_id, strategy, embedding_model) after memory writes.
+
+    A None argument means the write may affect every value of it.
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def notify_memory_write(user_id: Optional[str] = None, strategy: Optional[str] = None, embedding_model: Optional[str] = None):
+    """Tell every listener of this process that memories of a user/strategy/embedding model changed."""
+    strategy = getattr(strategy, "value", strategy)
+    for listener in list(_listeners):
+        try:
+            listener(user_id, strategy, embedding_model)
+        except Exception as e:
+            print(f"Error invalidating after memory write: {e}")
+
+
+def memory_write_payload(user_id: Optional[str] = None, strategy: Optional[str] = None, embedding_model: Optional[str] = None) -> str:
+    """NOTIFY payload publishing a memory write to other processes."""
+    return json.dumps({
+        "origin": _origin,
+        "user_id": user_id,
+        "strategy": getattr(strategy, "value", strategy),
+        "embedding_model": embedding_model,
+    })
+
+
+class MemoryWriteSubscriber:
+    """Listens on MEMORY_WRITE_CHANNEL and notifies this process's listeners of other processes' writes."""
+
+    def __init__(self, database_url: str, keepalive_interval: float = 30.0, reconnect_delay: float = 5.0):
+        """
+        Initialize the subscriber.
+
+        Args:
+            database_url: Database connection URL without a driver name
+            keepalive_interval: Seconds between checks that the connection is alive
+            reconnect_delay: Seconds to wait before reconnecting after a failure
+        """
+        self.database_url = database_url
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_delay = reconnect_delay
+        self.task: Optional[asyncio.Task] = None
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        try:
+            write = json.loads(payload)
+        except ValueError:
+            return
+        if write.get("origin") == _origin:
+            return
+        notify_memory_write(
+            user_id=write.get("user_id"),
+            strategy=write.get("strategy"),
+            embedding_model=write.get("embedding_model"),
+        )
+
+    async def run(self):
+        """Listen on a dedicated connection, reconnecting after failures, until cancelled."""
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.database_url)
+                await connection.add_listener(MEMORY_WRITE_CHANNEL, self._on_notification)
+                # Writes published while no connection listened were missed
+                notify_memory_write()
+                while True:
+                    await asyncio.sleep(self.keepalive_interval)
+                    await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Memory write subscriber disconnected, reconnecting in {self.reconnect_delay:.0f}s: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+def start_memory_write_subscriber() -> Optional[MemoryWriteSubscriber]:
+    """
+    Start listening for other processes' memory writes on the running event loop, once.
+
+    Returns:
+        The subscriber, or None when notifications are disabled or nothing listens in this process
+    """
+    if not settings.MEMORY_WRITE_NOTIFY_ENABLED or not _listeners:
+        return None
+    loop = asyncio.get_running_loop()
+    subscriber = _subscribers.get(loop)
+    if subscriber is None:
+        subscriber = MemoryWriteSubscriber(to_driverless_url(settings.DATABASE_URL))
+        _subscribers[loop] = subscriber
+        subscriber.task = loop.create_task(subscriber.run())
+    return subscriber
@@ -0,0 +1,266 @@
+"""
+In-process vectorized memory index for hot users.
+
+Keeps each active user's memories per (strategy, embedding model) as a
+contiguous, L2-normalized float32 matrix with parallel id/thread/memory
+arrays, so retrieval for a user whose memories have not changed is one
+matrix-vector product and an argpartition top-k instead of a Postgres round
+trip. Entries are dropped by the repositories' memory writes (see
+invalidation.py), expire after a TTL (writes from other processes are not
+seen) and are evicted LRU by total bytes.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+from .invalidation import register_memory_write_listener
+from .models import ThreadMemory
+from .queries import MemoryQuery
+from src.config.settings import settings
+
+IndexKey = Tuple[str, str, str]
+
+
+class StrategyMemoryMatrix:
+    """One user's memories of one strategy, embedded by one model."""
+
+    def __init__(self, memories: List[ThreadMemory], embeddings: List[List[float]]):
+        """
+        Build the matrix.
+
+        Args:
+            memories: Memories, with the embedding column not loaded
+            embeddings: Their embeddings from a single model, same order
+        """
+        self.memories = memories
+        self.ids = np.array([str(memory.id) for memory in memories], dtype=object)
+        self.thread_ids = np.array([memory.threadId for memory in memories], dtype=object)
+        if embeddings:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.matrix = np.ascontiguousarray(matrix / norms)
+        else:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.created_at = time.monotonic()
+        self.nbytes = self.matrix.nbytes + sum(len(memory.content) for memory in memories) + 512 * len(memories)
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: Optional[int],
+        similarity_threshold: float,
+        thread_id: Optional[str] = None,
+    ) -> List[Tuple[ThreadMemory, float]]:
+        """
+        Top-k memories by cosine similarity, then filtered by the threshold.
+
+        Args:
+            query: L2-normalized float32 query vector
+            limit: Maximum number of memories (all when None)
+            similarity_threshold: Minimum similarity of returned memories
+            thread_id: Only consider memories of this thread
+
+        Returns:
+            (memory, similarity) tuples ordered by similarity
+        """
+        if not self.memories:
+            return []
+        scores = self.matrix @ query
+        if thread_id:
+            scores = np.where(self.thread_ids == thread_id, scores, -np.inf)
+        k = len(scores) if not limit else min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (self.memories[i], float(scores[i]))
+            for i in top
+            if np.isfinite(scores[i]) and scores[i] >= similarity_threshold
+        ]
+
+
+class MemoryIndex:
+    """LRU of StrategyMemoryMatrix entries keyed by (user, strategy, embedding model)."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_memories: int = 10000, ttl: float = 300.0):
+        """
+        Initialize the index.
+
+        Args:
+            max_bytes: Total size of the cached matrices and memories
+            max_memories: Larger (user, strategy) sets are left to pgvector
+            ttl: Seconds after which an entry is reloaded
+        """
+        self.max_bytes = max_bytes
+        self.max_memories = max_memories
+        self.ttl = ttl
+        # None marks a set too large to cache, so it is not reloaded every turn
+        self._entries: "OrderedDict[IndexKey, Optional[StrategyMemoryMatrix]]" = OrderedDict()
+        self._loaded_at: Dict[IndexKey, float] = {}
+        self._bytes = 0
+        # Bumped by every invalidation so loads that raced a write are dropped
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(user_id: str, strategy: str, embedding_model: str) -> IndexKey:
+        strategy = getattr(strategy, "value", strategy)
+        return (user_id, strategy, embedding_model)
+
+    def search(
+        self,
+        user_id: str,
+        embedding_model: str,
+        memory_queries: List[MemoryQuery],
+        query_embedding: list,
+        thread_id: Optional[str] = None,
+    ) -> Tuple[Dict[str, List[Tuple[ThreadMemory, float]]], List[MemoryQuery], List[MemoryQuery]]:
+        """
+        Serve a multi-strategy retrieval from the cached matrices.
+
+        Returns:
+            Results per strategy value for the cached strategies, the memory
+            queries that must go to the database, and among those the ones
+            whose memories are not cached yet (worth loading)
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        results: Dict[str, List[Tuple[ThreadMemory, float]]] = {}
+        missing: List[MemoryQuery] = []
+        unloaded: List[MemoryQuery] = []
+        for memory_query in memory_queries:
+            entry, found = self._get(self.key(user_id, memory_query.strategy_id, embedding_model))
+            if entry is None:
+                missing.append(memory_query)
+                if not found:
+                    unloaded.append(memory_query)
+                    self.misses += 1
+                continue
+            self.hits += 1
+            results[memory_query.strategy_id.value] = entry.search(
+                query, memory_query.limit, memory_query.similarity_threshold, thread_id
+            )
+        return results, missing, unloaded
+
+    @property
+    def generation(self) -> int:
+        """Take before reading memories from the database and pass to load()."""
+        return self._generation
+
+    def load(
+        self,
+        user_id: str,
+        strategy: str,
+        embedding_model: str,
+        rows: List[Tuple[ThreadMemory, List[float]]],
+        generation: Optional[int] = None,
+    ):
+        """
+        Cache one user's memories of a strategy with their embeddings from embedding_model.
+
+        Args:
+            rows: (memory, embedding) tuples
+            generation: Value of self.generation before the rows were read; the
+                rows are discarded when a write invalidated entries since
+        """
+        key = self.key(user_id, strategy, embedding_model)
+        entry = None
+        if len(rows) <= self.max_memories:
+            entry = StrategyMemoryMatrix([memory for memory, _ in rows], [embedding for _, embedding in rows])
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._discard(key)
+            self._entries[key] = entry
+            self._loaded_at[key] = time.monotonic()
+            self._bytes += entry.nbytes if entry is not None else 0
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def invalidate(self, user_id: Optional[str] = None, strategy: Optional[str] = None, embedding_model: Optional[str] = None):
+        """Drop every entry matching the given user, strategy and/or embedding model."""
+        strategy = getattr(strategy, "value", strategy)
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                entry_user, entry_strategy, entry_model = key
+                if user_id is not None and entry_user != user_id:
+                    continue
+                if strategy is not None and entry_strategy != strategy:
+                    continue
+                if embedding_model is not None and entry_model != embedding_model:
+                    continue
+                self._discard(key)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._loaded_at.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and cached size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+    def _get(self, key: IndexKey) -> Tuple[Optional[StrategyMemoryMatrix], bool]:
+        """Look up a live entry; returns (entry, whether the key is cached at all)."""
+        with self._lock:
+            if key not in self._entries:
+                return None, False
+            if time.monotonic() - self._loaded_at[key] > self.ttl:
+                self._discard(key)
+                return None, False
+            self._entries.move_to_end(key)
+            return self._entries[key], True
+
+    def _discard(self, key: Hashable):
+        """Remove an entry; the caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        self._loaded_at.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+
+_memory_index: Optional[MemoryIndex] = None
+
+
+def get_memory_index() -> Optional[MemoryIndex]:
+    """Get the process-wide memory index, or None when settings.MEMORY_INDEX_ENABLED is off."""
+    global _memory_index
+    if not settings.MEMORY_INDEX_ENABLED:
+        return None
+    if _memory_index is None:
+        _memory_index = MemoryIndex(
+            max_bytes=settings.MEMORY_INDEX_MAX_BYTES,
+            max_memories=settings.MEMORY_INDEX_MAX_MEMORIES,
+            ttl=settings.MEMORY_INDEX_TTL_SECONDS,
+        )
+    return _memory_index
+
+
+def _invalidate_memory_index(user_id: Optional[str], strategy: Optional[str], embedding_model: Optional[str]):
+    """Memory write listener dropping the affected index entries."""
+    if _memory_index is not None:
+        _memory_index.invalidate(user_id=user_id, strategy=strategy, embedding_model=embedding_model)
+
+
+register_memory_write_listener(_invalidate_memory_index)
@@ -3,6 +3,7 @@ import uuid
 from typing import Optional, List
 from datetime import datetime
 from sqlalchemy import (
+    BigInteger,
     DateTime,
     String,
     Text,
@@ -14,11 +15,22 @@ from sqlalchemy import (
     Enum,
     TIMESTAMP,
     func,
+    cast,
+    Computed,
 )
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from pgvector.sqlalchemy import Vector
-from .enums import MemoryStrategyEnums
+from pgvector.sqlalchemy import Vector, HALFVEC
+from .enums import ExtractionJobStatus, MemoryStrategyEnums
+from src.config.settings import settings
+
+# Width of the legacy ThreadMemory.embedding column; change with
+# migrations/003_embedding_dimensions.sql. Per-model embeddings live in
+# ThreadMemoryEmbedding.
+EMBEDDING_DIMENSIONS = settings.EMBEDDING_DIMENSIONS
+
+# Text search configuration of ThreadMemory.contentTsv; queries must use the same one
+TEXT_SEARCH_CONFIG = "english"
 
 class Base(DeclarativeBase):
     pass
@@ -277,12 +289,16 @@ class ThreadMemory(Base):
         default=uuid.uuid4,
     )
 
-    userId: Mapped[Optional[uuid.UUID]] = mapped_column(
+    # VARCHAR(255) in init.sql; mapped with the native type so filters compare
+    # without casts and can use idx_userId / idx_threadId
+    userId: Mapped[Optional[str]] = mapped_column(
+        String(255),
         ForeignKey("User.id"),
         nullable=True,
     )
 
-    threadId: Mapped[Optional[uuid.UUID]] = mapped_column(
+    threadId: Mapped[Optional[str]] = mapped_column(
+        String(255),
         ForeignKey("Thread.id"),
         nullable=True,
     )
@@ -295,12 +311,19 @@ class ThreadMemory(Base):
     namespace: Mapped[Optional[str]] = mapped_column(nullable=True)
 
     embedding: Mapped[Optional[list[float]]] = mapped_column(
-        Vector(3072),
+        Vector(EMBEDDING_DIMENSIONS),
         nullable=True,
     )
 
     content: Mapped[str] = mapped_column(nullable=False)
 
+    # Full-text search vector maintained by Postgres; never loaded with the row
+    contentTsv: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', content)", persisted=True),
+        deferred=True,
+    )
+
     thread_memory_metadata: Mapped[dict] = mapped_column(
         "metadata", 
         JSONB,
@@ -329,8 +352,159 @@ class ThreadMemory(Base):
         Index("idx_userId", "userId"),
         Index("idx_threadId", "threadId"),
         Index("idx_namespace", "namespace"),
+        Index("idx_threadmemory_content_tsv", "contentTsv", postgresql_using="gin"),
+    )
+
+# pgvector cannot index more than 2000 vector dimensions, so the ANN index is
+# built over a halfvec cast of the embedding (up to 4000 dimensions). Reduced
+# dimensionalities keep the cast too, halving the index size.
+# Queries must use the same cast expression for the planner to pick it.
+Index(
+    "idx_threadmemory_embedding_hnsw",
+    cast(ThreadMemory.embedding, HALFVEC(EMBEDDING_DIMENSIONS)).label("embedding"),
+    postgresql_using="hnsw",
+    postgresql_with={"m": settings.HNSW_M, "ef_construction": settings.HNSW_EF_CONSTRUCTION},
+    postgresql_ops={"embedding": "halfvec_cosine_ops"},
+)
+
+class MemoryEmbedding(Base):
+    """Embedding of a memory produced by one embedding model."""
+    __tablename__ = "ThreadMemoryEmbedding"
+
+    memoryId: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("ThreadMemory.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    model: Mapped[str] = mapped_column(String, primary_key=True)
+
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # Dimension-less so every model keeps its own dimensionality; each model
+    # gets a partial HNSW index over its halfvec cast (see queries.model_embedding_index_ddl)
+    embedding: Mapped[list[float]] = mapped_column(Vector(), nullable=False)
+
+    createdAt: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    updatedAt: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        Index("idx_threadmemory_embedding_model", "model"),
+    )
+
+class EmbeddingCacheEntry(Base):
+    """Content-addressed embedding, keyed by hash(model, dimensions, text)."""
+    __tablename__ = "EmbeddingCache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    model: Mapped[str] = mapped_column(String, nullable=False)
+
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # Dimension-less so vectors of every model/dimensionality share the table
+    embedding: Mapped[list[float]] = mapped_column(Vector(), nullable=False)
+
+    createdAt: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        server_default=func.now(),
+        nullable=False,
     )
 
+    lastAccessedAt: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        Index("idx_embedding_cache_last_accessed", "lastAccessedAt"),
+    )
+
+class MemoryExtractionJob(Base):
+    """
+    Durable memory extraction job, claimed by workers with FOR UPDATE SKIP LOCKED.
+
+    availableAt is when the job may next be claimed: creation time for a new
+    job, the end of the visibility timeout while a worker holds it (so a job
+    whose worker died becomes claimable again) and the retry time after a
+    failure.
+    """
+    __tablename__ = "MemoryExtractionJob"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+
+    # thread id, message watermark and mode; enqueuing the same work twice is a no-op
+    idempotencyKey: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+
+    threadId: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    userId: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    # Highest ExchangeMessage id of the thread when the job was enqueued
+    watermark: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    # Session manager configuration (without API keys) and extraction options
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+    status: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        default=ExtractionJobStatus.queued.value,
+        server_default=ExtractionJobStatus.queued.value,
+    )
+
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    maxAttempts: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    availableAt: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    lockedBy: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    lastError: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    createdAt: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    updatedAt: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        Index("idx_memory_extraction_job_thread", "threadId"),
+    )
+
+# Only claimable jobs are indexed, so finished jobs do not slow down claiming
+Index(
+    "idx_memory_extraction_job_available",
+    MemoryExtractionJob.availableAt,
+    postgresql_where=MemoryExtractionJob.status.in_([
+        ExtractionJobStatus.queued.value,
+        ExtractionJobStatus.running.value,
+    ]),
+)
+
 class ExchangeThread(Base):
     __tablename__ = "ExchangeThread"
 
@@ -0,0 +1,871 @@
+"""
+SQL statement builders used by the repository.
+"""
+import hashlib
+import re
+from datetime import timedelta
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from sqlalchemy import Delete, Float, Insert, Select, TextClause, Update, and_, bindparam, delete, exists, func, literal, literal_column, select, text, update, cast, union_all
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import aliased, defer
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from pgvector.sqlalchemy import HALFVEC
+
+from .models import EMBEDDING_DIMENSIONS, TEXT_SEARCH_CONFIG, EmbeddingCacheEntry, ExchangeMessage, ExchangeThread, MemoryEmbedding, MemoryExtractionJob, ThreadMemory
+from .enums import ExtractionJobStatus, MemoryStrategyEnums
+from .invalidation import MEMORY_WRITE_CHANNEL
+from src.config.settings import settings
+
+
+def thread_messages_stmt(thread_id: str, is_summarized: Optional[bool] = None, limit: Optional[int] = None) -> Select:
+    """Build the statement selecting messages of a thread in chronological order."""
+    stmt = select(ExchangeMessage).where(ExchangeMessage.thread_id == thread_id).order_by(ExchangeMessage.created_at)
+    if is_summarized is not None:
+        stmt = stmt.where(ExchangeMessage.is_summarized == is_summarized)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def recent_thread_messages_stmt(thread_id: str, limit: Optional[int] = None) -> Select:
+    """Build the statement selecting the most recent messages of a thread, newest first."""
+    return (
+        select(ExchangeMessage)
+        .where(ExchangeMessage.thread_id == thread_id)
+        .order_by(
+            ExchangeMessage.created_at.desc(),
+            ExchangeMessage.id.desc(),
+        )
+        .limit(limit)
+    )
+
+
+def thread_stmt(thread_id: str) -> Select:
+    """Build the statement selecting an exchange thread by ID."""
+    return select(ExchangeThread).where(ExchangeThread.id == thread_id)
+
+
+def memory_stmt(memory_id) -> Select:
+    """Build the statement selecting a memory by ID."""
+    return select(ThreadMemory).where(ThreadMemory.id == memory_id)
+
+
+def memory_namespace(user_id: str, thread_id: str, strategy: str) -> str:
+    """Build the namespace a memory is stored under."""
+    namespace = f'/strategies/{strategy}/users/{user_id}'
+    if strategy == MemoryStrategyEnums.SUMMARY.value:
+        namespace += f'/threads/{thread_id}'
+    return namespace
+
+
+def embedding_distance(query_vector):
+    """
+    Cosine distance between stored embeddings and a query vector.
+
+    Both sides are cast to halfvec so the expression matches
+    idx_threadmemory_embedding_hnsw and the planner can use the index.
+    """
+    halfvec = HALFVEC(EMBEDDING_DIMENSIONS)
+    return cast(ThreadMemory.embedding, halfvec).cosine_distance(cast(query_vector, halfvec))
+
+
+def model_embedding_distance(embedding_model: str, query_vector):
+    """
+    Cosine distance between a model's stored embeddings and a query vector.
+
+    Cast to halfvec of the model's dimensionality to match its partial
+    HNSW index (see model_embedding_index_ddl).
+    """
+    halfvec = HALFVEC(settings.embedding_dimensions(embedding_model))
+    return cast(MemoryEmbedding.embedding, halfvec).cosine_distance(cast(query_vector, halfvec))
+
+
+def hnsw_settings_stmt(ef_search: Optional[int] = None, iterative_scan: Optional[str] = None) -> Optional[Select]:
+    """
+    Build the statement applying HNSW search settings to the current transaction.
+
+    Args:
+        ef_search: Candidate list size (hnsw.ef_search)
+        iterative_scan: hnsw.iterative_scan mode (pgvector >= 0.8), keeps scanning
+            the index when the userId/strategy filters discard candidates
+
+    Returns:
+        Statement to execute before the search, or None when nothing is set
+    """
+    settings_to_apply = []
+    if ef_search:
+        settings_to_apply.append(func.set_config('hnsw.ef_search', str(ef_search), True))
+    if iterative_scan:
+        settings_to_apply.append(func.set_config('hnsw.iterative_scan', iterative_scan, True))
+    if not settings_to_apply:
+        return None
+    return select(*settings_to_apply)
+
+
+def planner_settings_stmt(planner_settings: Dict[str, str]) -> Select:
+    """Build the statement applying planner settings (e.g. enable_sort) to the current transaction."""
+    return select(*[func.set_config(name, value, True) for name, value in planner_settings.items()])
+
+
+def embedding_index_ddl(
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    concurrently: bool = True,
+) -> TextClause:
+    """
+    Build the DDL creating the HNSW index over the halfvec-cast embedding.
+
+    Args:
+        m: Max connections per layer (defaults to settings.HNSW_M)
+        ef_construction: Build-time candidate list size (defaults to settings.HNSW_EF_CONSTRUCTION)
+        concurrently: Build without locking writes (must run outside a transaction)
+    """
+    m = int(m or settings.HNSW_M)
+    ef_construction = int(ef_construction or settings.HNSW_EF_CONSTRUCTION)
+    return text(
+        f'CREATE INDEX {"CONCURRENTLY " if concurrently else ""}IF NOT EXISTS idx_threadmemory_embedding_hnsw '
+        f'ON "ThreadMemory" USING hnsw ((embedding::halfvec({EMBEDDING_DIMENSIONS})) halfvec_cosine_ops) '
+        f'WITH (m = {m}, ef_construction = {ef_construction})'
+    )
+
+
+def model_embedding_index_name(embedding_model: str) -> str:
+    """Name of the HNSW index over one model's embeddings (within PostgreSQL's 63-byte limit)."""
+    slug = re.sub(r'[^a-z0-9]+', '_', embedding_model.lower()).strip('_')
+    name = f"idx_threadmemory_embedding_{slug}_hnsw"
+    if len(name) > 63:
+        digest = hashlib.sha1(embedding_model.encode("utf-8")).hexdigest()[:8]
+        slug = slug[:63 - len('idx_threadmemory_embedding___hnsw') - len(digest)].rstrip('_')
+        name = f"idx_threadmemory_embedding_{slug}_{digest}_hnsw"
+    return name
+
+
+def model_embedding_index_ddl(
+    embedding_model: str,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    concurrently: bool = True,
+) -> TextClause:
+    """
+    Build the DDL creating the partial HNSW index over one model's embeddings.
+
+    ThreadMemoryEmbedding.embedding has no fixed dimensionality, so each model
+    is indexed separately over a halfvec cast of its own size, restricted to
+    its rows.
+
+    Args:
+        embedding_model: Embedding model name
+        m: Max connections per layer (defaults to settings.HNSW_M)
+        ef_construction: Build-time candidate list size (defaults to settings.HNSW_EF_CONSTRUCTION)
+        concurrently: Build without locking writes (must run outside a transaction)
+    """
+    m = int(m or settings.HNSW_M)
+    ef_construction = int(ef_construction or settings.HNSW_EF_CONSTRUCTION)
+    dimensions = settings.embedding_dimensions(embedding_model)
+    model_literal = embedding_model.replace("'", "''")
+    return text(
+        f'CREATE INDEX {"CONCURRENTLY " if concurrently else ""}IF NOT EXISTS {model_embedding_index_name(embedding_model)} '
+        f'ON "ThreadMemoryEmbedding" USING hnsw ((embedding::halfvec({dimensions})) halfvec_cosine_ops) '
+        f'WITH (m = {m}, ef_construction = {ef_construction}) '
+        f"WHERE model = '{model_literal}'"
+    )
+
+
+def with_embedding_option(stmt: Select, with_embedding: bool = False) -> Select:
+    """
+    Defer the embedding column of ThreadMemory rows unless it is requested.
+
+    A 3072-dim vector is 12-25 KB per row on the wire and a large Python list
+    once decoded, while retrieval callers only read id, content, metadata
+    and timestamps. Deferred with raiseload so an accidental access fails
+    loudly instead of issuing a per-row lazy load.
+    """
+    if with_embedding:
+        return stmt
+    return stmt.options(defer(ThreadMemory.embedding, raiseload=True))
+
+
+class MemoryQuery(BaseModel):
+    """Per-strategy parameters of a multi-strategy memory retrieval."""
+
+    strategy_id: MemoryStrategyEnums = Field(..., description="Strategy whose memories are searched")
+    similarity_threshold: float = Field(default=0.1, description="Minimum similarity score for this strategy")
+    limit: Optional[int] = Field(default=5, description="Maximum number of memories to return for this strategy")
+
+
+def memories_stmt(
+    user_id: str,
+    strategy_id: MemoryStrategyEnums,
+    similarity_threshold: float = 0.1,
+    query_embedding: Optional[list] = None,
+    thread_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    with_embedding: bool = False,
+    embedding_model: Optional[str] = None,
+    query_text: Optional[str] = None
+) -> Select:
+    """
+    Build the memory retrieval statement.
+
+    With a query embedding the statement selects (memory, similarity) rows
+    ordered by similarity, otherwise it selects plain memories. The embedding
+    column is only loaded when with_embedding is set.
+    """
+    if query_embedding:
+        memory_query = MemoryQuery(
+            strategy_id=strategy_id,
+            similarity_threshold=similarity_threshold,
+            limit=limit,
+        )
+        return multi_strategy_memories_stmt(
+            user_id=user_id,
+            memory_queries=[memory_query],
+            query_embedding=query_embedding,
+            thread_id=thread_id,
+            with_embedding=with_embedding,
+            embedding_model=embedding_model,
+            query_text=query_text,
+        )
+    # No embedding query - standard retrieval
+    stmt = with_embedding_option(select(ThreadMemory), with_embedding).where(
+        ThreadMemory.userId == user_id,
+        ThreadMemory.strategy == strategy_id
+    )
+    if thread_id:
+        stmt = stmt.where(ThreadMemory.threadId == thread_id)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def summary_topic_index_stmt(user_id: str, thread_id: str, limit: Optional[int] = None) -> Select:
+    """
+    Build the statement selecting a thread's summary topic index.
+
+    Selects (id, topic_name, global_summary) of each summary chunk, most
+    recently updated first, without loading the detailed summary in content
+    and metadata or the embedding.
+    """
+    metadata = ThreadMemory.thread_memory_metadata
+    stmt = select(
+        ThreadMemory.id,
+        metadata["topic_name"].astext.label("topic_name"),
+        metadata["global_summary"].astext.label("global_summary"),
+    ).where(
+        ThreadMemory.userId == user_id,
+        ThreadMemory.threadId == thread_id,
+        ThreadMemory.strategy == MemoryStrategyEnums.SUMMARY,
+    ).order_by(ThreadMemory.updatedAt.desc())
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def memories_by_ids_stmt(user_id: str, memory_ids: list, with_embedding: bool = False) -> Select:
+    """Build the statement selecting a user's memories by ID."""
+    return with_embedding_option(select(ThreadMemory), with_embedding).where(
+        ThreadMemory.userId == user_id,
+        ThreadMemory.id.in_(memory_ids),
+    )
+
+
+def _query_distance(query_embedding: list, embedding_model: Optional[str] = None):
+    """Cosine distance to the query vector, over the model's vectors or the legacy column."""
+    if embedding_model:
+        dimensions = settings.embedding_dimensions(embedding_model)
+    else:
+        dimensions = EMBEDDING_DIMENSIONS
+    # One named parameter so the query vector is bound once for every branch
+    query_vector = bindparam('query_embedding', query_embedding, type_=HALFVEC(dimensions))
+    if embedding_model:
+        return model_embedding_distance(embedding_model, query_vector)
+    return embedding_distance(query_vector)
+
+
+def _strategy_branch(
+    stmt: Select,
+    user_id: str,
+    memory_query: MemoryQuery,
+    thread_id: Optional[str] = None,
+    embedding_model: Optional[str] = None,
+) -> Select:
+    """Restrict a branch to one user's memories of a strategy (and thread), joining the model's vectors."""
+    stmt = stmt.where(
+        ThreadMemory.userId == user_id,
+        ThreadMemory.strategy == memory_query.strategy_id,
+    )
+    if embedding_model:
+        # Rendered inline so the planner can match the model's partial index
+        stmt = stmt.join(
+            MemoryEmbedding,
+            and_(
+                MemoryEmbedding.memoryId == ThreadMemory.id,
+                MemoryEmbedding.model == literal(embedding_model, literal_execute=True),
+            ),
+        )
+    if thread_id and len(thread_id) > 0:
+        stmt = stmt.where(ThreadMemory.threadId == thread_id)
+    return stmt
+
+
+def multi_strategy_memories_stmt(
+    user_id: str,
+    memory_queries: List[MemoryQuery],
+    query_embedding: list,
+    thread_id: Optional[str] = None,
+    with_embedding: bool = False,
+    embedding_model: Optional[str] = None,
+    query_text: Optional[str] = None,
+) -> Select:
+    """
+    Build a single statement returning the top-k memories of several strategies.
+
+    Each strategy gets its own branch that orders by raw cosine distance with
+    a LIMIT, so the HNSW index can serve it, and compares userId/threadId in
+    their native VARCHAR type so the b-tree indexes stay usable. The
+    strategy's similarity threshold is applied to the top-k afterwards. The
+    branches are combined with UNION ALL so every strategy is served by one
+    round trip. Rows are (memory, similarity) ordered by strategy then score.
+
+    With an embedding_model the search runs over that model's vectors in
+    ThreadMemoryEmbedding, so vectors of different models are never
+    compared; otherwise over the legacy ThreadMemory.embedding column
+    (memories stored before migration 004 that no model has re-embedded yet).
+    With a query_text the hybrid statement is built instead (see
+    hybrid_memories_stmt).
+    """
+    if query_text:
+        return hybrid_memories_stmt(
+            user_id=user_id,
+            memory_queries=memory_queries,
+            query_embedding=query_embedding,
+            query_text=query_text,
+            thread_id=thread_id,
+            with_embedding=with_embedding,
+            embedding_model=embedding_model,
+        )
+    distance = _query_distance(query_embedding, embedding_model)
+    branches = []
+    for memory_query in memory_queries:
+        branch = _strategy_branch(
+            select(
+                ThreadMemory.id.label('id'),
+                (1 - distance).label('similarity'),
+                literal(memory_query.similarity_threshold, Float).label('similarity_threshold'),
+            ),
+            user_id, memory_query, thread_id, embedding_model,
+        )
+        branches.append(branch.order_by(distance).limit(memory_query.limit))
+    ranked = union_all(*branches).subquery('ranked')
+    return (
+        with_embedding_option(select(ThreadMemory, ranked.c.similarity), with_embedding)
+        .join(ranked, ThreadMemory.id == ranked.c.id)
+        .where(ranked.c.similarity >= ranked.c.similarity_threshold)
+        .order_by(ThreadMemory.strategy, ranked.c.similarity.desc())
+    )
+
+
+def hybrid_memories_stmt(
+    user_id: str,
+    memory_queries: List[MemoryQuery],
+    query_embedding: list,
+    query_text: str,
+    thread_id: Optional[str] = None,
+    with_embedding: bool = False,
+    embedding_model: Optional[str] = None,
+    rrf_k: Optional[int] = None,
+    candidate_multiplier: Optional[int] = None,
+) -> Select:
+    """
+    Build a single statement fusing full-text and vector retrieval per strategy.
+
+    For each strategy two candidate lists of limit * candidate_multiplier
+    memories are ranked: the HNSW nearest neighbours, and the full-text
+    matches of query_text (GIN index on contentTsv) by ts_rank_cd. Both lists
+    only keep memories at or above the strategy's similarity threshold, so
+    the threshold means the same as in vector retrieval. They are fused with
+    reciprocal rank fusion, rrf_score = sum(1 / (rrf_k + rank)), and the top
+    limit kept. Exact names, numbers and booking references the embedding
+    ranks low are still found lexically. Everything runs in one round trip.
+    Rows are (memory, cosine similarity, rrf_score) ordered by strategy then
+    rrf_score; the RRF score is a rank statistic (at most 2 / (rrf_k + 1))
+    and is not comparable with similarity thresholds.
+
+    Args:
+        rrf_k: RRF damping constant (defaults to settings.HYBRID_RRF_K)
+        candidate_multiplier: Candidates per list relative to the strategy
+            limit (defaults to settings.HYBRID_CANDIDATE_MULTIPLIER)
+    """
+    rrf_k = int(rrf_k or settings.HYBRID_RRF_K)
+    candidate_multiplier = int(candidate_multiplier or settings.HYBRID_CANDIDATE_MULTIPLIER)
+    distance = _query_distance(query_embedding, embedding_model)
+    ts_query = func.websearch_to_tsquery(
+        literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"),
+        bindparam('query_text', query_text),
+    )
+    lexical_rank = func.ts_rank_cd(ThreadMemory.contentTsv, ts_query)
+    branches = []
+    for memory_query in memory_queries:
+        candidates = (memory_query.limit or 5) * candidate_multiplier
+        nearest = (
+            _strategy_branch(
+                select(ThreadMemory.id.label('id'), (1 - distance).label('similarity')),
+                user_id, memory_query, thread_id, embedding_model,
+            )
+            .order_by(distance)
+            .limit(candidates)
+            .subquery()
+        )
+        threshold = literal(memory_query.similarity_threshold, Float)
+        lexical = (
+            _strategy_branch(
+                select(ThreadMemory.id.label('id'), (1 - distance).label('similarity'), lexical_rank.label('score')),
+                user_id, memory_query, thread_id, embedding_model,
+            )
+            .where(ThreadMemory.contentTsv.op('@@')(ts_query))
+            .where((1 - distance) >= threshold)
+            .order_by(lexical_rank.desc())
+            .limit(candidates)
+            .subquery()
+        )
+        ranked = union_all(
+            select(
+                nearest.c.id,
+                nearest.c.similarity,
+                func.row_number().over(order_by=nearest.c.similarity.desc()).label('rank'),
+            ).where(nearest.c.similarity >= threshold),
+            select(
+                lexical.c.id,
+                lexical.c.similarity,
+                func.row_number().over(order_by=lexical.c.score.desc()).label('rank'),
+            ),
+        ).subquery()
+        rrf_score = func.sum(literal(1.0, Float) / (rrf_k + ranked.c.rank))
+        branches.append(
+            select(
+                ranked.c.id.label('id'),
+                func.max(ranked.c.similarity).label('similarity'),
+                rrf_score.label('rrf_score'),
+            )
+            .group_by(ranked.c.id)
+            .order_by(rrf_score.desc())
+            .limit(memory_query.limit)
+        )
+    fused = union_all(*branches).subquery('ranked')
+    return (
+        with_embedding_option(select(ThreadMemory, fused.c.similarity, fused.c.rrf_score), with_embedding)
+        .join(fused, ThreadMemory.id == fused.c.id)
+        .order_by(ThreadMemory.strategy, fused.c.rrf_score.desc())
+    )
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN wrapper for a statement, used to inspect retrieval query plans."""
+
+    inherit_cache = False
+
+    def __init__(self, statement, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element: Explain, compiler, **kw):
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if element.analyze else "EXPLAIN "
+    return prefix + compiler.process(element.statement, **kw)
+
+
+def memory_write_notify_stmt(payload: str) -> Select:
+    """Build the statement publishing a memory write on MEMORY_WRITE_CHANNEL when the transaction commits."""
+    return select(func.pg_notify(MEMORY_WRITE_CHANNEL, payload))
+
+
+def mark_messages_as_summarized_stmt(message_ids: List[int]) -> Update:
+    """Build the statement flagging messages as summarized."""
+    return (
+        update(ExchangeMessage)
+        .where(ExchangeMessage.id.in_(message_ids))
+        .values(is_summarized=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def user_memories_with_embeddings_stmt(user_id: str, strategy_ids: List[MemoryStrategyEnums], embedding_model: str) -> Select:
+    """Build the statement selecting (memory, embedding) of a user's memories embedded by a model."""
+    return (
+        with_embedding_option(select(ThreadMemory, MemoryEmbedding.embedding))
+        .join(
+            MemoryEmbedding,
+            and_(
+                MemoryEmbedding.memoryId == ThreadMemory.id,
+                MemoryEmbedding.model == embedding_model,
+            ),
+        )
+        .where(
+            ThreadMemory.userId == user_id,
+            ThreadMemory.strategy.in_(strategy_ids),
+        )
+    )
+
+
+def memory_embedding_upsert_stmt(entries: List[dict]) -> Insert:
+    """
+    Build the statement storing per-model memory embeddings, replacing existing ones.
+
+    Args:
+        entries: Dicts of memoryId, model, dimensions and embedding
+    """
+    stmt = pg_insert(MemoryEmbedding).values(entries)
+    return stmt.on_conflict_do_update(
+        index_elements=[MemoryEmbedding.memoryId, MemoryEmbedding.model],
+        set_={
+            "dimensions": stmt.excluded.dimensions,
+            "embedding": stmt.excluded.embedding,
+            "updatedAt": func.now(),
+        },
+    )
+
+
+def stale_memory_embeddings_delete_stmt(memory_id, keep_model: str) -> Delete:
+    """Build the statement dropping other models' embeddings of a memory whose content changed."""
+    return delete(MemoryEmbedding).where(
+        MemoryEmbedding.memoryId == memory_id,
+        MemoryEmbedding.model != keep_model,
+    )
+
+
+def _missing_embedding_filter(embedding_model: str, user_id: Optional[str] = None) -> list:
+    """Where-clauses selecting memories without an embedding from embedding_model."""
+    clauses = [
+        ~exists().where(
+            MemoryEmbedding.memoryId == ThreadMemory.id,
+            MemoryEmbedding.model == embedding_model,
+        )
+    ]
+    if user_id:
+        clauses.append(ThreadMemory.userId == user_id)
+    return clauses
+
+
+def memories_missing_embedding_stmt(
+    embedding_model: str,
+    user_id: Optional[str] = None,
+    after_id=None,
+    limit: Optional[int] = None,
+) -> Select:
+    """
+    Build the statement selecting (id, content) of memories not yet embedded by a model.
+
+    Ordered by id so callers can page with after_id (keyset pagination).
+    """
+    stmt = select(ThreadMemory.id, ThreadMemory.content).where(*_missing_embedding_filter(embedding_model, user_id))
+    if after_id is not None:
+        stmt = stmt.where(ThreadMemory.id > after_id)
+    stmt = stmt.order_by(ThreadMemory.id)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def count_memories_missing_embedding_stmt(embedding_model: str, user_id: Optional[str] = None) -> Select:
+    """Build the statement counting memories not yet embedded by a model."""
+    return select(func.count()).select_from(ThreadMemory).where(*_missing_embedding_filter(embedding_model, user_id))
+
+
+def user_memory_count_stmt(user_id: str) -> Select:
+    """Build the statement counting a user's memories."""
+    return select(func.count()).select_from(ThreadMemory).where(ThreadMemory.userId == user_id)
+
+
+def embedding_model_coverage_stmt(user_id: str) -> Select:
+    """Build the statement selecting (model, count) of a user's memories embedded by each model."""
+    return (
+        select(MemoryEmbedding.model, func.count())
+        .join(ThreadMemory, ThreadMemory.id == MemoryEmbedding.memoryId)
+        .where(ThreadMemory.userId == user_id)
+        .group_by(MemoryEmbedding.model)
+    )
+
+
+def embedding_cache_lookup_stmt(keys: List[str], touch_interval: timedelta) -> Select:
+    """Build the statement fetching cached embeddings as (key, embedding, stale) rows, stale when last accessed before touch_interval ago."""
+    return select(
+        EmbeddingCacheEntry.key,
+        EmbeddingCacheEntry.embedding,
+        (EmbeddingCacheEntry.lastAccessedAt < func.now() - touch_interval).label('stale'),
+    ).where(EmbeddingCacheEntry.key.in_(keys))
+
+
+def embedding_cache_touch_stmt(keys: List[str]) -> Update:
+    """Build the statement refreshing the last access time of cached embeddings."""
+    return (
+        update(EmbeddingCacheEntry)
+        .where(EmbeddingCacheEntry.key.in_(keys))
+        .values(lastAccessedAt=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def embedding_cache_insert_stmt(entries: List[dict]) -> Insert:
+    """Build the statement storing embeddings in the cache, keeping existing entries."""
+    return (
+        pg_insert(EmbeddingCacheEntry)
+        .values(entries)
+        .on_conflict_do_nothing(index_elements=[EmbeddingCacheEntry.key])
+    )
+
+
+def embedding_cache_evict_stmts(max_age: Optional[timedelta] = None, max_rows: Optional[int] = None) -> List[Delete]:
+    """
+    Build the statements evicting cache entries by age and by table size.
+
+    Args:
+        max_age: Remove entries not accessed for longer than this
+        max_rows: Keep only the most recently accessed max_rows entries
+    """
+    stmts = []
+    if max_age is not None:
+        stmts.append(
+            delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.lastAccessedAt < func.now() - max_age)
+        )
+    if max_rows is not None:
+        cutoff = (
+            select(EmbeddingCacheEntry.lastAccessedAt)
+            .order_by(EmbeddingCacheEntry.lastAccessedAt.desc())
+            .offset(max_rows)
+            .limit(1)
+            .scalar_subquery()
+        )
+        stmts.append(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.lastAccessedAt <= cutoff))
+    return stmts
+
+
+def thread_watermark_stmt(thread_id: str) -> Select:
+    """Build the statement selecting the highest message id of a thread."""
+    return select(func.max(ExchangeMessage.id)).where(ExchangeMessage.thread_id == thread_id)
+
+
+def extraction_job_enqueue_stmt(entry: dict, delay: Optional[timedelta] = None) -> Insert:
+    """
+    Build the statement enqueuing an extraction job; returns its id, or nothing when the idempotency key exists.
+
+    Args:
+        delay: Make the job claimable only after this long (debounce)
+    """
+    if delay is not None:
+        entry = {**entry, "availableAt": func.now() + delay}
+    return (
+        pg_insert(MemoryExtractionJob)
+        .values(entry)
+        .on_conflict_do_nothing(index_elements=[MemoryExtractionJob.idempotencyKey])
+        .returning(MemoryExtractionJob.id)
+    )
+
+
+def extraction_job_merge_stmt(entry: dict, delay: timedelta, max_delay: timedelta) -> Update:
+    """
+    Build the statement folding a new extraction into the thread's pending job of the same mode.
+
+    A job that is still queued and has never been attempted is moved to the
+    new watermark and its start pushed back by delay, but never past
+    max_delay after it was first enqueued, so a burst of replies becomes one
+    extraction over the combined window. The payload keeps the job's oldest
+    watermark as from_watermark, so the window is computed over every merged
+    watermark, not only the newest. Returns the merged job's id, or nothing
+    when the thread has no pending job.
+    """
+    other = aliased(MemoryExtractionJob)
+    payload = bindparam("payload", entry["payload"], type_=JSONB).op("||", return_type=JSONB)(
+        func.jsonb_build_object(
+            literal_column("'from_watermark'"),
+            func.coalesce(MemoryExtractionJob.payload["from_watermark"].as_integer(), MemoryExtractionJob.watermark),
+        )
+    )
+    return (
+        update(MemoryExtractionJob)
+        .where(
+            MemoryExtractionJob.threadId == entry["threadId"],
+            MemoryExtractionJob.status == ExtractionJobStatus.queued.value,
+            MemoryExtractionJob.attempts == 0,
+            MemoryExtractionJob.payload["is_process_next_messages"].as_boolean()
+            == entry["payload"]["is_process_next_messages"],
+            ~exists().where(
+                other.idempotencyKey == entry["idempotencyKey"],
+                other.id != MemoryExtractionJob.id,
+            ),
+        )
+        .values(
+            idempotencyKey=entry["idempotencyKey"],
+            watermark=entry["watermark"],
+            payload=payload,
+            availableAt=func.least(func.now() + delay, MemoryExtractionJob.createdAt + max_delay),
+            updatedAt=func.now(),
+        )
+        .returning(MemoryExtractionJob.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def extraction_job_defer_stmt(job_id: int, worker_id: str, delay: timedelta) -> Update:
+    """Build the statement handing a claimed job back without counting the attempt (its thread is busy)."""
+    return (
+        update(MemoryExtractionJob)
+        .where(
+            MemoryExtractionJob.id == job_id,
+            MemoryExtractionJob.lockedBy == worker_id,
+            MemoryExtractionJob.status == ExtractionJobStatus.running.value,
+        )
+        .values(
+            status=ExtractionJobStatus.queued.value,
+            attempts=MemoryExtractionJob.attempts - 1,
+            lockedBy=None,
+            availableAt=func.now() + delay,
+            updatedAt=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def advisory_try_lock_stmt(namespace: int, key: str) -> Select:
+    """Build the statement trying to take the session-level advisory lock of a key, without waiting."""
+    return select(func.pg_try_advisory_lock(literal(namespace), func.hashtext(key)))
+
+
+def advisory_unlock_stmt(namespace: int, key: str) -> Select:
+    """Build the statement releasing the session-level advisory lock of a key."""
+    return select(func.pg_advisory_unlock(literal(namespace), func.hashtext(key)))
+
+
+_CLAIMABLE_STATUSES = [ExtractionJobStatus.queued.value, ExtractionJobStatus.running.value]
+
+
+def extraction_job_claim_stmt(worker_id: str, limit: int, visibility_timeout: timedelta) -> Update:
+    """
+    Build the statement claiming up to limit available extraction jobs for a worker.
+
+    A job is available when it is queued, or running with an expired
+    visibility timeout (its worker died), and has attempts left. Rows locked
+    by concurrent claims are skipped, so workers never block each other or
+    claim the same job. Claiming counts an attempt and hides the job from
+    other workers until the visibility timeout.
+    """
+    claimable = (
+        select(MemoryExtractionJob.id)
+        .where(
+            MemoryExtractionJob.status.in_(_CLAIMABLE_STATUSES),
+            MemoryExtractionJob.availableAt <= func.now(),
+            MemoryExtractionJob.attempts < MemoryExtractionJob.maxAttempts,
+        )
+        .order_by(MemoryExtractionJob.availableAt, MemoryExtractionJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte("claimable")
+    )
+    return (
+        update(MemoryExtractionJob)
+        .where(MemoryExtractionJob.id == claimable.c.id)
+        .values(
+            status=ExtractionJobStatus.running.value,
+            attempts=MemoryExtractionJob.attempts + 1,
+            lockedBy=worker_id,
+            availableAt=func.now() + visibility_timeout,
+            updatedAt=func.now(),
+        )
+        .returning(MemoryExtractionJob)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def extraction_jobs_exhausted_stmt() -> Update:
+    """Build the statement failing jobs whose last attempt's visibility timeout expired."""
+    return (
+        update(MemoryExtractionJob)
+        .where(
+            MemoryExtractionJob.status == ExtractionJobStatus.running.value,
+            MemoryExtractionJob.availableAt <= func.now(),
+            MemoryExtractionJob.attempts >= MemoryExtractionJob.maxAttempts,
+        )
+        .values(
+            status=ExtractionJobStatus.failed.value,
+            lockedBy=None,
+            lastError="Visibility timeout expired on the last attempt",
+            updatedAt=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def extraction_job_heartbeat_stmt(job_id: int, worker_id: str, visibility_timeout: timedelta) -> Update:
+    """Build the statement extending the visibility timeout of a job, if the worker still holds it."""
+    return (
+        update(MemoryExtractionJob)
+        .where(
+            MemoryExtractionJob.id == job_id,
+            MemoryExtractionJob.lockedBy == worker_id,
+            MemoryExtractionJob.status == ExtractionJobStatus.running.value,
+        )
+        .values(availableAt=func.now() + visibility_timeout, updatedAt=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def extraction_job_complete_stmt(job_id: int, watermark: int) -> Update:
+    """
+    Build the statement marking a job done once its extraction up to watermark succeeded.
+
+    Matched by id and watermark rather than by worker: a job reclaimed by
+    another worker after its visibility timeout is still done, and one
+    moved to a later watermark is not.
+    """
+    return (
+        update(MemoryExtractionJob)
+        .where(
+            MemoryExtractionJob.id == job_id,
+            MemoryExtractionJob.watermark == watermark,
+            MemoryExtractionJob.status.in_(_CLAIMABLE_STATUSES),
+        )
+        .values(status=ExtractionJobStatus.done.value, lockedBy=None, lastError=None, updatedAt=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def extraction_job_fail_stmt(job_id: int, worker_id: str, error: str, retry_delay: Optional[timedelta] = None) -> Update:
+    """
+    Build the statement recording a failed attempt, if the worker still holds the job.
+
+    Args:
+        retry_delay: Requeue the job after this long; None fails it permanently
+    """
+    if retry_delay is None:
+        values = {"status": ExtractionJobStatus.failed.value}
+    else:
+        values = {"status": ExtractionJobStatus.queued.value, "availableAt": func.now() + retry_delay}
+    return (
+        update(MemoryExtractionJob)
+        .where(
+            MemoryExtractionJob.id == job_id,
+            MemoryExtractionJob.lockedBy == worker_id,
+            MemoryExtractionJob.status == ExtractionJobStatus.running.value,
+        )
+        .values(lockedBy=None, lastError=error, updatedAt=func.now(), **values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def extraction_jobs_purge_stmt(max_age: timedelta) -> Delete:
+    """Build the statement deleting jobs that finished longer than max_age ago."""
+    return delete(MemoryExtractionJob).where(
+        MemoryExtractionJob.status.in_([ExtractionJobStatus.done.value, ExtractionJobStatus.failed.value]),
+        MemoryExtractionJob.updatedAt < func.now() - max_age,
+    )
+
+
+def print_similarity_scores(results: list, user_id: str, strategy_id: MemoryStrategyEnums, thread_id: Optional[str], limit: Optional[int]):
+    """Print the similarity scores of a retrieval for debugging."""
+    print("\n=== Similarity Scores for query ===")
+    print(f"User ID: {user_id}, Strategy: {strategy_id}, Thread ID: {thread_id}, Limit: {limit}")
+    for memory, score in results:
+        print(f"Score: {score:.4f} | Content: {memory.content[:50]}...")
+    print("=" * 50 + "\n")
@@ -2,21 +2,37 @@
 Base memory strategy interface.
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Type
 from datetime import datetime
-from llama_index.embeddings.openai import OpenAIEmbedding
-from google.genai.types import EmbedContentConfig
-from google import genai
+from pydantic import BaseModel
+from src.embeddings import Embedder
 from src.core.memory_config import AgentCoreMemoryConfig
 from src.storage.models import ThreadMemory
-from src.config.settings import settings as config_settings
+from src.storage.queries import MemoryQuery
 
 class MemoryStrategy(ABC):
     """Base class for memory strategies."""
     
+    # Structured action the extraction LLM returns for this strategy, and the
+    # field holding this strategy's actions in a fused extraction response
+    extraction_action_cls: Type[BaseModel]
+    fused_extraction_field: str
+    
     def __init__(self, strategy_id: str, config: Optional[AgentCoreMemoryConfig] = None):
         self.strategy_id = strategy_id
         self.config = config or {}
+        self._embedder: Optional[Embedder] = None
+    
+    @property
+    def embedder(self) -> Embedder:
+        """Embedder for the session's embedding model and API keys."""
+        if self._embedder is None:
+            self._embedder = Embedder(
+                model=self.config.embedding_model,
+                openai_api_key=self.config.openai_api_key,
+                gemini_api_key=self.config.gemini_api_key,
+            )
+        return self._embedder
     
     async def generate_embedding(self, text: str) -> List[float]:
         """
@@ -27,21 +43,46 @@ class MemoryStrategy(ABC):
         Returns:
             List of embedding vectors
         """
-        model_config = config_settings.EMBEDDING_MODELS.get(self.config.embedding_model)
-        if model_config["provider"] == "OpenAI":
-            embedding = OpenAIEmbedding(model=self.config.embedding_model, api_key=self.config.openai_api_key).get_text_embedding(text)
-            return embedding
-        elif model_config["provider"] == "Google": 
-            client = genai.Client(api_key=self.config.gemini_api_key)
-            result = client.models.embed_content(
-                        model=self.config.embedding_model,
-                        contents=text,
-                        config=EmbedContentConfig(
-                            output_dimensionality=3072,
-                        ),
-                    )
-            embedding = result.embeddings[0].values
-            return embedding
+        embeddings = await self.generate_embeddings([text])
+        return embeddings[0]
+    
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for several texts with the session's embedding model.
+        
+        Args:
+            texts: Text strings
+        Returns:
+            Embeddings in the same order as texts
+        """
+        return await self.embedder.generate_embeddings(texts)
+    
+    @property
+    @abstractmethod
+    def similarity_threshold(self) -> float:
+        """Minimum similarity score for memories of this strategy."""
+        pass
+
+    def lexical_query_text(self, query: Optional[str]) -> Optional[str]:
+        """Query text for the full-text half of hybrid retrieval, None in vector mode."""
+        if getattr(self.config, "retrieval_mode", "vector") == "hybrid":
+            return query
+        return None
+
+    def build_memory_query(self, limit: int) -> MemoryQuery:
+        """
+        Build this strategy's branch of a multi-strategy retrieval.
+
+        Args:
+            limit: Maximum number of memories to retrieve
+        Returns:
+            MemoryQuery with the strategy's own threshold and limit
+        """
+        return MemoryQuery(
+            strategy_id=self.strategy_id,
+            similarity_threshold=self.similarity_threshold,
+            limit=limit,
+        )
     
     @abstractmethod
     async def process_conversation(
@@ -64,13 +105,76 @@ class MemoryStrategy(ABC):
         """
         pass
     
+    @property
+    def supports_fused_extraction(self) -> bool:
+        """Whether this strategy's extraction can be part of a fused extraction call."""
+        return True
+    
+    def format_conversation(self, exchanges: List[Dict[str, str]]) -> str:
+        """
+        Format chat exchanges for an extraction prompt.
+        
+        Args:
+            exchanges: Messages with role, content and created_at
+        Returns:
+            Conversation text for the prompt
+        """
+        return ",\n".join(
+            f"""{{
+                "role": "{msg['role'].upper()}",
+                "content": "{msg['content']}",
+                "created_at": "{msg['created_at']}"
+            }}"""
+            for msg in exchanges
+        )
+    
+    @abstractmethod
+    async def load_existing_memories(self, user_id: str, thread_id: str) -> List[ThreadMemory]:
+        """
+        Load the existing memories the extraction LLM may update.
+        
+        Args:
+            user_id: User identifier
+            thread_id: Thread identifier
+        Returns:
+            Existing memories of this strategy
+        """
+        pass
+    
+    @abstractmethod
+    def build_extraction_prompt(self, conversation_text: str, existing_memories: List[ThreadMemory]) -> str:
+        """
+        Build this strategy's extraction instructions.
+        
+        Args:
+            conversation_text: Formatted conversation, or a reference to it
+                when the conversation is shared by a fused prompt
+            existing_memories: Memories returned by load_existing_memories
+        Returns:
+            Extraction prompt
+        """
+        pass
+    
+    @abstractmethod
+    async def build_memories(self, actions: List[BaseModel]) -> List[Dict[str, Any]]:
+        """
+        Embed extracted actions and turn them into memories to store.
+        
+        Args:
+            actions: Actions returned by the extraction LLM
+        Returns:
+            List of memory dictionaries to be stored
+        """
+        pass
+    
     @abstractmethod
     async def retrieve_memories(
         self,
         user_id: str,
         thread_id: Optional[str] = None,
         query: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        query_embedding: Optional[List[float]] = None
     ) -> List[ThreadMemory]:
         """
         Retrieve relevant memories.
@@ -80,6 +184,8 @@ class MemoryStrategy(ABC):
             thread_id: Optional Thread identifier
             query: Optional[str] = None,
             limit: Maximum number of memories to retrieve
+            query_embedding: Precomputed embedding of the query; when given
+                the query is not embedded again
             
         Returns:
             List of relevant memories
@@ -0,0 +1,113 @@
+"""
+Fused memory extraction across strategies.
+
+Each strategy normally makes its own structured LLM call, so every turn the
+same conversation is sent once per enabled strategy. Fused extraction sends
+it once, followed by each strategy's instructions and existing memories, and
+asks for one combined response with a field per strategy. The actions in
+each field are then embedded and returned through the owning strategy.
+"""
+import asyncio
+from typing import Any, Dict, List, Type
+
+from llama_index.core.llms import ChatMessage
+from pydantic import BaseModel, Field, create_model
+
+from src.prompts.fused import FUSED_EXTRACTION_PROMPT, FUSED_TASK_SECTION, SHARED_CONVERSATION_REFERENCE
+from src.strategies.base import MemoryStrategy
+
+
+class FusedMemoryExtraction:
+    """Extracts the memories of several strategies with one LLM call."""
+
+    def __init__(self, strategies: Dict[str, MemoryStrategy]):
+        """
+        Initialize the fused extraction.
+
+        Args:
+            strategies: Enabled strategies by id
+        """
+        self.strategies = strategies
+        self.output_cls = self._build_output_cls()
+
+    def _build_output_cls(self) -> Type[BaseModel]:
+        """Combined output schema with one list of actions per strategy."""
+        fields = {
+            strategy.fused_extraction_field: (
+                List[strategy.extraction_action_cls],
+                Field(
+                    default_factory=list,
+                    description=f"Actions of the \"{strategy.fused_extraction_field}\" task",
+                ),
+            )
+            for strategy in self.strategies.values()
+        }
+        return create_model("FusedExtractionResult", **fields)
+
+    async def process_conversation(
+        self,
+        user_id: str,
+        thread_id: str,
+        chat_history: List[Dict[str, str]],
+        model: str,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Extract every strategy's memories from a conversation.
+
+        Unlike MemoryStrategy.process_conversation, LLM errors are raised so
+        the caller can fall back to per-strategy extraction.
+
+        Args:
+            user_id: User identifier
+            thread_id: Thread identifier
+            chat_history: Messages to extract memories from
+            model: Chat model to extract with
+        Returns:
+            Memory dictionaries to be stored, by strategy id
+        """
+        strategy_memories: Dict[str, List[Dict[str, Any]]] = {strategy_id: [] for strategy_id in self.strategies}
+        if not chat_history:
+            return strategy_memories
+        strategies = list(self.strategies.values())
+        existing_memories = await asyncio.gather(*[
+            strategy.load_existing_memories(user_id=user_id, thread_id=thread_id)
+            for strategy in strategies
+        ])
+
+        tasks = "\n\n".join(
+            FUSED_TASK_SECTION.format(
+                field=strategy.fused_extraction_field,
+                instructions=strategy.build_extraction_prompt(
+                    conversation_text=SHARED_CONVERSATION_REFERENCE,
+                    existing_memories=memories,
+                ),
+            )
+            for strategy, memories in zip(strategies, existing_memories)
+        )
+        prompt = FUSED_EXTRACTION_PROMPT.format(
+            conversation_text=strategies[0].format_conversation(chat_history),
+            output_fields="\n".join(f"- \"{strategy.fused_extraction_field}\"" for strategy in strategies),
+            tasks=tasks,
+        )
+        # Every strategy builds the same LLM for a model; use the first one's
+        llm = strategies[0]._initialize_llm(model)
+        sllm = llm.as_structured_llm(output_cls=self.output_cls)
+        response = await sllm.achat([ChatMessage.from_str(prompt)])
+
+        strategy_actions = {
+            strategy_id: [
+                strategy.extraction_action_cls.model_validate(action)
+                for action in getattr(response.raw, strategy.fused_extraction_field, None) or []
+            ]
+            for strategy_id, strategy in self.strategies.items()
+        }
+        built = await asyncio.gather(*[
+            self.strategies[strategy_id].build_memories(actions)
+            for strategy_id, actions in strategy_actions.items()
+            if actions
+        ])
+        strategy_memories.update(zip(
+            [strategy_id for strategy_id, actions in strategy_actions.items() if actions],
+            built,
+        ))
+        return strategy_memories
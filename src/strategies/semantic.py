@@ -9,7 +9,7 @@ from llama_index.core.llms import ChatMessage
 from pydantic import BaseModel, Field
 
 from .base import MemoryStrategy
-from src.storage.repository import Repository
+from src.storage.async_repository import AsyncRepository
 from src.storage.enums import MemoryActionType, MemoryStrategyEnums
 from src.config.settings import settings
 from src.storage.models import ThreadMemory
@@ -52,11 +52,19 @@ class SemanticUpdateResult(BaseModel):
 class SemanticMemoryStrategy(MemoryStrategy):
     """Strategy that maintains factual semantic knowledge."""
 
+    extraction_action_cls = SemanticAction
+    fused_extraction_field = "semantic_facts"
+
     def __init__(
         self, strategy_id: MemoryStrategyEnums = MemoryStrategyEnums.SEMANTIC, config: Optional[AgentCoreMemoryConfig] = None
     ):
         super().__init__(strategy_id, config)
-        self.repository = Repository()
+        self.repository = AsyncRepository()
+
+    @property
+    def similarity_threshold(self) -> float:
+        """Minimum similarity score for semantic memories."""
+        return self.config.semantic_score
 
     def _initialize_llm(self, model: str):
         """Initialize LLM for semantic extraction."""
@@ -84,8 +92,8 @@ class SemanticMemoryStrategy(MemoryStrategy):
             return memories
         
         # Retrieve existing semantic memories
-        semantic_memories = await self.retrieve_memories(
-            user_id=user_id, limit=5
+        semantic_memories = await self.load_existing_memories(
+            user_id=user_id, thread_id=thread_id
         )
         
         # Generate semantic actions
@@ -97,11 +105,50 @@ class SemanticMemoryStrategy(MemoryStrategy):
         if semantic_actions is None or len(semantic_actions) == 0:
             return memories
         
+        return await self.build_memories(semantic_actions)
+
+    async def load_existing_memories(self, user_id: str, thread_id: str) -> List[ThreadMemory]:
+        """Load the user's semantic memories, across threads."""
+        return await self.retrieve_memories(
+            user_id=user_id, limit=5
+        )
+
+    def build_extraction_prompt(self, conversation_text: str, existing_memories: List[ThreadMemory]) -> str:
+        """Build the semantic extraction prompt over the existing memories."""
+        existing_semantic_memories = (
+            ",\n".join(
+                f"""{{
+                    "semantic_id": "{memory.id}",
+                    "title": "{memory.thread_memory_metadata.get('title', '')}",
+                    "memory_type": "{memory.thread_memory_metadata.get('memory_type', '')}",
+                    "description": "{memory.thread_memory_metadata.get('description', '')}",
+                    "created_at": "{memory.createdAt.isoformat()}",
+                    "updated_at": "{memory.updatedAt.isoformat()}"
+                }}""" 
+                for memory in existing_memories
+            )
+            if existing_memories else "None"
+        )
+
+        return SEMANTIC_SYSTEM_PROMPT.format(
+            conversation_text=conversation_text, 
+            existing_semantic_memories=existing_semantic_memories,
+            MemoryActionType=MemoryActionType
+        )
+
+    async def build_memories(self, actions: List[SemanticAction]) -> List[Dict[str, Any]]:
+        """Embed semantic actions and build the memories to store."""
+        memories = []
+        
+        # Embed every action's content in one batched request
+        contents = [
+            f"Title: {action.title}\nType: {action.memory_type}\nDescription: {action.description}\n"
+            for action in actions
+        ]
+        embeddings = await self.generate_embeddings(contents)
+        
         # Process each semantic action
-        for action in semantic_actions:
-            content = f"Title: {action.title}\nType: {action.memory_type}\nDescription: {action.description}\n"
-            embedding = await self.generate_embedding(text=content)
-            
+        for action, content, embedding in zip(actions, contents, embeddings):
             memory_dict = {
                 "memory_id": action.target_semantic_id or None,
                 "action": action.action,
@@ -122,34 +169,9 @@ class SemanticMemoryStrategy(MemoryStrategy):
         self, exchanges: List[Dict[str, str]], semantic_memories: List[ThreadMemory] = []
     ) -> Optional[List[SemanticAction]]:
         """Extract semantic knowledge from conversation exchanges."""
-        conversation_text = ",\n".join(
-            f"""{{
-                "role": "{msg['role'].upper()}",
-                "content": "{msg['content']}",
-                "created_at": "{msg['created_at']}"
-            }}"""
-            for msg in exchanges
-        )
-
-        existing_semantic_memories = (
-            ",\n".join(
-                f"""{{
-                    "semantic_id": "{memory.id}",
-                    "title": "{memory.thread_memory_metadata.get('title', '')}",
-                    "memory_type": "{memory.thread_memory_metadata.get('memory_type', '')}",
-                    "description": "{memory.thread_memory_metadata.get('description', '')}",
-                    "created_at": "{memory.createdAt.isoformat()}",
-                    "updated_at": "{memory.updatedAt.isoformat()}"
-                }}""" 
-                for memory in semantic_memories
-            )
-            if semantic_memories else "None"
-        )
-
-        prompt = SEMANTIC_SYSTEM_PROMPT.format(
-            conversation_text=conversation_text, 
-            existing_semantic_memories=existing_semantic_memories,
-            MemoryActionType=MemoryActionType
+        prompt = self.build_extraction_prompt(
+            conversation_text=self.format_conversation(exchanges),
+            existing_memories=semantic_memories,
         )
         
         try:
@@ -166,19 +188,23 @@ class SemanticMemoryStrategy(MemoryStrategy):
             return []
 
     async def retrieve_memories(
-        self, user_id: str, thread_id: Optional[str] = None, query: Optional[str] = None, limit: int = 10
+        self, user_id: str, thread_id: Optional[str] = None, query: Optional[str] = None, limit: int = 10,
+        query_embedding: Optional[List[float]] = None
     ):
         """Retrieve semantic memories."""   
-        query_embedding = None
-        if query:
+        if query and query_embedding is None:
             query_embedding = await self.generate_embedding(text=query)     
-        return self.repository.get_memories(
+        return await self.repository.get_memories(
             user_id=user_id,
             thread_id=thread_id,
             strategy_id=self.strategy_id,
             limit=limit,
             query_embedding=query_embedding,
-            similarity_threshold=self.config.semantic_score,
+            similarity_threshold=self.similarity_threshold,
+            ef_search=self.config.hnsw_ef_search,
+            iterative_scan=self.config.hnsw_iterative_scan,
+            embedding_model=self.config.embedding_model,
+            query_text=self.lexical_query_text(query),
         )
 
     def format_memories_for_context(self, memories) -> str:
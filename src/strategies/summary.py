@@ -9,11 +9,11 @@ from llama_index.llms.anthropic import Anthropic
 from llama_index.core.llms import ChatMessage
 
 from src.strategies.base import MemoryStrategy
-from src.storage.repository import Repository
+from src.storage.async_repository import AsyncRepository
 from src.storage.enums import MemoryActionType, MemoryStrategyEnums
 from src.config.settings import settings
 from src.storage.models import ThreadMemory
-from src.prompts.summary import SUMMARY_SYSTEM_PROMPT
+from src.prompts.summary import SUMMARY_OTHER_TOPICS_PROMPT, SUMMARY_SYSTEM_PROMPT, SUMMARY_TOPIC_ROUTING_PROMPT
 from src.core.memory_config import AgentCoreMemoryConfig
 
 
@@ -51,14 +51,39 @@ class MemoryUpdateResult(BaseModel):
     )
 
 
+class TopicSelection(BaseModel):
+    chunk_ids: List[str] = Field(
+        default_factory=list,
+        description="IDs of the existing chunks to update with the new information, most relevant first"
+    )
+
+
 class SummaryMemoryStrategy(MemoryStrategy):
     """Strategy that maintains conversation summaries."""
 
+    extraction_action_cls = MemoryAction
+    fused_extraction_field = "summary_chunks"
+
     def __init__(
         self, strategy_id: MemoryStrategyEnums = MemoryStrategyEnums.SUMMARY, config: Optional[AgentCoreMemoryConfig] = None
     ):
         super().__init__(strategy_id, config)
-        self.repository = Repository()
+        self.repository = AsyncRepository()
+
+    @property
+    def similarity_threshold(self) -> float:
+        """Minimum similarity score for summary memories."""
+        return self.config.summary_score
+
+    @property
+    def is_incremental(self) -> bool:
+        """Whether extraction routes through the topic index instead of replaying every chunk."""
+        return getattr(self.config, "summary_extraction_mode", "full") == "incremental"
+
+    @property
+    def supports_fused_extraction(self) -> bool:
+        """Incremental extraction needs its own routing call, so it is not fused."""
+        return not self.is_incremental
 
     def _initialize_llm(self, model: str):
         """Initialize LLM for summarization."""
@@ -82,18 +107,77 @@ class SummaryMemoryStrategy(MemoryStrategy):
         message_count = len(chat_history)
         if message_count < 1:
             return new_summary_memories
-        existing_summary_memories = await self.retrieve_memories(
+        if self.is_incremental:
+            summary_memory_actions = await self._generate_incremental_summary(
+                user_id=user_id, thread_id=thread_id, exchanges=chat_history
+            )
+        else:
+            existing_summary_memories = await self.load_existing_memories(
+                user_id=user_id, thread_id=thread_id
+            )
+            summary_memory_actions = await self._generate_summary(
+                summary_memories=existing_summary_memories,
+                exchanges=chat_history
+            )
+        if summary_memory_actions is None or len(summary_memory_actions) == 0:
+            return new_summary_memories
+        return await self.build_memories(summary_memory_actions)
+
+    async def load_existing_memories(self, user_id: str, thread_id: str) -> List[ThreadMemory]:
+        """Load the thread's summary chunks."""
+        return await self.retrieve_memories(
             user_id=user_id, thread_id=thread_id, limit=50
         )
-        summary_memory_actions = await self._generate_summary(
-            summary_memories=existing_summary_memories,
-            exchanges=chat_history
+
+    def build_extraction_prompt(
+        self, conversation_text: str, existing_memories: List[ThreadMemory], other_topics: Optional[List[tuple]] = None
+    ) -> str:
+        """Build the summary prompt over the thread's existing chunks, listing other_topics by topic only."""
+        existing_chunks = (
+            ",\n".join(
+                f"""{{
+                    "chunk_id": "{chunk.id}",
+                    "topic_name": "{chunk.thread_memory_metadata['topic_name']}",
+                    "global_summary": "{chunk.thread_memory_metadata['global_summary']}",
+                    "detailed_summary": "{chunk.thread_memory_metadata['detailed_summary']}",
+                    "created_at": "{chunk.createdAt.isoformat()}",
+                    "updated_at": "{chunk.updatedAt.isoformat()}"
+                }}""" 
+                for chunk in existing_memories
+            )
+            if existing_memories else "None"
         )
-        if summary_memory_actions is None or len(summary_memory_actions) == 0:
-            return new_summary_memories
-        for action in summary_memory_actions:
-            content = f"Topic: {action.topic_name}\nGlobal Summary: {action.global_summary}\nDetailed Summary: {action.detailed_summary}"
-            summary_embedding = await self.generate_embedding(text=content)
+
+        prompt = SUMMARY_SYSTEM_PROMPT.format(
+            conversation_text=conversation_text, 
+            existing_chunks=existing_chunks,
+            MemoryActionType=MemoryActionType
+        )
+        if other_topics:
+            prompt += SUMMARY_OTHER_TOPICS_PROMPT.format(other_topics=self.format_topic_index(other_topics))
+        return prompt
+
+    def format_topic_index(self, topic_index: List[tuple]) -> str:
+        """Format (id, topic_name, global_summary) rows of the topic index for a prompt."""
+        return ",\n".join(
+            f"""{{
+                    "chunk_id": "{chunk_id}",
+                    "topic_name": "{topic_name}",
+                    "global_summary": "{global_summary}"
+                }}"""
+            for chunk_id, topic_name, global_summary in topic_index
+        )
+
+    async def build_memories(self, actions: List[MemoryAction]) -> List[Dict[str, Any]]:
+        """Embed summary actions and build the chunks to store."""
+        new_summary_memories = []
+        # Embed every action's content in one batched request
+        contents = [
+            f"Topic: {action.topic_name}\nGlobal Summary: {action.global_summary}\nDetailed Summary: {action.detailed_summary}"
+            for action in actions
+        ]
+        summary_embeddings = await self.generate_embeddings(contents)
+        for action, content, summary_embedding in zip(actions, contents, summary_embeddings):
             memory_dict = {
                 "memory_id": action.target_chunk_id or None,
                 "action": action.action,
@@ -110,38 +194,72 @@ class SummaryMemoryStrategy(MemoryStrategy):
             new_summary_memories.append(memory_dict)
         return new_summary_memories
 
-    async def _generate_summary(
-        self, exchanges: List[Dict[str, str]], summary_memories: List[ThreadMemory] = []
+    async def _generate_incremental_summary(
+        self, user_id: str, thread_id: str, exchanges: List[Dict[str, str]]
     ) -> Optional[List[MemoryAction]]:
-        """Generate summary of conversation exchanges."""
-        conversation_text = ",\n".join(
-            f"""{{
-                "role": "{msg['role'].upper()}",
-                "content": "{msg['content']}",
-                "created_at": "{msg['created_at']}"
-            }}"""
-            for msg in exchanges
-        )
+        """
+        Generate summary actions without replaying every chunk of the thread.
 
-        existing_chunks = (
-            ",\n".join(
-                f"""{{
-                    "chunk_id": "{chunk.id}",
-                    "topic_name": "{chunk.thread_memory_metadata['topic_name']}",
-                    "global_summary": "{chunk.thread_memory_metadata['global_summary']}",
-                    "detailed_summary": "{chunk.thread_memory_metadata['detailed_summary']}",
-                    "created_at": "{chunk.createdAt.isoformat()}",
-                    "updated_at": "{chunk.updatedAt.isoformat()}"
-                }}""" 
-                for chunk in summary_memories
+        The new exchanges are first routed against the thread's topic index
+        (topic name and global summary of each chunk); only the chunks they
+        are routed to are loaded in full for the summary call, so its size
+        no longer grows with the number of chunks in the thread.
+        """
+        topic_index = await self.repository.get_summary_topic_index(
+            user_id=user_id, thread_id=thread_id, limit=settings.SUMMARY_TOPIC_INDEX_LIMIT
+        )
+        conversation_text = self.format_conversation(exchanges)
+        selected_ids = await self._select_topics(conversation_text, topic_index) if topic_index else []
+        if selected_ids is None:
+            # Routing failed; replay the chunks rather than lose updates
+            return await self._generate_summary(
+                exchanges=exchanges,
+                summary_memories=await self.load_existing_memories(user_id=user_id, thread_id=thread_id),
             )
-            if summary_memories else "None"
+        summary_memories = await self.repository.get_memories_by_ids(user_id=user_id, memory_ids=selected_ids)
+        selected = {str(chunk_id) for chunk_id in selected_ids}
+        other_topics = [topic for topic in topic_index if str(topic[0]) not in selected]
+        print(f"Summary topic index: {len(topic_index)} chunks, {len(summary_memories)} loaded for update.")
+
+        memory_actions = await self._generate_summary(
+            exchanges=exchanges, summary_memories=summary_memories, other_topics=other_topics
         )
+        # An update replaces the chunk's summaries, so it needs the detail the model was given
+        loaded = {str(chunk.id) for chunk in summary_memories}
+        for action in memory_actions:
+            if action.action == MemoryActionType.update and action.target_chunk_id not in loaded:
+                print(f"Summary update of chunk {action.target_chunk_id} was not routed; adding it as a new chunk.")
+                action.action = MemoryActionType.add
+                action.target_chunk_id = None
+        return memory_actions
 
-        prompt = SUMMARY_SYSTEM_PROMPT.format(
-            conversation_text=conversation_text, 
-            existing_chunks=existing_chunks,
-            MemoryActionType=MemoryActionType
+    async def _select_topics(self, conversation_text: str, topic_index: List[tuple]) -> Optional[list]:
+        """Route the new exchanges to the ids of the topic index chunks they update; None on error."""
+        prompt = SUMMARY_TOPIC_ROUTING_PROMPT.format(
+            conversation_text=conversation_text,
+            topic_index=self.format_topic_index(topic_index),
+            max_chunks=settings.SUMMARY_MAX_UPDATE_CHUNKS,
+        )
+        try:
+            sllm = self.llm.as_structured_llm(output_cls=TopicSelection)
+            response = await sllm.achat([ChatMessage.from_str(prompt)])
+            selected_ids = TopicSelection.model_validate(response.raw).chunk_ids
+        except Exception as e:
+            print(f"Error routing summary topics: {e}")
+            return None
+        chunk_ids = {str(chunk_id): chunk_id for chunk_id, _, _ in topic_index}
+        selected = list(dict.fromkeys(chunk_ids[chunk_id] for chunk_id in selected_ids if chunk_id in chunk_ids))
+        return selected[:settings.SUMMARY_MAX_UPDATE_CHUNKS]
+
+    async def _generate_summary(
+        self, exchanges: List[Dict[str, str]], summary_memories: List[ThreadMemory] = [],
+        other_topics: Optional[List[tuple]] = None
+    ) -> Optional[List[MemoryAction]]:
+        """Generate summary of conversation exchanges."""
+        prompt = self.build_extraction_prompt(
+            conversation_text=self.format_conversation(exchanges),
+            existing_memories=summary_memories,
+            other_topics=other_topics,
         )
         try:
             input_msg = ChatMessage.from_str(prompt)
@@ -157,19 +275,24 @@ class SummaryMemoryStrategy(MemoryStrategy):
             return []
 
     async def retrieve_memories(
-        self, user_id: str, thread_id: Optional[str] = None, query: Optional[str] = None, limit: int = 5
+        self, user_id: str, thread_id: Optional[str] = None, query: Optional[str] = None, limit: int = 5,
+        query_embedding: Optional[List[float]] = None
     ):
         """Retrieve summaries and facts."""
-        summary_query_embedding = None
-        if query:
+        summary_query_embedding = query_embedding
+        if query and summary_query_embedding is None:
             summary_query_embedding = await self.generate_embedding(text=query)
-        return self.repository.get_memories(
+        return await self.repository.get_memories(
             user_id=user_id,
             thread_id=thread_id,
             strategy_id=self.strategy_id,
             limit=limit,
             query_embedding=summary_query_embedding,
-            similarity_threshold=self.config.summary_score,
+            similarity_threshold=self.similarity_threshold,
+            ef_search=self.config.hnsw_ef_search,
+            iterative_scan=self.config.hnsw_iterative_scan,
+            embedding_model=self.config.embedding_model,
+            query_text=self.lexical_query_text(query),
         )
 
     def format_memories_for_context(self, memories) -> str:
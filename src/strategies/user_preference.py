@@ -9,7 +9,7 @@ from llama_index.core.llms import ChatMessage
 from pydantic import BaseModel, Field
 
 from src.strategies.base import MemoryStrategy
-from src.storage.repository import Repository
+from src.storage.async_repository import AsyncRepository
 from src.storage.enums import MemoryActionType, MemoryStrategyEnums
 from src.config.settings import settings
 from src.storage.models import ThreadMemory
@@ -49,11 +49,19 @@ class PreferenceUpdateResult(BaseModel):
 class UserPreferenceMemoryStrategy(MemoryStrategy):
     """Strategy that maintains user preferences and characteristics."""
 
+    extraction_action_cls = PreferenceAction
+    fused_extraction_field = "preferences"
+
     def __init__(
         self, strategy_id: MemoryStrategyEnums = MemoryStrategyEnums.USER_PREFERENCE, config: Optional[AgentCoreMemoryConfig] = None
     ):
         super().__init__(strategy_id, config)
-        self.repository = Repository()
+        self.repository = AsyncRepository()
+
+    @property
+    def similarity_threshold(self) -> float:
+        """Minimum similarity score for user preference memories."""
+        return self.config.user_preference_score
 
     def _initialize_llm(self, model: str):
         """Initialize LLM for preference extraction."""
@@ -80,8 +88,8 @@ class UserPreferenceMemoryStrategy(MemoryStrategy):
             return memories
         
         # Retrieve existing preferences
-        preference_memories = await self.retrieve_memories(
-            user_id=user_id, limit=5
+        preference_memories = await self.load_existing_memories(
+            user_id=user_id, thread_id=thread_id
         )
         
         # Generate preference actions
@@ -93,11 +101,49 @@ class UserPreferenceMemoryStrategy(MemoryStrategy):
         if preference_actions is None or len(preference_actions) == 0:
             return memories
         
+        return await self.build_memories(preference_actions)
+
+    async def load_existing_memories(self, user_id: str, thread_id: str) -> List[ThreadMemory]:
+        """Load the user's preferences, across threads."""
+        return await self.retrieve_memories(
+            user_id=user_id, limit=5
+        )
+
+    def build_extraction_prompt(self, conversation_text: str, existing_memories: List[ThreadMemory]) -> str:
+        """Build the preference extraction prompt over the existing preferences."""
+        existing_preferences = (
+            ",\n".join(
+                f"""{{
+                    "preference_id": "{chunk.id}",
+                    "preference": "{chunk.thread_memory_metadata.get('preference', '')}",
+                    "context": "{chunk.thread_memory_metadata.get('context', '')}",
+                    "categories": "{chunk.thread_memory_metadata.get('categories', [])}",
+                    "created_at": "{chunk.createdAt.isoformat()}",
+                    "updated_at": "{chunk.updatedAt.isoformat()}"
+                }}""" 
+                for chunk in existing_memories
+            )
+            if existing_memories else "None"
+        )
+        return USER_PREFERENCE_SYSTEM_PROMPT.format(
+            conversation_text=conversation_text, 
+            existing_preferences=existing_preferences,
+            MemoryActionType=MemoryActionType
+        )
+
+    async def build_memories(self, actions: List[PreferenceAction]) -> List[Dict[str, Any]]:
+        """Embed preference actions and build the memories to store."""
+        memories = []
+        
+        # Embed every action's content in one batched request
+        contents = [
+            f'Preference: {action.preference}\nContext: {action.context}\nCategories: {", ".join(action.categories)}'
+            for action in actions
+        ]
+        embeddings = await self.generate_embeddings(contents)
+        
         # Process each preference action
-        for action in preference_actions:
-            content = f'Preference: {action.preference}\nContext: {action.context}\nCategories: {", ".join(action.categories)}'
-            embedding = await self.generate_embedding(text=content)
-            
+        for action, content, embedding in zip(actions, contents, embeddings):
             memory_dict = {
                 "memory_id": action.target_preference_id or None,
                 "action": action.action,
@@ -117,32 +163,9 @@ class UserPreferenceMemoryStrategy(MemoryStrategy):
         self, exchanges: List[Dict[str, str]], preference_memories: List[ThreadMemory] = []
     ) -> Optional[List[PreferenceAction]]:
         """Extract user preferences from conversation exchanges."""
-        conversation_text = ",\n".join(
-            f"""{{
-                "role": "{msg['role'].upper()}",
-                "content": "{msg['content']}",
-                "created_at": "{msg['created_at']}"
-            }}"""
-            for msg in exchanges
-        )
-        existing_preferences = (
-            ",\n".join(
-                f"""{{
-                    "preference_id": "{chunk.id}",
-                    "preference": "{chunk.thread_memory_metadata.get('preference', '')}",
-                    "context": "{chunk.thread_memory_metadata.get('context', '')}",
-                    "categories": "{chunk.thread_memory_metadata.get('categories', [])}",
-                    "created_at": "{chunk.createdAt.isoformat()}",
-                    "updated_at": "{chunk.updatedAt.isoformat()}"
-                }}""" 
-                for chunk in preference_memories
-            )
-            if preference_memories else "None"
-        )
-        prompt = USER_PREFERENCE_SYSTEM_PROMPT.format(
-            conversation_text=conversation_text, 
-            existing_preferences=existing_preferences,
-            MemoryActionType=MemoryActionType
+        prompt = self.build_extraction_prompt(
+            conversation_text=self.format_conversation(exchanges),
+            existing_memories=preference_memories,
         )
         try:
             sllm = self.llm.as_structured_llm(output_cls=PreferenceUpdateResult)
@@ -158,19 +181,23 @@ class UserPreferenceMemoryStrategy(MemoryStrategy):
             return []
 
     async def retrieve_memories(
-        self, user_id: str, thread_id: Optional[str] = None, query: Optional[str] = None, limit: int = 10
+        self, user_id: str, thread_id: Optional[str] = None, query: Optional[str] = None, limit: int = 10,
+        query_embedding: Optional[List[float]] = None
     ):
         """Retrieve user preferences."""
-        query_embedding = None
-        if query:
+        if query and query_embedding is None:
             query_embedding = await self.generate_embedding(text=query)
-        return self.repository.get_memories(
+        return await self.repository.get_memories(
             user_id=user_id,
             thread_id=thread_id,
             strategy_id=self.strategy_id,
             limit=limit,
             query_embedding=query_embedding,
-            similarity_threshold=self.config.user_preference_score,
+            similarity_threshold=self.similarity_threshold,
+            ef_search=self.config.hnsw_ef_search,
+            iterative_scan=self.config.hnsw_iterative_scan,
+            embedding_model=self.config.embedding_model,
+            query_text=self.lexical_query_text(query),
         )
 
     def format_memories_for_context(self, memories) -> str:
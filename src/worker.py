@@ -0,0 +1,84 @@
+"""
+Standalone memory extraction worker.
+
+Consumes the MemoryExtractionJob queue outside the Chainlit web process, so
+chat latency does not depend on the summarization backlog:
+
+    python -m src.worker --processes 2 --workers 2 --concurrency 4
+
+runs 2 processes, each with 2 asyncio workers running at most 4 jobs at a
+time (16 concurrent extractions). This is the default deployment: the web
+process only enqueues (EXTRACTION_QUEUE_IN_PROCESS_WORKER=false) and workers
+expect the MemoryExtractionJob table from init.sql or
+migrations/006_memory_extraction_job.sql. Their memory writes reach
+the web process's caches through Postgres NOTIFY (MEMORY_WRITE_NOTIFY_ENABLED).
+Workers use the API keys of their environment (OPENAI_API_KEY,
+ANTHROPIC_API_KEY, GEMINI_API_KEY).
+SIGINT/SIGTERM stop claiming jobs and exit once the running ones finish.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+from typing import List
+
+from src.config.settings import settings
+from src.core.extraction_queue import ExtractionWorker
+from src.storage.async_repository import AsyncRepository
+
+
+async def run_workers(workers: int, concurrency: int, poll_interval: float):
+    """Run asyncio extraction workers in this process until SIGINT/SIGTERM."""
+    repository = AsyncRepository()
+    extraction_workers = [
+        ExtractionWorker(concurrency=concurrency, poll_interval=poll_interval, repository=repository)
+        for _ in range(workers)
+    ]
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, lambda: [worker.stop() for worker in extraction_workers])
+    await asyncio.gather(*[worker.run() for worker in extraction_workers])
+
+
+def run_process(workers: int, concurrency: int, poll_interval: float):
+    """Entry point of one worker process."""
+    print(f"Extraction worker process {os.getpid()} starting {workers} worker(s).")
+    asyncio.run(run_workers(workers, concurrency, poll_interval))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run memory extraction workers for the MemoryExtractionJob queue")
+    parser.add_argument("--processes", type=int, default=settings.EXTRACTION_WORKER_PROCESSES, help="Worker processes")
+    parser.add_argument("--workers", type=int, default=settings.EXTRACTION_WORKERS_PER_PROCESS, help="Asyncio workers per process")
+    parser.add_argument("--concurrency", type=int, default=settings.EXTRACTION_WORKER_CONCURRENCY, help="Concurrent jobs per worker")
+    parser.add_argument("--poll-interval", type=float, default=settings.EXTRACTION_QUEUE_POLL_SECONDS, help="Seconds between polls of an empty queue")
+    args = parser.parse_args()
+
+    worker_args = (args.workers, args.concurrency, args.poll_interval)
+    if args.processes <= 1:
+        run_process(*worker_args)
+        return
+
+    # Spawned processes get their own engines and event loops
+    context = multiprocessing.get_context("spawn")
+    processes: List[multiprocessing.Process] = [
+        context.Process(target=run_process, args=worker_args, name=f"extraction-worker-{index}")
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
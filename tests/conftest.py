@@ -0,0 +1,25 @@
+"""
+Shared test setup.
+
+Settings require a database, so placeholders are set before src is
+imported; tests that talk to Postgres skip unless TEST_DATABASE_URL is set.
+"""
+import asyncio
+import os
+
+import pytest
+
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+os.environ.setdefault("DATABASE_URL", "postgresql://postgres@localhost/postgres")
+os.environ.setdefault("POSTGRES_DB", "postgres")
+os.environ.setdefault("POSTGRES_USER", "postgres")
+os.environ.setdefault("POSTGRES_PASSWORD", "postgres")
+
+
+@pytest.fixture(scope="module")
+def loop():
+    """Event loop shared by a module's database tests (pooled connections are bound to it)."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
@@ -0,0 +1,40 @@
+"""Tests for the cross-session embedding batcher."""
+import asyncio
+
+from src.embeddings import EmbeddingBatcher
+
+
+async def fake_embed(texts):
+    await asyncio.sleep(0)
+    if "bad" in texts:
+        raise ValueError("bad input")
+    return [[float(len(text))] for text in texts]
+
+
+def test_concurrent_requests_share_one_batch():
+    async def run():
+        batcher = EmbeddingBatcher(max_wait_ms=5, max_batch_size=100)
+        results = await asyncio.gather(
+            batcher.submit("model", ["a", "bb"], fake_embed),
+            batcher.submit("model", ["ccc"], fake_embed),
+        )
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert results == [[[1.0], [2.0]], [[3.0]]]
+    assert batcher.stats()["batches"] == 1
+    assert not batcher._tasks
+
+
+def test_a_failing_input_only_fails_its_own_request():
+    async def run():
+        batcher = EmbeddingBatcher(max_wait_ms=5, max_batch_size=2)
+        return await asyncio.gather(
+            batcher.submit("model", ["ok"], fake_embed),
+            batcher.submit("model", ["bad"], fake_embed),
+            return_exceptions=True,
+        )
+
+    good, bad = asyncio.run(run())
+    assert good == [[2.0]]
+    assert isinstance(bad, ValueError)
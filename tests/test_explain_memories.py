@@ -0,0 +1,103 @@
+"""
+EXPLAIN regression tests for multi-strategy memory retrieval.
+
+Need TEST_DATABASE_URL pointing at a database initialized with init.sql
+(pgvector >= 0.7). The test user is small, so planner settings rule out
+the alternatives: without sorts only the HNSW index can order a branch by
+distance, and without sequential scans the userId filter has to use its
+b-tree. Either failing means a query change stopped matching the index.
+"""
+import os
+import uuid
+
+import pytest
+from sqlalchemy import delete
+
+from src.embeddings import get_embedding_provider
+from src.storage.async_repository import AsyncRepository
+from src.storage.enums import MemoryActionType, MemoryStrategyEnums
+from src.storage.models import ThreadMemory, User
+from src.storage.queries import MemoryQuery, model_embedding_index_name
+from src.config.settings import settings
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"),
+    reason="TEST_DATABASE_URL is not set",
+)
+
+EMBEDDING_MODEL = "hashing-256"
+STRATEGIES = list(MemoryStrategyEnums)
+MEMORIES_PER_STRATEGY = 20
+
+
+def embed(text, dimensions):
+    return get_embedding_provider("Hashing").embed_text(text, dimensions)
+
+
+@pytest.fixture(scope="module")
+def user_id(loop):
+    repository = AsyncRepository()
+    user_id = str(uuid.uuid4())
+    thread_id = str(uuid.uuid4())
+
+    async def seed():
+        await repository.create_model_embedding_index(EMBEDDING_MODEL)
+        async with repository.get_session() as session:
+            session.add(User(id=user_id, identifier=f"explain-test-{user_id}", user_metadata={}))
+            await session.commit()
+        for strategy in STRATEGIES:
+            for number in range(MEMORIES_PER_STRATEGY):
+                content = f"{strategy.value} memory {number} about trip {number % 5}"
+                await repository.save_memory(
+                    user_id=user_id, thread_id=thread_id, strategy=strategy.value,
+                    action=MemoryActionType.add.value, content=content,
+                    embedding=embed(content, settings.EMBEDDING_DIMENSIONS), metadata={},
+                )
+                await repository.save_memory(
+                    user_id=user_id, thread_id=thread_id, strategy=strategy.value,
+                    action=MemoryActionType.add.value, content=content,
+                    embedding=embed(content, settings.embedding_dimensions(EMBEDDING_MODEL)), metadata={},
+                    embedding_model=EMBEDDING_MODEL,
+                )
+
+    async def clean_up():
+        async with repository.get_session() as session:
+            await session.execute(delete(ThreadMemory).where(ThreadMemory.userId == user_id))
+            await session.execute(delete(User).where(User.identifier == f"explain-test-{user_id}"))
+            await session.commit()
+        await repository.engine.dispose()
+
+    loop.run_until_complete(seed())
+    yield user_id
+    loop.run_until_complete(clean_up())
+
+
+def explain(loop, user_id, embedding_model, planner_settings, thread_id=None):
+    dimensions = settings.embedding_dimensions(embedding_model) if embedding_model else settings.EMBEDDING_DIMENSIONS
+    plan = loop.run_until_complete(AsyncRepository().explain_memories(
+        user_id=user_id,
+        memory_queries=[
+            MemoryQuery(strategy_id=strategy, similarity_threshold=0.1, limit=5)
+            for strategy in STRATEGIES
+        ],
+        query_embedding=embed("memory about trip 3", dimensions),
+        thread_id=thread_id,
+        embedding_model=embedding_model,
+        planner_settings=planner_settings,
+    ))
+    return "\n".join(plan)
+
+
+@pytest.mark.parametrize("embedding_model, index_name", [
+    (EMBEDDING_MODEL, model_embedding_index_name(EMBEDDING_MODEL)),
+    (None, "idx_threadmemory_embedding_hnsw"),
+])
+def test_every_strategy_branch_can_use_the_hnsw_index(loop, user_id, embedding_model, index_name):
+    plan = explain(loop, user_id, embedding_model, {"enable_sort": "off"})
+    assert plan.count(f"Index Scan using {index_name}") == len(STRATEGIES), plan
+
+
+@pytest.mark.parametrize("embedding_model", [EMBEDDING_MODEL, None])
+def test_every_strategy_branch_filters_users_with_the_userid_index(loop, user_id, embedding_model):
+    plan = explain(loop, user_id, embedding_model, {"enable_seqscan": "off"})
+    assert plan.lower().count("idx_userid") == len(STRATEGIES), plan
@@ -0,0 +1,132 @@
+"""
+Visibility timeout and debounce tests for the extraction queue.
+
+Need TEST_DATABASE_URL pointing at a database initialized with init.sql.
+"""
+import asyncio
+import os
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+from src.core.extraction_queue import ExtractionWorker
+from src.storage.async_repository import AsyncRepository
+from src.storage.models import MemoryExtractionJob
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"),
+    reason="TEST_DATABASE_URL is not set",
+)
+
+VISIBILITY_TIMEOUT = timedelta(seconds=1)
+
+
+@pytest.fixture(scope="module")
+def repository(loop):
+    repository = AsyncRepository()
+    yield repository
+    loop.run_until_complete(repository.engine.dispose())
+
+
+@pytest.fixture
+def job_id(loop, repository):
+    thread_id = f"queue-test-{uuid.uuid4()}"
+    job_id = loop.run_until_complete(repository.enqueue_extraction_job({
+        "idempotencyKey": f"{thread_id}:1:turn",
+        "threadId": thread_id,
+        "userId": None,
+        "watermark": 1,
+        "payload": {"config": {}, "is_process_next_messages": False},
+        "maxAttempts": 5,
+    }))
+    yield job_id
+
+    async def clean_up():
+        async with repository.get_session() as session:
+            await session.execute(delete(MemoryExtractionJob).where(MemoryExtractionJob.id == job_id))
+            await session.commit()
+
+    loop.run_until_complete(clean_up())
+
+
+def claim(loop, repository, worker_id):
+    jobs = loop.run_until_complete(repository.claim_extraction_jobs(worker_id, 100, VISIBILITY_TIMEOUT))
+    return {job.id: job for job in jobs}
+
+
+def job_status(loop, repository, job_id):
+    async def load():
+        async with repository.get_session() as session:
+            return (await session.execute(
+                select(MemoryExtractionJob.status).where(MemoryExtractionJob.id == job_id)
+            )).scalar_one()
+    return loop.run_until_complete(load())
+
+
+def test_heartbeat_keeps_a_long_job_from_being_reclaimed(loop, repository, job_id):
+    worker = ExtractionWorker(worker_id="worker-a", repository=repository)
+    worker.visibility_timeout = VISIBILITY_TIMEOUT
+    worker.heartbeat_interval = 0.2
+    job = claim(loop, repository, "worker-a")[job_id]
+
+    async def run_long_job():
+        async with worker.heartbeat(job):
+            await asyncio.sleep(VISIBILITY_TIMEOUT.total_seconds() * 2)
+            return await repository.claim_extraction_jobs("worker-b", 100, VISIBILITY_TIMEOUT)
+
+    reclaimed = loop.run_until_complete(run_long_job())
+    assert job_id not in {job.id for job in reclaimed}
+    assert loop.run_until_complete(repository.complete_extraction_job(job_id, job.watermark))
+    assert job_status(loop, repository, job_id) == "done"
+
+
+def test_completion_of_a_reclaimed_job_is_idempotent(loop, repository, job_id):
+    job = claim(loop, repository, "worker-a")[job_id]
+    loop.run_until_complete(asyncio.sleep(VISIBILITY_TIMEOUT.total_seconds() + 0.2))
+    assert job_id in claim(loop, repository, "worker-b")
+    assert not loop.run_until_complete(repository.extend_extraction_job(job_id, "worker-a", VISIBILITY_TIMEOUT))
+
+    # worker-a finished the extraction after losing the job; it still counts
+    assert loop.run_until_complete(repository.complete_extraction_job(job_id, job.watermark))
+    assert job_status(loop, repository, job_id) == "done"
+    assert not loop.run_until_complete(repository.complete_extraction_job(job_id, job.watermark))
+
+
+def test_debounce_merge_keeps_the_oldest_watermark(loop, repository):
+    thread_id = f"queue-test-{uuid.uuid4()}"
+
+    def enqueue(watermark):
+        return loop.run_until_complete(repository.enqueue_extraction_job(
+            {
+                "idempotencyKey": f"{thread_id}:{watermark}:turn",
+                "threadId": thread_id,
+                "userId": None,
+                "watermark": watermark,
+                "payload": {"config": {}, "is_process_next_messages": False, "from_watermark": watermark},
+                "maxAttempts": 5,
+            },
+            debounce=timedelta(seconds=30),
+        ))
+
+    async def load(job_id):
+        async with repository.get_session() as session:
+            return (await session.execute(
+                select(MemoryExtractionJob.watermark, MemoryExtractionJob.payload).where(MemoryExtractionJob.id == job_id)
+            )).one()
+
+    async def clean_up():
+        async with repository.get_session() as session:
+            await session.execute(delete(MemoryExtractionJob).where(MemoryExtractionJob.threadId == thread_id))
+            await session.commit()
+
+    try:
+        job_id = enqueue(6)
+        assert enqueue(8) == job_id
+        assert enqueue(10) == job_id
+        watermark, payload = loop.run_until_complete(load(job_id))
+        assert watermark == 10
+        assert payload["from_watermark"] == 6
+    finally:
+        loop.run_until_complete(clean_up())
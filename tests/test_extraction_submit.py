@@ -0,0 +1,24 @@
+"""Tests for scheduling memory extraction from a chat turn."""
+import asyncio
+
+from src.core.extraction_queue import submit_memory_extraction
+from src.core.memory_config import AgentCoreMemoryConfig
+
+
+class UnavailableRepository:
+    """Repository whose database is down (or misses the queue table)."""
+
+    async def get_thread_watermark(self, thread_id):
+        raise RuntimeError('relation "MemoryExtractionJob" does not exist')
+
+
+def test_scheduling_failures_never_reach_the_chat_turn():
+    config = AgentCoreMemoryConfig(
+        memory_strategies=["SEMANTIC"],
+        thread_id="thread-1",
+        user_id="user-1",
+        model="gpt-4.1",
+        summarization_model="gpt-4.1-mini",
+        embedding_model="hashing-256",
+    )
+    assert asyncio.run(submit_memory_extraction(config, repository=UnavailableRepository())) is None
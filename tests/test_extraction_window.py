@@ -0,0 +1,39 @@
+"""Tests for the extraction window of a debounced job that merged several watermarks."""
+from src.core.memory_config import AgentCoreMemoryConfig
+from src.core.session_manager import AgentCoreMemorySessionManager
+from src.storage.models import ExchangeMessage
+
+
+def chat(length):
+    """Unsummarized messages 1..length, alternating user and assistant."""
+    return [
+        ExchangeMessage(id=message_id, role="user" if message_id % 2 else "assistant", content=f"message {message_id}")
+        for message_id in range(1, length + 1)
+    ]
+
+
+def session_manager():
+    config = AgentCoreMemoryConfig(
+        memory_strategies=[],
+        thread_id="thread-1",
+        user_id="user-1",
+        no_of_exchanges_to_llm=3,
+        model="gpt-4.1",
+        summarization_model="gpt-4.1-mini",
+        embedding_model="hashing-256",
+    )
+    return AgentCoreMemorySessionManager(agent_core_memory_config=config)
+
+
+def test_merged_job_extracts_the_window_of_an_older_watermark():
+    # Enqueued at 6 messages (a window), merged into the job of 8 messages (none)
+    manager = session_manager()
+    assert manager.get_messages_for_llm_processing(chat(8)) == []
+    messages = manager.get_messages_for_watermarks(chat(8), from_watermark=6)
+    assert [message.id for message in messages] == [1, 2, 3]
+
+
+def test_unmerged_job_only_extracts_its_own_window():
+    manager = session_manager()
+    assert manager.get_messages_for_watermarks(chat(8), from_watermark=8) == []
+    assert manager.get_messages_for_watermarks(chat(8)) == []
@@ -0,0 +1,52 @@
+"""Tests for the offline hashing embedding backend."""
+import asyncio
+import math
+
+import pytest
+
+from src.config.settings import settings
+from src.embeddings import Embedder, get_embedding_provider
+
+MODEL = "hashing-256"
+
+
+def cosine(first, second):
+    return sum(a * b for a, b in zip(first, second))
+
+
+def embed(texts):
+    return asyncio.run(Embedder(MODEL).generate_embeddings(texts))
+
+
+@pytest.fixture(autouse=True)
+def no_embedding_cache(monkeypatch):
+    # The cache's persistent tier would need a database
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+
+
+def test_embeddings_have_model_dimensions_and_unit_length():
+    embeddings = embed(["I prefer window seats", "Book a hotel in Lisbon"])
+    assert [len(embedding) for embedding in embeddings] == [256, 256]
+    for embedding in embeddings:
+        assert math.isclose(math.sqrt(sum(value * value for value in embedding)), 1.0, rel_tol=1e-6)
+
+
+def test_embeddings_are_deterministic():
+    provider = get_embedding_provider("Hashing")
+    first = provider.embed_text("The user is vegetarian", 256)
+    assert provider.embed_text("The user is vegetarian", 256) == first
+    assert provider.embed_text("the USER is vegetarian!", 256) == first
+
+
+def test_texts_sharing_words_score_higher():
+    query, related, unrelated = embed([
+        "flight to Tokyo in March",
+        "the user booked a flight to Tokyo",
+        "prefers dark roast coffee",
+    ])
+    assert cosine(query, related) > cosine(query, unrelated)
+
+
+def test_hashing_model_is_not_offered_in_the_ui():
+    assert MODEL not in settings.EMBEDDING_MODELS_KEYS.values()
+    assert "sentence-transformers/all-mpnet-base-v2" not in settings.EMBEDDING_MODELS_KEYS.values()
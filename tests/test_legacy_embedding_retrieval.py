@@ -0,0 +1,49 @@
+"""Tests for retrieving from the legacy embedding column while memories are re-embedded."""
+import asyncio
+
+from src.core import context_assembler
+from src.core.memory_config import AgentCoreMemoryConfig
+from src.core.session_manager import AgentCoreMemorySessionManager
+
+
+class RecordingRepository:
+    """Repository that records the embedding model each search runs over."""
+
+    def __init__(self):
+        self.embedding_models = []
+
+    async def get_memories_for_strategies(self, user_id, memory_queries, query_embedding, embedding_model=None, **kwargs):
+        self.embedding_models.append(embedding_model)
+        return {}
+
+
+async def embed_query(query):
+    return [0.0] * 256
+
+
+def session_manager_for(legacy_embedding_retrieval):
+    config = AgentCoreMemoryConfig(
+        memory_strategies=["SEMANTIC"],
+        thread_id="thread-1",
+        user_id="user-legacy",
+        model="gpt-4.1",
+        summarization_model="gpt-4.1-mini",
+        embedding_model="hashing-256",
+        legacy_embedding_retrieval=legacy_embedding_retrieval,
+    )
+    session_manager = AgentCoreMemorySessionManager(agent_core_memory_config=config)
+    session_manager.repository = RecordingRepository()
+    session_manager.embed_query = embed_query
+    return session_manager
+
+
+def test_legacy_retrieval_searches_the_legacy_column(monkeypatch):
+    monkeypatch.setattr(context_assembler, "get_encoding", lambda model: None)
+    legacy = session_manager_for(legacy_embedding_retrieval=True)
+    per_model = session_manager_for(legacy_embedding_retrieval=False)
+    assert legacy.retrieval_cache_key("diet") != per_model.retrieval_cache_key("diet")
+
+    asyncio.run(legacy.retrieve_memory_context(query="diet"))
+    asyncio.run(per_model.retrieve_memory_context(query="diet"))
+    assert legacy.repository.embedding_models == [None]
+    assert per_model.repository.embedding_models == ["hashing-256"]
@@ -0,0 +1,50 @@
+"""Tests for serving the agent's first memory tool call from the message prefetch."""
+import asyncio
+
+from src.core import context_assembler
+from src.core.memory_config import AgentCoreMemoryConfig
+from src.core.session_manager import AgentCoreMemorySessionManager
+
+
+class RecordingRepository:
+    """Repository that records the strategies and queries it is asked to search."""
+
+    def __init__(self):
+        self.searches = []
+
+    async def get_memories_for_strategies(self, user_id, memory_queries, query_embedding, thread_id=None, **kwargs):
+        self.searches.append((sorted(query.strategy_id for query in memory_queries), thread_id))
+        return {}
+
+
+async def embed_query(query):
+    return [0.0] * 256
+
+
+def test_first_tool_call_is_served_from_the_prefetched_strategies(monkeypatch):
+    # Count tokens by length; the tiktoken encodings are downloaded on first use
+    monkeypatch.setattr(context_assembler, "get_encoding", lambda model: None)
+    config = AgentCoreMemoryConfig(
+        memory_strategies=["SUMMARY", "USER_PREFERENCE", "SEMANTIC"],
+        thread_id="thread-1",
+        user_id="user-prefetch",
+        model="gpt-4.1",
+        summarization_model="gpt-4.1-mini",
+        embedding_model="hashing-256",
+    )
+    session_manager = AgentCoreMemorySessionManager(agent_core_memory_config=config)
+    repository = RecordingRepository()
+    session_manager.repository = repository
+    session_manager.embed_query = embed_query
+
+    async def turn():
+        session_manager.prefetch_strategy_memories(query="How should I format my report?")
+        await session_manager.retrieve_memory_context(query="report formatting preferences")
+        await session_manager.retrieve_memory_context(query="quarterly report")
+
+    asyncio.run(turn())
+    assert repository.searches == [
+        (["SEMANTIC", "USER_PREFERENCE"], None),
+        (["SUMMARY"], None),
+        (["SEMANTIC", "SUMMARY", "USER_PREFERENCE"], None),
+    ]
@@ -0,0 +1,104 @@
+"""
+Cross-process memory write notification tests.
+
+Need TEST_DATABASE_URL pointing at a database initialized with init.sql.
+"""
+import asyncio
+import json
+import os
+import uuid
+
+import asyncpg
+import pytest
+from sqlalchemy import delete
+
+from src.storage import invalidation
+from src.storage.async_repository import AsyncRepository
+from src.storage.engine import to_driverless_url
+from src.storage.enums import MemoryActionType, MemoryStrategyEnums
+from src.storage.invalidation import MEMORY_WRITE_CHANNEL, MemoryWriteSubscriber, memory_write_payload
+from src.storage.models import ThreadMemory, User
+from src.storage.queries import memory_write_notify_stmt
+from src.config.settings import settings
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"),
+    reason="TEST_DATABASE_URL is not set",
+)
+
+
+@pytest.fixture(scope="module")
+def repository(loop):
+    repository = AsyncRepository()
+    yield repository
+    loop.run_until_complete(repository.engine.dispose())
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Memory writes seen by this process's listeners."""
+    writes = []
+    monkeypatch.setattr(invalidation, "_listeners", [lambda *write: writes.append(write)])
+    return writes
+
+
+async def wait_for(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.05)):
+        if condition():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+def test_memory_writes_are_published(loop, repository):
+    user_id = str(uuid.uuid4())
+    identifier = f"notify-test-{user_id}"
+    payloads = []
+
+    async def save_and_listen():
+        connection = await asyncpg.connect(to_driverless_url(settings.DATABASE_URL))
+        await connection.add_listener(MEMORY_WRITE_CHANNEL, lambda *args: payloads.append(json.loads(args[-1])))
+        try:
+            async with repository.get_session() as session:
+                session.add(User(id=user_id, identifier=identifier, user_metadata={}))
+                await session.commit()
+            await repository.save_memory(
+                user_id=user_id, thread_id=str(uuid.uuid4()), strategy=MemoryStrategyEnums.SEMANTIC.value,
+                action=MemoryActionType.add.value, content="The user lives in Porto", metadata={},
+            )
+            await wait_for(lambda: payloads)
+        finally:
+            await connection.close()
+            async with repository.get_session() as session:
+                await session.execute(delete(ThreadMemory).where(ThreadMemory.userId == user_id))
+                await session.execute(delete(User).where(User.identifier == identifier))
+                await session.commit()
+
+    loop.run_until_complete(save_and_listen())
+    assert [(payload["user_id"], payload["strategy"]) for payload in payloads] == [(user_id, "SEMANTIC")]
+
+
+def test_subscriber_replays_other_processes_writes(loop, repository, writes):
+    subscriber = MemoryWriteSubscriber(to_driverless_url(settings.DATABASE_URL))
+
+    async def publish(payload):
+        async with repository.get_session() as session:
+            await session.execute(memory_write_notify_stmt(payload))
+            await session.commit()
+
+    async def run():
+        subscriber.task = asyncio.create_task(subscriber.run())
+        try:
+            # Connecting drops everything, since earlier writes were not heard
+            assert await wait_for(lambda: writes)
+            assert writes.pop() == (None, None, None)
+            await publish(memory_write_payload(user_id="own-user", strategy="SEMANTIC"))
+            foreign = json.loads(memory_write_payload(user_id="user-1", strategy="SUMMARY"))
+            await publish(json.dumps({**foreign, "origin": "another-process"}))
+            await wait_for(lambda: writes)
+        finally:
+            subscriber.task.cancel()
+            await asyncio.gather(subscriber.task, return_exceptions=True)
+
+    loop.run_until_complete(run())
+    assert writes == [("user-1", "SUMMARY", None)]